@@ -0,0 +1,275 @@
+# نقطة دخول ASGI لواجهة التنبؤ (/api/predict و /api/predict/batch):
+#   pip install uvicorn aiosqlite   (المتطلبات الاختيارية في requirements.txt)
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+# بقية صفحات الواجهة تبقى على تطبيق Flask (python flask_app.py).
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs
+
+import flask_app
+from bulk_import import insert_requests, validate_row
+from metrics import STAGE_SECONDS, count_predictions
+
+# أقصى حجم لجسم الطلب بالبايت
+MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 64 * 1024 * 1024))
+# عدد خيوط التنبؤ (None = الافتراضي في ThreadPoolExecutor)
+EXECUTOR_WORKERS = int(os.environ['ASGI_EXECUTOR_WORKERS']) if os.environ.get('ASGI_EXECUTOR_WORKERS') else None
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+def async_database_url(url):
+    """نفس ملف قاعدة بيانات Flask مع مشغّل aiosqlite"""
+    return url.set(drivername='sqlite+aiosqlite')
+
+
+class PredictionApp:
+    """
+    تطبيق ASGI بدون إطار عمل لمسارات التنبؤ
+
+    المعالجات غير متزامنة فتستقبل آلاف الاتصالات في عملية واحدة، والتنبؤ (عمل CPU)
+    وإنشاء تطبيق Flask وتحميل النموذج تُنفّذ في مجمّع خيوط حتى لا تحجب حلقة الأحداث.
+    النموذج يُحمّل عند حدث بدء lifespan (إذا كان MODEL_PRELOAD مفعلاً) أو عند أول طلب.
+    الحفظ الاختياري (?save=1) يستخدم محركاً غير متزامن (sqlite+aiosqlite) على نفس جدول
+    LoanRequest.
+    """
+
+    def __init__(self, executor_workers=EXECUTOR_WORKERS, max_body_bytes=MAX_BODY_BYTES):
+        self.executor_workers = executor_workers
+        self.max_body_bytes = max_body_bytes
+        self.executor = None
+        self.service = None
+        # البدء مرة واحدة: الطلبات التي تصل أثناءه (خادم بدون lifespan) تنتظر اكتماله
+        self.started = False
+        self._startup_lock = asyncio.Lock()
+        self.engine = None
+        self.sessionmaker = None
+        self.routes = {
+            ('POST', '/api/predict'): self.predict,
+            ('POST', '/api/predict/batch'): self.predict_batch,
+        }
+
+    async def startup(self):
+        """
+        البدء (مرة واحدة): مجمّع الخيوط، تطبيق Flask، النموذج، والمحرك غير المتزامن
+
+        started يصبح True بعد اكتمال كل الخطوات فقط؛ الاستدعاءات المتزامنة تنتظر نفس البدء.
+        """
+        async with self._startup_lock:
+            if self.started:
+                return
+            self.executor = self.executor or ThreadPoolExecutor(self.executor_workers,
+                                                                thread_name_prefix='predict')
+            # إنشاء التطبيق (الجداول وإعداد SQLite) ثم تحميل النموذج قبل استقبال الاتصالات
+            flask = await self.run(flask_app.get_app)
+            if flask.config['MODEL_PRELOAD']:
+                await self.ready()
+            self.sessionmaker = self.async_sessionmaker(flask)
+            self.started = True
+
+    def async_sessionmaker(self, flask):
+        """جلسات sqlite+aiosqlite لحفظ الطلبات، أو None إذا لم يكن aiosqlite مثبتاً (الحفظ يعيد 501)"""
+        try:
+            from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+            from sqlalchemy.orm import sessionmaker
+        except ImportError:
+            return None
+        with flask.app_context():
+            url = async_database_url(flask_app.db.engine.url)
+        try:
+            self.engine = create_async_engine(url)
+        except ImportError:
+            return None
+        flask_app.db_tuning.configure_sqlite(self.engine.sync_engine, flask.config['SQLITE_PRAGMAS'])
+        return sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def shutdown(self):
+        self.started = False
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = self.sessionmaker = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        if not self.started:
+            # خادم بدون دعم lifespan: أول طلب يبدأ التطبيق، والطلبات التالية تنتظر نفس البدء
+            await self.startup()
+
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is None:
+            allowed = any(path == scope['path'] for _, path in self.routes)
+            await send_json(send, 405 if allowed else 404,
+                            {'error': 'Method not allowed' if allowed else 'Not found'})
+            return
+
+        try:
+            body = await read_body(receive, self.max_body_bytes)
+        except PayloadTooLarge:
+            await send_json(send, 413, {'error': f'Request body too large (max {self.max_body_bytes} bytes)'})
+            return
+
+        query = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+        status, payload = await handler(body, query)
+        await send_json(send, status, payload)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def run(self, function, *args):
+        """تنفيذ دالة متزامنة (التنبؤ) في مجمّع الخيوط"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    @staticmethod
+    def load_model():
+        """خدمة التنبؤ مع النسخة الأولى من النموذج (استيراد numpy وقراءة الملفات؛ في مجمّع الخيوط)"""
+        service = flask_app.prediction_service(flask_app.app)
+        service.registry.load_initial()
+        return service
+
+    async def ready(self):
+        """
+        خدمة التنبؤ بعد تحميل النموذج، بدون حجب حلقة الأحداث
+
+        الطلبات المتزامنة قبل اكتمال التحميل تنتظر نفس التحميل (load_initial) في خيوط المجمّع.
+        """
+        if self.service is None:
+            self.service = await self.run(self.load_model)
+        return self.service
+
+    async def predict(self, body, query):
+        """نفس /api/predict في Flask، مع حفظ اختياري للطلب (?save=1)"""
+        try:
+            with STAGE_SECONDS.time(stage='parse'):
+                data = json.loads(body) if body else None
+        except ValueError as e:
+            return 400, {'error': f'Invalid JSON body: {e}'}
+        if not data:
+            return 400, {'error': 'No data provided'}
+
+        try:
+            service = await self.ready()
+            with service.registry.use() as version:
+                if version is not None and version.micro_batcher is not None:
+                    prediction, model_version = await self.predict_batched(service, version, data), version.version
+                else:
+                    prediction, model_version = await self.run(service.predict_request, data)
+        except Exception as e:
+            return 500, {'error': str(e)}
+        label = 'Approved' if prediction == 1 else 'Rejected'
+        result = {'prediction': label, 'confidence': service.confidence(model_version),
+                  'model_version': model_version}
+
+        if query.get('save') == '1':
+            if self.sessionmaker is None:
+                return 501, {'error': 'Saving requests requires aiosqlite (pip install aiosqlite)'}
+            try:
+                result['saved'] = await self.save(data, label, model_version)
+            except (KeyError, ValueError, TypeError) as e:
+                return 400, {'error': str(e)}
+        return 200, result
+
+    async def predict_batched(self, service, version, data):
+        """
+        التنبؤ عبر مجمّع نسخة النموذج بانتظار Future مباشرة بدلاً من حجز خيط لكل طلب
+        """
+        with STAGE_SECONDS.time(stage='encode'):
+            features = version.encoder.encode(data)
+        cached = service.cache.get(features, version.version)
+        if cached is None:
+            cached = int(await asyncio.wrap_future(version.micro_batcher.submit(features)))
+            service.cache.put(features, cached, version.version)
+        count_predictions([cached], False)
+        return cached
+
+    async def save(self, data, prediction, model_version):
+        """حفظ الطلب مع تحديث جدول الإحصائيات عبر الجلسة غير المتزامنة"""
+        record = validate_row(data, flask_app.import_categories())
+        record['prediction'] = prediction
+        record['model_version'] = model_version
+        record['request_date'] = datetime.utcnow()
+        async with self.sessionmaker() as session:
+            await session.run_sync(insert_requests, flask_app.LoanRequest, [record])
+        return True
+
+    def score_batch(self, parsed):
+        """score_parsed_batch داخل سياق تطبيق Flask (يُنفّذ في مجمّع الخيوط)"""
+        with flask_app.app.app_context():
+            return flask_app.score_parsed_batch(parsed)
+
+    async def predict_batch(self, body, query):
+        """نفس /api/predict/batch في Flask (مصفوفة JSON أو NDJSON)"""
+        try:
+            with STAGE_SECONDS.time(stage='parse'):
+                parsed = flask_app.parse_batch_text(body.decode('utf-8'))
+        except ValueError as e:
+            return 400, {'error': f'Invalid JSON body: {e}'}
+
+        if not parsed:
+            return 400, {'error': 'No data provided'}
+        max_rows = flask_app.app.config['PREDICT_BATCH_MAX_ROWS']
+        if len(parsed) > max_rows:
+            return 413, {'error': f'Too many rows (max {max_rows})'}
+
+        try:
+            service = await self.ready()
+            results = await self.run(self.score_batch, parsed)
+        except Exception as e:
+            return 500, {'error': str(e)}
+        return 200, {
+            'results': results,
+            'count': len(results),
+            'errors': sum(1 for r in results if 'error' in r),
+            'confidence': service.confidence()
+        }
+
+
+async def read_body(receive, limit):
+    """قراءة جسم الطلب من رسائل http.request مع رفض ما يتجاوز الحد"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            raise PayloadTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = PredictionApp()
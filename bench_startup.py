@@ -0,0 +1,101 @@
+# قياس زمن بدء عامل الخادم: كل تشغيل عملية Python جديدة تستورد flask_app ثم تنشئ التطبيق
+# (flask_app.app) وترسل أول طلب وأول تنبؤ، لمعرفة متى يصبح العامل الجديد جاهزاً:
+#   python bench_startup.py --runs 10 --target-ms 200
+#   python bench_startup.py --preload --json startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# يُنفّذ في العملية الجديدة ويطبع التوقيتات كـ JSON في السطر الأخير
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+import flask_app
+imported = time.perf_counter()
+modules = len(sys.modules)
+heavy = sorted(name for name in ('numpy', 'sklearn', 'xgboost', 'pyarrow', 'prediction_service', 'sql_eda',
+                                 'simple_eda') if name in sys.modules)
+# الاستيراد لا ينشئ التطبيق؛ أول استخدام لـ flask_app.app ينشئه (كما في gunicorn)
+app = flask_app.app
+created = time.perf_counter()
+# الزمن منذ أن شغّلت العملية الأم المفسّر (ساعة النظام مشتركة بين العمليتين)
+boot = time.time() - float(sys.argv[2])
+client = app.test_client()
+client.get('/api/requests?limit=1')
+first_request = time.perf_counter()
+response = client.post('/api/predict', json=json.loads(sys.argv[1]))
+first_prediction = time.perf_counter()
+print(json.dumps({
+    'boot_ms': boot * 1000,
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first_request - created) * 1000,
+    'first_prediction_ms': (first_prediction - first_request) * 1000,
+    'prediction_status': response.status_code,
+    'modules_at_import': modules,
+    'heavy_at_import': heavy,
+}))
+'''
+
+SAMPLE_REQUEST = {
+    'gender': 'Male', 'married': 'Yes', 'dependents': '0', 'education': 'Graduate',
+    'self_employed': 'No', 'applicant_income': '5000', 'coapplicant_income': '0',
+    'loan_amount': '120', 'loan_term': '360', 'credit_history': '1', 'property_area': 'Urban',
+}
+
+
+def run_once(env):
+    """
+    تشغيل عملية واحدة وإرجاع توقيتاتها: boot_ms من تشغيل المفسّر حتى إنشاء التطبيق،
+    ثم أول طلب (قراءة من قاعدة البيانات) وأول تنبؤ (يشمل تحميل النموذج إذا لم يُحمّل مسبقاً)
+    """
+    result = subprocess.run([sys.executable, '-c', CHILD, json.dumps(SAMPLE_REQUEST), repr(time.time())],
+                            env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs, key):
+    values = sorted(run[key] for run in runs)
+    return {'min': round(values[0], 1), 'median': round(statistics.median(values), 1),
+            'max': round(values[-1], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='زمن بدء flask_app في عملية جديدة')
+    parser.add_argument('--runs', type=int, default=5, help='عدد مرات التشغيل')
+    parser.add_argument('--preload', action='store_true', help='تحميل النموذج في خيط خلفي عند البدء')
+    parser.add_argument('--target-ms', type=float, default=200.0, help='الحد المطلوب لوسيط boot_ms')
+    parser.add_argument('--json', dest='json_path', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args()
+
+    env = dict(os.environ, LOAN_MODEL_PRELOAD='1' if args.preload else '0', LOAN_MODEL_WATCH='0')
+    # تشغيل أول لتدفئة ذاكرة نظام الملفات (ملفات .pyc والمكتبات)
+    run_once(env)
+    runs = [run_once(env) for _ in range(args.runs)]
+
+    report = {key: summarize(runs, key)
+              for key in ('boot_ms', 'import_ms', 'create_app_ms', 'first_request_ms', 'first_prediction_ms')}
+    report['modules_at_import'] = runs[-1]['modules_at_import']
+    report['heavy_at_import'] = runs[-1]['heavy_at_import']
+    report['target_ms'] = args.target_ms
+    report['meets_target'] = report['boot_ms']['median'] <= args.target_ms
+
+    for key in ('boot_ms', 'import_ms', 'create_app_ms', 'first_request_ms', 'first_prediction_ms'):
+        print(f"{key:20} min {report[key]['min']:8.1f}  median {report[key]['median']:8.1f}  "
+              f"max {report[key]['max']:8.1f}")
+    print(f"modules at import: {report['modules_at_import']}, heavy modules at import: "
+          f"{', '.join(report['heavy_at_import']) or 'none'}")
+    print(f"boot target {args.target_ms:.0f} ms: {'OK' if report['meets_target'] else 'MISSED'}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'runs': runs, 'summary': report}, f, indent=2)
+    return 0 if report['meets_target'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
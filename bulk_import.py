@@ -0,0 +1,264 @@
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime
+
+import summary_stats
+from feature_encoder import parse_numeric_fields
+from metrics import STAGE_SECONDS
+from loan_fields import CSV_COLUMNS
+
+# الحقول النصية في جدول الطلبات
+TEXT_FIELDS = ['gender', 'married', 'dependents', 'education', 'self_employed', 'property_area']
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+def request_mapping(data, prediction=None, model_version=None):
+    """
+    تحويل بيانات طلب (نموذج أو JSON أو CSV) إلى قيم أعمدة LoanRequest
+
+    Args:
+        data: قاموس يحتوي على بيانات الطلب
+        prediction: نتيجة التنبؤ ('Approved' أو 'Rejected')
+        model_version: نسخة النموذج التي قيّمت الطلب
+    """
+    numeric = parse_numeric_fields(data)
+    mapping = {field: data[field] for field in TEXT_FIELDS}
+    mapping.update(numeric)
+    # dependents تُحفظ بقيمتها الأصلية ('3+')
+    mapping['dependents'] = data['dependents']
+    mapping['loan_term'] = int(numeric['loan_term'])
+    mapping['prediction'] = prediction
+    mapping['model_version'] = model_version
+    return mapping
+
+
+def detect_format(filename=None, content_type=None):
+    """تحديد صيغة الملف من امتداده أو من نوع المحتوى"""
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl', '.json')) or 'json' in content_type:
+        return 'ndjson'
+    return None
+
+
+def text_stream(binary):
+    """قراءة ملف ثنائي (رفع ملف أو جسم الطلب) كنص UTF-8 بدون تحميله في الذاكرة"""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+def read_csv_rows(lines):
+    """
+    قراءة ملف بصيغة loan_prediction.csv صفاً بصف
+
+    تبقى القيم نصوصاً ليتحقق منها المرمّز، والقيم الفارغة تُحذف فيُرفض الصف
+    بخطأ "missing field". عمود Loan_Status (إن وُجد) يُتجاهل لأن الطلبات يُعاد تقييمها.
+
+    Yields:
+        tuple: (رقم السطر، قاموس الطلب أو None، رسالة الخطأ أو None)
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [column.strip() for column in header]
+    for values in reader:
+        line = reader.line_num
+        if not any(value.strip() for value in values):
+            continue
+        # عمود فهرس بدون اسم في بداية الصف (كما في loan_prediction.csv)
+        if len(values) == len(header) + 1:
+            values = values[1:]
+        if len(values) != len(header):
+            yield line, None, f'expected {len(header)} columns, got {len(values)}'
+            continue
+        row = dict(zip(header, values))
+        record = {}
+        for column, field in CSV_COLUMNS.items():
+            value = (row.get(column) or '').strip()
+            if value:
+                record[field] = value
+        date = (row.get('request_date') or '').strip()
+        if date:
+            record['request_date'] = date
+        yield line, record, None
+
+
+def read_ndjson_rows(lines):
+    """
+    قراءة أسطر NDJSON (كائن JSON واحد في كل سطر) مع تسجيل أخطاء التحليل لكل سطر
+
+    Yields:
+        tuple: (رقم السطر، قاموس الطلب أو None، رسالة الخطأ أو None)
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f'invalid JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'row must be a JSON object'
+            continue
+        yield line_number, record, None
+
+
+def read_rows(lines, fmt):
+    """اختيار القارئ المناسب للصيغة"""
+    if fmt == 'csv':
+        return read_csv_rows(lines)
+    if fmt == 'ndjson':
+        return read_ndjson_rows(lines)
+    raise ValueError(f'Unsupported import format: {fmt} (expected one of {", ".join(IMPORT_FORMATS)})')
+
+
+def validate_row(record, categories=None):
+    """
+    التحقق من صف واحد وتحويله إلى قيم الأعمدة (بدون نتيجة التنبؤ)
+
+    يرفض القيم غير المنتهية (nan / inf) والتواريخ غير الصالحة إضافة إلى
+    أخطاء الحقول المفقودة أو غير الرقمية.
+
+    Args:
+        record: قاموس الطلب
+        categories: القيم المسموح بها لكل حقل فئوي (للمخطط المضغوط)، أو None
+    """
+    mapping = request_mapping(record)
+    for field, value in mapping.items():
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f'{field} must be a finite number')
+    for field, values in (categories or {}).items():
+        value = mapping.get(field)
+        if value is not None and str(value) not in values:
+            raise ValueError(f'invalid {field}: {value!r} (expected one of {", ".join(values)})')
+    date = record.get('request_date')
+    mapping['request_date'] = datetime.fromisoformat(date) if date else None
+    return mapping
+
+
+class ImportReport:
+    """نتيجة الاستيراد: العدد والسرعة والصفوف المرفوضة (برقم السطر وسبب الرفض)"""
+
+    def __init__(self, max_rejects=1000):
+        self.max_rejects = max_rejects
+        self.rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self.chunks = 0
+        self.rejects = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def reject(self, line, error):
+        self.rejected += 1
+        if len(self.rejects) < self.max_rejects:
+            self.rejects.append({'line': line, 'error': error})
+
+    @property
+    def seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def to_dict(self):
+        seconds = self.seconds
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'rejected': self.rejected,
+            'chunks': self.chunks,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(self.rows / seconds, 1) if seconds > 0 else None,
+            'rejects': self.rejects,
+            'rejects_truncated': self.rejected > len(self.rejects),
+        }
+
+
+def insert_requests(session, model, mappings):
+    """إدراج مجموعة طلبات مع تحديث جدول الإحصائيات في معاملة واحدة"""
+    try:
+        session.bulk_insert_mappings(model, mappings)
+        summary_stats.record_requests(session, mappings)
+        with STAGE_SECONDS.time(stage='db_commit'):
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+
+def _flush(pending, session, model, score_batch, report):
+    """تقييم دفعة واحدة بالمتجهات وإدراجها مع تحديث الملخص في معاملة واحدة"""
+    results = score_batch([record for _, record, _ in pending])
+    now = datetime.utcnow()
+    mappings = []
+    for (line, _, mapping), result in zip(pending, results):
+        if 'error' in result:
+            report.reject(line, result['error'])
+            continue
+        mapping['prediction'] = result['prediction']
+        mapping['model_version'] = result.get('model_version')
+        if mapping['request_date'] is None:
+            mapping['request_date'] = now
+        mappings.append(mapping)
+
+    if mappings:
+        insert_requests(session, model, mappings)
+    report.imported += len(mappings)
+    report.chunks += 1
+
+
+def import_rows(rows, session, model, score_batch, chunk_size=5000, report=None, on_chunk=None,
+                categories=None):
+    """
+    استيراد الطلبات على دفعات: تحقق، تقييم جماعي، ثم إدراج بـ bulk_insert_mappings
+
+    كل دفعة تُكتب في معاملة واحدة مع تحديث جدول الإحصائيات، لذلك تبقى الدفعات
+    المكتملة محفوظة إذا فشل الاستيراد في منتصفه.
+
+    Args:
+        rows: أزواج (رقم السطر، الطلب، الخطأ) من read_rows
+        session: جلسة SQLAlchemy
+        model: نموذج LoanRequest
+        score_batch: دالة تقييم جماعي (مثل predict_batch) تعيد لكل صف
+                     {'prediction': ..., 'model_version': ...} أو {'error': ...}
+        chunk_size: عدد الصفوف في كل دفعة
+        report: ImportReport لتجميع النتائج (يُنشأ تلقائياً إذا لم يُمرّر)
+        on_chunk: دالة تُستدعى بعد كل دفعة مع التقرير (لعرض التقدم)
+        categories: القيم الفئوية المسموح بها (انظر validate_row)
+
+    Returns:
+        ImportReport
+    """
+    report = report if report is not None else ImportReport()
+    pending = []
+
+    for line, record, error in rows:
+        report.rows += 1
+        if error is None:
+            try:
+                pending.append((line, record, validate_row(record, categories)))
+            except KeyError as e:
+                error = f'missing field {e}'
+            except (ValueError, TypeError) as e:
+                error = str(e)
+        if error is not None:
+            report.reject(line, error)
+
+        if len(pending) >= chunk_size:
+            _flush(pending, session, model, score_batch, report)
+            pending = []
+            if on_chunk is not None:
+                on_chunk(report)
+
+    if pending:
+        _flush(pending, session, model, score_batch, report)
+        if on_chunk is not None:
+            on_chunk(report)
+
+    report.finished = time.perf_counter()
+    return report
@@ -0,0 +1,241 @@
+# معالجة ملفات طلبات أكبر من الذاكرة على دفعات: مرور أول يجمع قيم ملء القيم المفقودة (المنوال
+# والوسيط التقريبي) وقاموس فئات كل عمود، ومرور ثانٍ يحوّل كل دفعة بأنواع بيانات ثابتة ويكتبها
+# بصيغة عمودية (.npy أو Parquet) يقرؤها التدريب مباشرة بدل CSV.
+import json
+import os
+import shutil
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from feature_encoder import DEFAULT_FEATURE_NAMES
+from simple_eda import QuantileSketch
+
+# أنواع أعمدة loan_prediction.csv عند القراءة (Dependents نص بسبب '3+')
+RAW_DTYPES = {
+    'Loan_ID': 'string',
+    'Gender': 'string',
+    'Married': 'string',
+    'Dependents': 'string',
+    'Education': 'string',
+    'Self_Employed': 'string',
+    'ApplicantIncome': 'float64',
+    'CoapplicantIncome': 'float64',
+    'LoanAmount': 'float64',
+    'Loan_Amount_Term': 'float64',
+    'Credit_History': 'float64',
+    'Property_Area': 'string',
+    'Loan_Status': 'string',
+}
+
+# نفس قواعد data_preprocessing: المنوال للحقول الفئوية والوسيط للرقمية
+MODE_COLUMNS = ['Gender', 'Married', 'Dependents', 'Self_Employed', 'Credit_History']
+MEDIAN_COLUMNS = ['LoanAmount', 'Loan_Amount_Term']
+ONE_HOT_COLUMNS = ['Gender', 'Married', 'Education', 'Self_Employed', 'Property_Area']
+TARGET_VALUES = {'Y': 1, 'N': 0}
+
+PROCESSED_HEADER = 'meta.json'
+PROCESSED_FORMAT = 'loan-processed-v1'
+# المخرج الافتراضي مع --chunksize (مجلد .npy بجانب processed_loan_data.csv لا بدلاً منه)
+CHUNKED_OUTPUT = 'processed_loan_data'
+
+
+def read_chunks(path, chunksize):
+    return pd.read_csv(path, chunksize=chunksize, dtype=RAW_DTYPES)
+
+
+def collect_statistics(path, chunksize=100000, sketch_size=100000):
+    """
+    المرور الأول: عدد الصفوف والقيم المفقودة، وتكرار كل قيمة فئوية، ووسيط تقريبي
+
+    الوسيط من QuantileSketch (عينة خزان بحجم sketch_size)، فهو دقيق تماماً للملفات
+    الأصغر من العينة. المنوال عند التساوي أصغر القيم، مثل pandas.Series.mode.
+
+    Returns:
+        dict: rows، target_rows، missing_values، class_counts، fill_values، vocabularies
+    """
+    counts = {column: Counter() for column in set(MODE_COLUMNS) | set(ONE_HOT_COLUMNS)}
+    sketches = {column: QuantileSketch(sketch_size) for column in MEDIAN_COLUMNS}
+    missing = Counter()
+    classes = Counter()
+    rows = 0
+
+    for chunk in read_chunks(path, chunksize):
+        rows += len(chunk)
+        for column, count in chunk.isna().sum().items():
+            missing[column] += int(count)
+        for column, counter in counts.items():
+            counter.update(chunk[column].dropna().tolist())
+        for column, sketch in sketches.items():
+            for value in chunk[column].dropna().to_numpy():
+                sketch.add(float(value))
+        classes.update(chunk['Loan_Status'].dropna().tolist())
+
+    fill_values = {}
+    for column in MODE_COLUMNS:
+        if counts[column]:
+            top = max(counts[column].values())
+            fill_values[column] = min(value for value, count in counts[column].items() if count == top)
+    for column in MEDIAN_COLUMNS:
+        fill_values[column] = sketches[column].quantile(0.5)
+
+    return {
+        'rows': rows,
+        'target_rows': sum(classes[value] for value in TARGET_VALUES),
+        'missing_values': {column: count for column, count in missing.items() if count},
+        'class_counts': {str(code): classes[value]
+                         for value, code in sorted(TARGET_VALUES.items(), key=lambda item: item[1])},
+        'fill_values': fill_values,
+        # القيم المرتبة ثابتة لكل الدفعات فتنتج أعمدة one-hot نفسها في كل دفعة
+        'vocabularies': {column: sorted(str(value) for value in counts[column]) for column in ONE_HOT_COLUMNS},
+    }
+
+
+def transform_chunk(chunk, statistics):
+    """
+    المرور الثاني لدفعة واحدة: الملء، ثم one-hot بالقواميس الثابتة، ثم أعمدة مرمّز الميزات
+
+    Returns:
+        tuple: (DataFrame بأعمدة DEFAULT_FEATURE_NAMES كـ float64، مصفوفة الهدف int8)؛
+               الصفوف بدون Loan_Status معروفة تُحذف
+    """
+    chunk = chunk[chunk['Loan_Status'].isin(list(TARGET_VALUES))]
+    chunk = chunk.fillna(statistics['fill_values'])
+    for column in ONE_HOT_COLUMNS:
+        chunk[column] = pd.Categorical(chunk[column], categories=statistics['vocabularies'][column])
+
+    encoded = pd.get_dummies(chunk, columns=ONE_HOT_COLUMNS, drop_first=True)
+    encoded['Dependents'] = encoded['Dependents'].replace('3+', '3').astype('float64')
+    features = encoded.reindex(columns=DEFAULT_FEATURE_NAMES, fill_value=0).astype('float64')
+    target = encoded['Loan_Status'].map(TARGET_VALUES).to_numpy(dtype=np.int8)
+    return features, target
+
+
+def ignored_columns(statistics):
+    """أعمدة one-hot لقيم لا يعرفها مرمّز الميزات في تطبيق الويب (تُحذف من البيانات)"""
+    columns = []
+    for column, values in statistics['vocabularies'].items():
+        columns += [f'{column}_{value}' for value in values[1:] if f'{column}_{value}' not in DEFAULT_FEATURE_NAMES]
+    return columns
+
+
+def _write_npy(path, chunks, statistics):
+    # المجلد يُكتب بجانب الهدف ثم يُستبدل به (مثل tree_compiler.save_artifact)
+    directory = os.path.normpath(path)
+    staging = f'{directory}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    # عدد الصفوف معروف من المرور الأول، فتُكتب المصفوفات مباشرة على القرص دفعة بدفعة
+    features = np.lib.format.open_memmap(os.path.join(staging, 'features.npy'), mode='w+', dtype=np.float64,
+                                         shape=(statistics['target_rows'], len(DEFAULT_FEATURE_NAMES)))
+    target = np.lib.format.open_memmap(os.path.join(staging, 'target.npy'), mode='w+', dtype=np.int8,
+                                       shape=(statistics['target_rows'],))
+    position = 0
+    for chunk_features, chunk_target in chunks:
+        end = position + len(chunk_target)
+        features[position:end] = chunk_features.to_numpy()
+        target[position:end] = chunk_target
+        position = end
+    features.flush()
+    target.flush()
+    del features, target
+
+    with open(os.path.join(staging, PROCESSED_HEADER), 'w', encoding='utf-8') as f:
+        json.dump({'format': PROCESSED_FORMAT, 'feature_names': DEFAULT_FEATURE_NAMES, 'target': 'Loan_Status',
+                   'statistics': statistics}, f, indent=2, default=str)
+
+    # يُستبدل فقط مجلد مخرجات سابق؛ _check_output يرفض مسبقاً الكتابة فوق ملف عادي
+    if os.path.isdir(directory):
+        previous = f'{directory}.old'
+        shutil.rmtree(previous, ignore_errors=True)
+        os.rename(directory, previous)
+        os.rename(staging, directory)
+        shutil.rmtree(previous)
+    else:
+        os.rename(staging, directory)
+
+
+def _write_parquet(path, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet output requires pyarrow (pip install pyarrow)')
+
+    schema = pa.schema([(name, pa.float64()) for name in DEFAULT_FEATURE_NAMES] + [('Loan_Status', pa.int8())])
+    staging = f'{path}.tmp'
+    with pq.ParquetWriter(staging, schema) as writer:
+        for chunk_features, chunk_target in chunks:
+            table = pa.Table.from_pandas(chunk_features.assign(Loan_Status=chunk_target), schema=schema,
+                                         preserve_index=False)
+            writer.write_table(table)
+    os.replace(staging, path)
+
+
+def _check_output(path):
+    if path.lower().endswith('.csv'):
+        raise ValueError(f"Chunked preprocessing writes a .parquet file or a .npy directory, not CSV: '{path}'")
+    if not path.endswith('.parquet') and os.path.exists(path) and not os.path.isdir(path):
+        raise ValueError(f"'{path}' is an existing file; the .npy output is a directory")
+
+
+def preprocess_chunked(input_path='loan_prediction.csv', output_path=CHUNKED_OUTPUT, chunksize=100000):
+    """
+    معالجة ملف الطلبات على دفعات بذاكرة ثابتة تقريباً (مرتان على الملف)
+
+    output_path بامتداد .parquet يُكتب كملف Parquet (يتطلب pyarrow)، وغير ذلك كمجلد
+    features.npy و target.npy و meta.json (load_processed_data يفتحه بـ mmap). مسار .csv
+    أو ملف موجود ليس مجلداً يُرفض بـ ValueError قبل القراءة، فلا يُستبدل CSV المعالج.
+
+    SMOTE لا يعمل على دفعات: يحتاج أقرب الجيران من كل صفوف الفئة الأقل في الذاكرة معاً،
+    لذلك البيانات الناتجة غير متوازنة (class_counts في التقرير).
+
+    Returns:
+        dict: ملخص بنفس مفاتيح data_preprocessing.preprocess مع قيم الملء والقواميس
+    """
+    _check_output(output_path)
+    statistics = collect_statistics(input_path, chunksize)
+    chunks = (transform_chunk(chunk, statistics) for chunk in read_chunks(input_path, chunksize))
+    if output_path.endswith('.parquet'):
+        _write_parquet(output_path, chunks)
+    else:
+        _write_npy(output_path, chunks, statistics)
+
+    print(f"Preprocessing complete! {statistics['target_rows']} of {statistics['rows']} rows saved to '{output_path}'")
+    return {
+        'input': input_path,
+        'output': output_path,
+        'chunksize': chunksize,
+        'rows': statistics['rows'],
+        'rows_saved': statistics['target_rows'],
+        'balanced': False,
+        'missing_values': statistics['missing_values'],
+        'class_counts': statistics['class_counts'],
+        'fill_values': statistics['fill_values'],
+        'ignored_columns': ignored_columns(statistics),
+    }
+
+
+def load_processed_data(path='processed_loan_data.csv'):
+    """
+    قراءة بيانات التدريب المعالجة: CSV (data_preprocessing)، أو Parquet، أو مجلد .npy
+
+    Returns:
+        tuple: (DataFrame الميزات كـ float64، Series الهدف Loan_Status)
+    """
+    if os.path.isdir(path):
+        with open(os.path.join(path, PROCESSED_HEADER), encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get('format') != PROCESSED_FORMAT:
+            raise ValueError(f'Unsupported processed data format: {header.get("format")}')
+        features = np.load(os.path.join(path, 'features.npy'), mmap_mode='r')
+        target = np.load(os.path.join(path, 'target.npy'), mmap_mode='r')
+        return (pd.DataFrame(features, columns=header['feature_names']),
+                pd.Series(target, name=header['target'], dtype='float64'))
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    df = df.astype(float)
+    return df.drop('Loan_Status', axis=1), df['Loan_Status']
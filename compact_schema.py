@@ -0,0 +1,162 @@
+from sqlalchemy import MetaData, Table, Column, String, SmallInteger, case, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.types import TypeDecorator
+
+# القيم المسموح بها لكل حقل فئوي؛ رمز القيمة هو ترتيبها في القائمة.
+# تُضاف القيم الجديدة في نهاية القائمة فقط حتى لا تتغير رموز البيانات المحفوظة.
+CATEGORY_VALUES = {
+    'gender': ['Male', 'Female'],
+    'married': ['Yes', 'No'],
+    'dependents': ['0', '1', '2', '3+'],
+    'education': ['Graduate', 'Not Graduate'],
+    'self_employed': ['Yes', 'No'],
+    'property_area': ['Urban', 'Semiurban', 'Rural'],
+    'prediction': ['Approved', 'Rejected'],
+}
+
+metadata = MetaData()
+
+# جدول البحث (الحقل، الرمز) -> القيمة النصية، للاستعلامات المباشرة على قاعدة البيانات
+category_lookup = Table(
+    'category_lookup', metadata,
+    Column('field', String(30), primary_key=True),
+    Column('code', SmallInteger, primary_key=True),
+    Column('value', String(30), nullable=False)
+)
+
+
+class EnumCode(TypeDecorator):
+    """
+    حقل فئوي يُخزّن كرقم صغير ويظهر في ORM كنص
+
+    المقارنات في الاستعلامات (prediction == 'Approved') تُحوّل القيمة إلى رمزها
+    تلقائياً، ونتائج GROUP BY تعود نصوصاً كما في المخطط النصي.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, field):
+        super().__init__()
+        self.field = field
+        self.values = tuple(CATEGORY_VALUES[field])
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self.codes[str(value)]
+        except KeyError:
+            raise ValueError(f'invalid {self.field}: {value!r} (expected one of {", ".join(self.values)})')
+
+    def process_literal_param(self, value, dialect):
+        return str(self.process_bind_param(value, dialect))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.values[value]
+
+    @property
+    def python_type(self):
+        return str
+
+
+class CreditFlag(TypeDecorator):
+    """
+    credit_history كقيمة منطقية (0 أو 1) تظهر في ORM كـ float
+
+    تبقى المجاميع (SUM / MIN / MAX) في EDA والإحصائيات كما هي.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(bool(float(value)))
+
+    def process_literal_param(self, value, dialect):
+        return str(self.process_bind_param(value, dialect))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return float(value)
+
+    @property
+    def python_type(self):
+        return float
+
+
+def categorical_type(field, length, compact):
+    """نوع العمود الفئوي حسب وضع المخطط"""
+    return EnumCode(field) if compact else String(length)
+
+
+def sync_lookup(connection):
+    """إضافة أو تحديث صفوف جدول البحث من CATEGORY_VALUES"""
+    rows = [{'field': field, 'code': code, 'value': value}
+            for field, values in CATEGORY_VALUES.items() for code, value in enumerate(values)]
+    stmt = sqlite_insert(category_lookup)
+    connection.execute(stmt.on_conflict_do_update(index_elements=['field', 'code'],
+                                                  set_={'value': stmt.excluded.value}), rows)
+
+
+def is_compact(engine, table):
+    """هل الجدول الموجود في قاعدة البيانات مخزّن بالمخطط المضغوط"""
+    inspector = inspect(engine)
+    if table.name not in inspector.get_table_names():
+        return None
+    columns = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+    return columns.get('prediction').python_type is int
+
+
+def convert_to_compact(engine, table):
+    """
+    تحويل جدول طلبات نصي موجود إلى المخطط المضغوط في مكانه
+
+    يُعاد بناء الجدول (إعادة تسمية، إنشاء الجدول الجديد بفهارسه، نسخ الصفوف مع
+    تحويل القيم إلى رموز بـ CASE، ثم حذف القديم) في معاملة واحدة، ثم VACUUM
+    لاسترجاع المساحة. القيم غير المعروفة تصبح NULL.
+
+    Args:
+        engine: محرك SQLAlchemy
+        table: جدول LoanRequest المعرّف بالمخطط المضغوط
+
+    Returns:
+        dict: عدد القيم غير المعروفة لكل حقل
+    """
+    legacy_name = f'{table.name}_legacy'
+    legacy = Table(legacy_name, MetaData(), *[Column(column.name) for column in table.columns])
+
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for index in inspector.get_indexes(table.name):
+            connection.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+        connection.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "{legacy_name}"')
+        table.create(connection)
+
+        unknown = {}
+        columns = []
+        for column in table.columns:
+            source = legacy.c[column.name]
+            if column.name in CATEGORY_VALUES:
+                values = CATEGORY_VALUES[column.name]
+                unknown[column.name] = connection.scalar(
+                    select(func.count()).where(source.isnot(None), source.notin_(values)).select_from(legacy))
+                columns.append(case({value: code for code, value in enumerate(values)}, value=source))
+            elif column.name == 'credit_history':
+                columns.append(case((source.is_(None), None), (source != 0, 1), else_=0))
+            else:
+                columns.append(source)
+
+        connection.execute(table.insert().from_select([column.name for column in table.columns],
+                                                      select(*columns)))
+        connection.exec_driver_sql(f'DROP TABLE "{legacy_name}"')
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql('VACUUM')
+    return {field: count for field, count in unknown.items() if count}
@@ -1,10 +1,14 @@
+import copy
+import json
 import joblib
 import pickle
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-import pandas as pd
+from feature_encoder import FeatureEncoder
+from chunked_preprocessing import load_processed_data
+from tree_compiler import compile_model, fold_thresholds, save_artifact
 
-def simple_predict(data_dict, model, scaler_mean, scaler_scale):
+def simple_predict(data_dict, model, scaler_mean, scaler_scale, encoder=None):
     """
     دالة تنبؤ بسيطة بدون استخدام scikit-learn
     
@@ -13,46 +17,14 @@ def simple_predict(data_dict, model, scaler_mean, scaler_scale):
         model: النموذج المدرب
         scaler_mean: متوسط المقياس
         scaler_scale: مقياس المقياس
+        encoder: مرمّز الميزات (الافتراضي يستخدم ترتيب الأعمدة القياسي)
         
     Returns:
         int: 1 للموافقة، 0 للرفض
     """
     
-    # تحويل البيانات إلى القيم المطلوبة
-    dependents = data_dict['dependents']
-    if dependents == '3+':
-        dependents = 3.0
-    else:
-        dependents = float(dependents)
-        
-    applicant_income = float(data_dict['applicant_income'])
-    coapplicant_income = float(data_dict['coapplicant_income'])
-    loan_amount = float(data_dict['loan_amount'])
-    loan_term = float(data_dict['loan_term'])
-    credit_history = float(data_dict['credit_history'])
-    
-    gender_male = 1 if data_dict['gender'] == 'Male' else 0
-    married_yes = 1 if data_dict['married'] == 'Yes' else 0
-    education_not_graduate = 1 if data_dict['education'] == 'Not Graduate' else 0
-    self_employed_yes = 1 if data_dict['self_employed'] == 'Yes' else 0
-    property_area_semiurban = 1 if data_dict['property_area'] == 'Semiurban' else 0
-    property_area_urban = 1 if data_dict['property_area'] == 'Urban' else 0
-    
-    # إنشاء مصفوفة الميزات بالترتيب الصحيح
-    features = np.array([
-        dependents,
-        applicant_income,
-        coapplicant_income,
-        loan_amount,
-        loan_term,
-        credit_history,
-        gender_male,
-        married_yes,
-        education_not_graduate,
-        self_employed_yes,
-        property_area_semiurban,
-        property_area_urban
-    ])
+    # تحويل البيانات إلى مصفوفة الميزات بالترتيب الصحيح
+    features = (encoder or FeatureEncoder()).encode(data_dict)
     
     # تطبيق المقياس يدوياً
     features_scaled = (features - scaler_mean) / scaler_scale
@@ -62,16 +34,145 @@ def simple_predict(data_dict, model, scaler_mean, scaler_scale):
     
     return int(prediction)
 
-def create_simple_prediction_function():
+def _fuse_tree(tree, scaler_mean, scaler_scale):
+    """
+    نقل المقياس إلى عتبات شجرة scikit-learn
+    """
+    state = tree.__getstate__()
+    nodes = state['nodes']
+    internal = nodes['left_child'] != -1
+    features = nodes['feature'][internal]
+    nodes['threshold'][internal] = fold_thresholds(
+        nodes['threshold'][internal], scaler_mean[features], scaler_scale[features], strict=False)
+    tree.__setstate__(state)
+
+def _fuse_xgboost(model, scaler_mean, scaler_scale, feature_names):
+    """
+    نقل المقياس إلى عتبات أشجار XGBoost عبر تعديل نموذج JSON الخاص بالـ booster
+    """
+    booster = model.get_booster()
+    raw = json.loads(bytes(booster.save_raw(raw_format='json')))
+    names = raw['learner'].get('feature_names') or feature_names
+    
+    for tree in raw['learner']['gradient_booster']['model']['trees']:
+        # قيمة الورقة مخزنة في split_conditions أيضاً، لذلك نعدل العقد الداخلية فقط
+        internal = np.asarray(tree['left_children']) != -1
+        features = np.asarray(tree['split_indices'])[internal]
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        conditions[internal] = fold_thresholds(
+            conditions[internal].astype(np.float32), scaler_mean[features], scaler_scale[features], strict=True)
+        tree['split_conditions'] = conditions.tolist()
+    
+    booster.load_model(bytearray(json.dumps(raw).encode()))
+    if names:
+        booster.feature_names = list(names)
+
+def fuse_scaler_into_model(model, scaler_mean, scaler_scale, feature_names=None):
+    """
+    إنشاء نسخة من النموذج تعمل مباشرة على الميزات الخام بدون خطوة المقياس
+    
+    Args:
+        model: النموذج المدرب على ميزات مقاسة
+        scaler_mean: متوسط المقياس
+        scaler_scale: مقياس المقياس
+        feature_names: أسماء الميزات (تستخدم مع XGBoost)
+        
+    Returns:
+        النموذج المدمج
+    """
+    scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+    scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+    fused = copy.deepcopy(model)
+    
+    if type(fused).__name__ == 'XGBClassifier':
+        _fuse_xgboost(fused, scaler_mean, scaler_scale, feature_names)
+    elif hasattr(fused, 'coef_') and hasattr(fused, 'intercept_'):
+        # النماذج الخطية: w·((x - m) / s) + b = (w / s)·x + (b - w·(m / s))
+        coef = np.asarray(fused.coef_, dtype=np.float64)
+        fused.coef_ = coef / scaler_scale
+        fused.intercept_ = fused.intercept_ - coef @ (scaler_mean / scaler_scale)
+    elif hasattr(fused, 'tree_'):
+        _fuse_tree(fused.tree_, scaler_mean, scaler_scale)
+    elif hasattr(fused, 'estimators_'):
+        for estimator in np.ravel(fused.estimators_):
+            _fuse_tree(estimator.tree_, scaler_mean, scaler_scale)
+    else:
+        raise ValueError(f'Cannot fuse scaler into {type(model).__name__}')
+    
+    return fused
+
+def create_fused_model(model_path='simple_model.pkl', output_path='simple_model_fused.pkl',
+                       data_path='processed_loan_data.csv'):
+    """
+    إنشاء ملف نموذج مدمج لا يحتاج إلى خطوة المقياس أثناء التنبؤ
+
+    Returns:
+        float: نسبة تطابق تنبؤات النموذج المدمج مع الأصلي على بيانات التدريب
+    """
+    with open(model_path, 'rb') as f:
+        model_data = pickle.load(f)
+    
+    fused = fuse_scaler_into_model(model_data['model'], model_data['scaler_mean'],
+                                   model_data['scaler_scale'], model_data.get('feature_names'))
+    
+    # التحقق من تطابق التنبؤات مع النموذج الأصلي على بيانات التدريب
+    features, _ = load_processed_data(data_path)
+    features = features[model_data['feature_names']].to_numpy(dtype=np.float64)
+    original = model_data['model'].predict((features - model_data['scaler_mean']) / model_data['scaler_scale'])
+    agreement = np.mean(fused.predict(features) == original)
+    print(f"نسبة تطابق النموذج المدمج مع الأصلي: {agreement:.4%}")
+    
+    with open(output_path, 'wb') as f:
+        pickle.dump({
+            'model': fused,
+            'feature_names': model_data['feature_names'],
+            'fused': True
+        }, f)
+    
+    print(f"تم حفظ النموذج المدمج في {output_path}")
+    return float(agreement)
+
+def create_compiled_model(model_path='simple_model.pkl', output_path='compiled_model',
+                          data_path='processed_loan_data.csv'):
+    """
+    ترجمة النموذج إلى مصفوفات numpy مسطحة يمكن تقييمها بدون scikit-learn أو xgboost
+
+    تُحفظ كمجلد (ترويسة model.json وملف .npy لكل مصفوفة) يحمّله تطبيق الويب بـ mmap
+    بدون pickle
+
+    Returns:
+        float: نسبة تطابق تنبؤات النموذج المترجم مع الأصلي على بيانات التدريب
+    """
+    with open(model_path, 'rb') as f:
+        model_data = pickle.load(f)
+    
+    compiled = compile_model(model_data['model'], model_data['scaler_mean'], model_data['scaler_scale'])
+    
+    # التحقق من تطابق التنبؤات مع النموذج الأصلي على بيانات التدريب
+    features, _ = load_processed_data(data_path)
+    features = features[model_data['feature_names']].to_numpy(dtype=np.float64)
+    original = model_data['model'].predict((features - model_data['scaler_mean']) / model_data['scaler_scale'])
+    agreement = np.mean(compiled.predict(features) == original)
+    print(f"نسبة تطابق النموذج المترجم مع الأصلي: {agreement:.4%}")
+    
+    save_artifact(compiled, output_path, model_data['feature_names'])
+    print(f"تم حفظ النموذج المترجم في {output_path}")
+    return float(agreement)
+
+def create_simple_prediction_function(data_path='processed_loan_data.csv'):
     """
     تحويل النموذج المدرب إلى دالة بايثون بسيطة
     """
     
     # تحميل النموذج والمقياس
     model = joblib.load('best_loan_model.joblib')
-    training_data = pd.read_csv('processed_loan_data.csv')
+    features, _ = load_processed_data(data_path)
     scaler = StandardScaler()
-    scaler.fit(training_data.drop('Loan_Status', axis=1))
+    scaler.fit(features)
+    
+    # التأكد من أن مرمّز الميزات يستطيع إنتاج نفس أعمدة بيانات التدريب
+    feature_names = list(features.columns)
+    FeatureEncoder(feature_names)
     
     # استخراج معاملات المقياس
     scaler_mean = scaler.mean_
@@ -82,12 +183,7 @@ def create_simple_prediction_function():
         'model': model,
         'scaler_mean': scaler_mean,
         'scaler_scale': scaler_scale,
-        'feature_names': [
-            'Dependents', 'ApplicantIncome', 'CoapplicantIncome', 'LoanAmount',
-            'Loan_Amount_Term', 'Credit_History', 'Gender_Male', 'Married_Yes',
-            'Education_Not Graduate', 'Self_Employed_Yes', 'Property_Area_Semiurban',
-            'Property_Area_Urban'
-        ]
+        'feature_names': feature_names
     }
     
     with open('simple_model.pkl', 'wb') as f:
@@ -97,4 +193,6 @@ def create_simple_prediction_function():
     print("يمكنك الآن استخدام هذا الملف بدون الحاجة لـ scikit-learn أو joblib")
 
 if __name__ == "__main__":
-    create_simple_prediction_function() 
\ No newline at end of file
+    create_simple_prediction_function()
+    create_fused_model()
+    create_compiled_model() 
\ No newline at end of file
@@ -1,129 +1,191 @@
 # Import necessary libraries
+import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.compose import ColumnTransformer
 from imblearn.over_sampling import SMOTE
-
-# ----------------------------
-# Step 1: Load and Inspect Data
-# ----------------------------
-# Read CSV file 
-df = pd.read_csv('loan_prediction.csv')
-
-# Display basic info and first few rows
-print("Initial Data Info:")
-print(df.info())
-print("\nFirst 5 Rows:")
-print(df.head())
-
-# -----------------------------
-# Step 2: Feature Engineering
-# -----------------------------
-# Create new features
-df['Total_Income'] = df['ApplicantIncome'] + df['CoapplicantIncome']
-df['EMI'] = df['LoanAmount'] / df['Loan_Amount_Term']
-df['Balance_Income'] = df['Total_Income'] - (df['EMI'] * 1000)  # Converting EMI to monthly
-df['Income_per_dependent'] = df['Total_Income'] / (df['Dependents'].replace('3+', '3').astype(float) + 1)
-
-# Log transform skewed features
-df['ApplicantIncome'] = np.log1p(df['ApplicantIncome'])
-df['CoapplicantIncome'] = np.log1p(df['CoapplicantIncome'])
-df['LoanAmount'] = np.log1p(df['LoanAmount'])
-df['Total_Income'] = np.log1p(df['Total_Income'])
-
-# -----------------------------
-# Step 3: Visualize Missing Values
-# -----------------------------
-plt.figure(figsize=(12, 6))
-sns.heatmap(df.isnull(), cbar=False, cmap='viridis')
-plt.title('Missing Values Heatmap')
-plt.show()
-
-print("\nMissing Values Summary:")
-print(df.isnull().sum())
-
-# -----------------------------
-# Step 4: Handle Missing Values
-# -----------------------------
-# Fill categorical missing values with mode
-categorical_columns = ['Gender', 'Married', 'Dependents', 'Self_Employed', 'Credit_History']
-for col in categorical_columns:
-    df[col] = df[col].fillna(df[col].mode()[0])
-
-# Fill numerical missing values with median
-numerical_columns = ['LoanAmount', 'Loan_Amount_Term']
-for col in numerical_columns:
-    df[col] = df[col].fillna(df[col].median())
-
-# -----------------------------------
-# Step 5: Feature Analysis and Visualization
-# -----------------------------------
-# Correlation Analysis
-plt.figure(figsize=(12, 8))
-correlation = df.corr()
-sns.heatmap(correlation, annot=True, cmap='coolwarm', linewidths=0.5)
-plt.title('Correlation Matrix')
-plt.show()
-
-# Distribution of numerical features
-numerical_features = ['ApplicantIncome', 'CoapplicantIncome', 'LoanAmount', 'Loan_Amount_Term']
-plt.figure(figsize=(15, 10))
-for i, feature in enumerate(numerical_features, 1):
-    plt.subplot(2, 2, i)
-    sns.histplot(data=df, x=feature, hue='Loan_Status', bins=30)
-    plt.title(f'Distribution of {feature}')
-plt.tight_layout()
-plt.show()
-
-# -----------------------------------
-# Step 6: Encode Categorical Variables
-# -----------------------------------
-# Identify categorical columns
-categorical_cols = ['Gender', 'Married', 'Education', 'Self_Employed', 'Property_Area', 'Dependents']
-
-# Apply One-Hot Encoding
-df_encoded = pd.get_dummies(df, columns=categorical_cols, drop_first=True)
-
-# Encode target variable (Loan_Status) to 0/1
-df_encoded['Loan_Status'] = df_encoded['Loan_Status'].map({'Y': 1, 'N': 0})
-
-# -----------------------------------
-# Step 7: Feature Scaling
-# -----------------------------------
-# Scale numerical features
-scaler = StandardScaler()
-numerical_features = ['ApplicantIncome', 'CoapplicantIncome', 'LoanAmount', 'Loan_Amount_Term', 
-                     'Total_Income', 'EMI', 'Balance_Income', 'Income_per_dependent']
-df_encoded[numerical_features] = scaler.fit_transform(df_encoded[numerical_features])
-
-# -----------------------------------
-# Step 8: Separate Features and Target
-# -----------------------------------
-X = df_encoded.drop(['Loan_ID', 'Loan_Status'], axis=1)
-y = df_encoded['Loan_Status']
-
-# -----------------------------------
-# Step 9: Balance Classes with SMOTE
-# -----------------------------------
-smote = SMOTE(random_state=42)
-X_balanced, y_balanced = smote.fit_resample(X, y)
-
-# Show class distribution after balancing
-plt.figure(figsize=(8, 5))
-sns.countplot(x=y_balanced)
-plt.title('Class Distribution After SMOTE')
-plt.show()
-
-# Recombine balanced data
-balanced_df = pd.concat([pd.DataFrame(X_balanced, columns=X.columns), 
-                        pd.Series(y_balanced, name='Loan_Status')], axis=1)
-
-# -----------------------------------
-# Step 10: Save Processed Data
-# -----------------------------------
-balanced_df.to_csv('processed_loan_data.csv', index=False)
-print("\nPreprocessing complete! Processed data saved to 'processed_loan_data.csv'")
-print("\nShape of processed data:", balanced_df.shape)
+from feature_encoder import DEFAULT_FEATURE_NAMES
+from plotting import PLOT_MODES, Plotter
+
+# Plots are module-level functions so a background process can render them
+def plot_missing_values(missing):
+    plt.figure(figsize=(12, 6))
+    sns.heatmap(missing, cbar=False, cmap='viridis')
+    plt.title('Missing Values Heatmap')
+
+def plot_correlation(correlation):
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(correlation, annot=True, cmap='coolwarm', linewidths=0.5)
+    plt.title('Correlation Matrix')
+
+def plot_distributions(df, numerical_features):
+    plt.figure(figsize=(15, 10))
+    for i, feature in enumerate(numerical_features, 1):
+        plt.subplot(2, 2, i)
+        sns.histplot(data=df, x=feature, hue='Loan_Status', bins=30)
+        plt.title(f'Distribution of {feature}')
+    plt.tight_layout()
+
+def plot_class_distribution(y):
+    plt.figure(figsize=(8, 5))
+    sns.countplot(x=y)
+    plt.title('Class Distribution After SMOTE')
+
+def fill_missing(df):
+    # Fill categorical missing values with mode
+    categorical_columns = ['Gender', 'Married', 'Dependents', 'Self_Employed', 'Credit_History']
+    for col in categorical_columns:
+        df[col] = df[col].fillna(df[col].mode()[0])
+
+    # Fill numerical missing values with median
+    numerical_columns = ['LoanAmount', 'Loan_Amount_Term']
+    for col in numerical_columns:
+        df[col] = df[col].fillna(df[col].median())
+    return df
+
+def preprocess(input_path='loan_prediction.csv', output_path='processed_loan_data.csv', plotter=None):
+    """
+    Clean, encode and balance the raw applications and save the training data
+
+    The saved columns are the serving feature set (DEFAULT_FEATURE_NAMES + Loan_Status)
+    with raw values; model_training scales them. The engineered and log-transformed
+    features are only used for the analysis plots.
+
+    Returns:
+        dict: row counts, missing values and class balance for the pipeline report
+    """
+    plotter = plotter or Plotter('show')
+
+    # ----------------------------
+    # Step 1: Load and Inspect Data
+    # ----------------------------
+    # Read CSV file
+    df = pd.read_csv(input_path)
+
+    # Display basic info and first few rows
+    print("Initial Data Info:")
+    print(df.info())
+    print("\nFirst 5 Rows:")
+    print(df.head())
+
+    # -----------------------------
+    # Step 2: Feature Engineering (analysis)
+    # -----------------------------
+    # Create new features
+    analysis = df.copy()
+    analysis['Total_Income'] = analysis['ApplicantIncome'] + analysis['CoapplicantIncome']
+    analysis['EMI'] = analysis['LoanAmount'] / analysis['Loan_Amount_Term']
+    analysis['Balance_Income'] = analysis['Total_Income'] - (analysis['EMI'] * 1000)  # Converting EMI to monthly
+    analysis['Income_per_dependent'] = analysis['Total_Income'] / (analysis['Dependents'].replace('3+', '3').astype(float) + 1)
+
+    # Log transform skewed features
+    analysis['ApplicantIncome'] = np.log1p(analysis['ApplicantIncome'])
+    analysis['CoapplicantIncome'] = np.log1p(analysis['CoapplicantIncome'])
+    analysis['LoanAmount'] = np.log1p(analysis['LoanAmount'])
+    analysis['Total_Income'] = np.log1p(analysis['Total_Income'])
+
+    # -----------------------------
+    # Step 3: Visualize Missing Values
+    # -----------------------------
+    plotter.plot('missing_values', plot_missing_values, analysis.isnull())
+
+    missing = df.isnull().sum()
+    print("\nMissing Values Summary:")
+    print(missing)
+
+    # -----------------------------
+    # Step 4: Handle Missing Values
+    # -----------------------------
+    fill_missing(df)
+    fill_missing(analysis)
+
+    # -----------------------------------
+    # Step 5: Feature Analysis and Visualization
+    # -----------------------------------
+    # Correlation Analysis (numeric columns only; IDs and categories are text)
+    plotter.plot('correlation_matrix', plot_correlation, analysis.corr(numeric_only=True))
+
+    # Distribution of numerical features
+    numerical_features = ['ApplicantIncome', 'CoapplicantIncome', 'LoanAmount', 'Loan_Amount_Term']
+    plotter.plot('data_distribution', plot_distributions, analysis[numerical_features + ['Loan_Status']],
+                 numerical_features)
+
+    # -----------------------------------
+    # Step 6: Encode Categorical Variables
+    # -----------------------------------
+    # Identify categorical columns (Dependents stays numeric, '3+' -> 3, like FeatureEncoder)
+    categorical_cols = ['Gender', 'Married', 'Education', 'Self_Employed', 'Property_Area']
+
+    # Apply One-Hot Encoding
+    df_encoded = pd.get_dummies(df, columns=categorical_cols, drop_first=True)
+    df_encoded['Dependents'] = df_encoded['Dependents'].replace('3+', '3').astype(float)
+
+    # Encode target variable (Loan_Status) to 0/1
+    df_encoded['Loan_Status'] = df_encoded['Loan_Status'].map({'Y': 1, 'N': 0})
+
+    # -----------------------------------
+    # Step 7: Separate Features and Target
+    # -----------------------------------
+    # Same columns and order as the serving feature encoder
+    X = df_encoded.reindex(columns=DEFAULT_FEATURE_NAMES, fill_value=False)
+    y = df_encoded['Loan_Status']
+
+    # -----------------------------------
+    # Step 8: Balance Classes with SMOTE
+    # -----------------------------------
+    smote = SMOTE(random_state=42)
+    X_balanced, y_balanced = smote.fit_resample(X, y)
+
+    # Show class distribution after balancing
+    plotter.plot('class_distribution', plot_class_distribution, y_balanced)
+
+    # Recombine balanced data
+    balanced_df = pd.concat([pd.DataFrame(X_balanced, columns=X.columns),
+                            pd.Series(y_balanced, name='Loan_Status')], axis=1)
+
+    # -----------------------------------
+    # Step 9: Save Processed Data
+    # -----------------------------------
+    balanced_df.to_csv(output_path, index=False)
+    print(f"\nPreprocessing complete! Processed data saved to '{output_path}'")
+    print("\nShape of processed data:", balanced_df.shape)
+
+    return {
+        'input': input_path,
+        'output': output_path,
+        'rows': len(df),
+        'rows_after_smote': len(balanced_df),
+        'missing_values': {column: int(count) for column, count in missing.items() if count},
+        'class_counts': {str(label): int(count) for label, count in y.value_counts().sort_index().items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Preprocess loan_prediction.csv for model training')
+    parser.add_argument('--input', default='loan_prediction.csv')
+    parser.add_argument('--output', default=None,
+                        help='processed_loan_data.csv; with --chunksize a .parquet file or a directory of '
+                             '.npy arrays (default processed_loan_data)')
+    parser.add_argument('--chunksize', type=int, default=0,
+                        help='rows per chunk for files larger than memory (two passes, no SMOTE, no plots)')
+    parser.add_argument('--plots', choices=PLOT_MODES, default='show',
+                        help='show: open windows; background: save PNGs with Agg; skip: no plots')
+    parser.add_argument('--plots-dir', default='training_plots', help='directory for --plots background')
+    args = parser.parse_args()
+
+    if args.chunksize:
+        from chunked_preprocessing import CHUNKED_OUTPUT, preprocess_chunked
+        try:
+            preprocess_chunked(args.input, args.output or CHUNKED_OUTPUT, args.chunksize)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
+    plotter = Plotter(args.plots, args.plots_dir)
+    try:
+        preprocess(args.input, args.output or 'processed_loan_data.csv', plotter)
+    finally:
+        plotter.close()
+
+if __name__ == '__main__':
+    main()
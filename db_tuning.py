@@ -0,0 +1,151 @@
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+# إعدادات SQLite لكل اتصال جديد
+DEFAULT_PRAGMAS = {
+    # WAL: القراءات الطويلة (EDA / Charts / التصدير) لا تحجب الكتابة والعكس
+    'journal_mode': 'WAL',
+    # NORMAL آمن مع WAL (قد تضيع آخر معاملة فقط عند انقطاع الكهرباء) وأسرع بكثير من FULL
+    'synchronous': 'NORMAL',
+    # ذاكرة صفحات بحجم 64 ميجابايت لكل اتصال (القيمة السالبة بالكيلوبايت)
+    'cache_size': -65536,
+    # قراءة الملف عبر mmap حتى 256 ميجابايت
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    # انتظار قفل الكتابة بدلاً من الفشل فوراً بـ "database is locked"
+    'busy_timeout': 30000,
+}
+# إعدادات لا معنى لها إلا لملف على القرص (تُتجاهل لقاعدة بيانات في الذاكرة)
+FILE_PRAGMAS = ('journal_mode', 'synchronous', 'mmap_size')
+
+
+def is_memory_database(url):
+    """هل العنوان قاعدة بيانات SQLite في الذاكرة (sqlite:// أو :memory: أو mode=memory)"""
+    url = make_url(url)
+    return (url.get_backend_name() == 'sqlite'
+            and (url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'))
+
+
+def sqlite_engine_options(url, pool_size=10, max_overflow=20, pool_timeout=30):
+    """
+    خيارات المحرك (SQLALCHEMY_ENGINE_OPTIONS) لتطبيق Flask متعدد الخيوط
+
+    لملف SQLite: مجمّع اتصالات ثابت بدلاً من فتح الملف مع كل طلب، لذلك تُنفّذ أوامر
+    PRAGMA مرة واحدة لكل اتصال. لقاعدة بيانات في الذاكرة: اتصال واحد مشترك بين الخيوط
+    (StaticPool)، لأن كل اتصال جديد في المجمّع ينشئ قاعدة بيانات فارغة خاصة به.
+    قواعد البيانات الأخرى تستخدم إعدادات SQLAlchemy الافتراضية.
+    """
+    if make_url(url).get_backend_name() != 'sqlite':
+        return {}
+    if is_memory_database(url):
+        return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+    return {
+        'poolclass': QueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'connect_args': {'check_same_thread': False, 'timeout': DEFAULT_PRAGMAS['busy_timeout'] / 1000},
+    }
+
+
+def configure_sqlite(engine, pragmas=None):
+    """تسجيل دالة تضبط أوامر PRAGMA عند فتح كل اتصال SQLite جديد (بدون WAL لقاعدة في الذاكرة)"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+    if is_memory_database(engine.url):
+        pragmas = {name: value for name, value in pragmas.items() if name not in FILE_PRAGMAS}
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def missing_indexes(engine, tables):
+    """الفهارس المعرّفة في النماذج وغير الموجودة في ملف قاعدة البيانات"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def missing_columns(engine, tables):
+    """الأعمدة المعرّفة في النماذج وغير الموجودة في جداول قاعدة البيانات"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        missing.extend(column for column in table.columns if column.name not in existing)
+    return missing
+
+
+def add_missing_columns(engine, tables):
+    """
+    إضافة الأعمدة الجديدة إلى جداول موجودة بـ ALTER TABLE ADD COLUMN
+
+    في SQLite هذه عملية على المخطط فقط (لا تُعاد كتابة الصفوف)، والصفوف
+    الموجودة تأخذ NULL، لذلك تُستدعى عند بدء التطبيق مباشرة.
+
+    Returns:
+        list: الأعمدة المضافة بصيغة table.column
+    """
+    added = []
+    columns = missing_columns(engine, tables)
+    with engine.begin() as connection:
+        for column in columns:
+            if not column.nullable or column.primary_key:
+                raise ValueError(f'Cannot add required column {column.table.name}.{column.name}')
+            column_type = column.type.compile(dialect=engine.dialect)
+            connection.exec_driver_sql(
+                f'ALTER TABLE "{column.table.name}" ADD COLUMN "{column.name}" {column_type}')
+            added.append(f'{column.table.name}.{column.name}')
+    return added
+
+
+def migrate_database(engine, tables):
+    """
+    ترقية ملف قاعدة بيانات موجود: إضافة الأعمدة والفهارس الناقصة وتحديث إحصائيات المخطِّط
+
+    آمنة للتكرار (CREATE INDEX IF NOT EXISTS)، وتحوّل الملف إلى وضع WAL بشكل دائم.
+
+    Returns:
+        list: أسماء الأعمدة والفهارس التي أُنشئت
+    """
+    created = add_missing_columns(engine, tables)
+    indexes = missing_indexes(engine, tables)
+    with engine.begin() as connection:
+        for index in indexes:
+            index.create(connection, checkfirst=True)
+            created.append(index.name)
+        if engine.dialect.name == 'sqlite':
+            connection.execute(text('ANALYZE'))
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+    return created
+
+
+def database_report(engine, tables):
+    """إعدادات الاتصال الحالية والفهارس لكل جدول"""
+    report = {}
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            for name in DEFAULT_PRAGMAS:
+                report[name] = connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    report['indexes'] = {table.name: sorted(index['name'] for index in inspector.get_indexes(table.name))
+                         for table in tables if table.name in existing_tables}
+    return report
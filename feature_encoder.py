@@ -0,0 +1,138 @@
+# numpy يُستورد داخل دوال الترميز فقط: parse_numeric_fields تُستخدم في التحقق من الطلبات
+# وحفظها (bulk_import) بدون numpy، فلا يتأخر بدء تطبيق Flask باستيرادها
+
+# ترتيب الميزات الافتراضي (نفس أعمدة processed_loan_data.csv بدون Loan_Status)
+DEFAULT_FEATURE_NAMES = [
+    'Dependents', 'ApplicantIncome', 'CoapplicantIncome', 'LoanAmount',
+    'Loan_Amount_Term', 'Credit_History', 'Gender_Male', 'Married_Yes',
+    'Education_Not Graduate', 'Self_Employed_Yes', 'Property_Area_Semiurban',
+    'Property_Area_Urban'
+]
+
+
+def parse_dependents(value):
+    """تحويل عدد المعالين إلى رقم ('3+' تعني 3)"""
+    if value == '3+':
+        return 3.0
+    return float(value)
+
+
+# الأعمدة الرقمية: اسم العمود في بيانات التدريب -> (حقل الطلب، دالة التحويل)
+NUMERIC_COLUMNS = {
+    'Dependents': ('dependents', parse_dependents),
+    'ApplicantIncome': ('applicant_income', float),
+    'CoapplicantIncome': ('coapplicant_income', float),
+    'LoanAmount': ('loan_amount', float),
+    'Loan_Amount_Term': ('loan_term', float),
+    'Credit_History': ('credit_history', float),
+}
+
+# الأعمدة الفئوية (one-hot): بادئة العمود -> حقل الطلب
+CATEGORICAL_PREFIXES = {
+    'Gender': 'gender',
+    'Married': 'married',
+    'Education': 'education',
+    'Self_Employed': 'self_employed',
+    'Property_Area': 'property_area',
+    'Dependents': 'dependents',
+}
+
+
+def parse_numeric_fields(data):
+    """
+    تحويل الحقول الرقمية في الطلب إلى float
+
+    Args:
+        data: قاموس يحتوي على بيانات الطلب
+
+    Returns:
+        dict: حقل الطلب -> القيمة الرقمية
+    """
+    return {field: parse(data[field]) for field, parse in NUMERIC_COLUMNS.values()}
+
+
+class FeatureEncoder:
+    """
+    ترميز طلبات القروض إلى مصفوفة ميزات float64
+
+    تُبنى جداول البحث مرة واحدة من قائمة feature_names المحفوظة مع النموذج،
+    لذلك يستخدم التنبؤ والتحويل والتدريب نفس ترتيب الأعمدة دائماً.
+    """
+
+    def __init__(self, feature_names=None):
+        self.feature_names = list(feature_names if feature_names is not None else DEFAULT_FEATURE_NAMES)
+        self.n_features = len(self.feature_names)
+
+        # (رقم العمود، حقل الطلب، دالة التحويل) لكل عمود رقمي
+        self._numeric = []
+        # حقل الطلب -> {الفئة: رقم العمود}
+        self._categorical = {}
+        # حقل الطلب -> رقم العمود الرقمي
+        self.numeric_index = {}
+
+        for index, name in enumerate(self.feature_names):
+            if name in NUMERIC_COLUMNS:
+                field, parse = NUMERIC_COLUMNS[name]
+                self._numeric.append((index, field, parse))
+                self.numeric_index[field] = index
+                continue
+
+            for prefix, field in CATEGORICAL_PREFIXES.items():
+                if name.startswith(prefix + '_'):
+                    category = name[len(prefix) + 1:]
+                    self._categorical.setdefault(field, {})[category] = index
+                    break
+            else:
+                raise ValueError(f'Unknown feature column: {name}')
+
+        self._categorical = list(self._categorical.items())
+
+    def encode_into(self, out, data):
+        """
+        ترميز طلب واحد داخل صف مخصص مسبقاً
+
+        Args:
+            out: مصفوفة float64 بطول n_features
+            data: قاموس يحتوي على بيانات الطلب
+        """
+        out[:] = 0.0
+        for index, field, parse in self._numeric:
+            out[index] = parse(data[field])
+        for field, lookup in self._categorical:
+            index = lookup.get(str(data[field]))
+            if index is not None:
+                out[index] = 1.0
+        return out
+
+    def encode(self, data):
+        """ترميز طلب واحد وإرجاع مصفوفة الميزات"""
+        import numpy as np
+        return self.encode_into(np.empty(self.n_features, dtype=np.float64), data)
+
+    def encode_batch(self, rows):
+        """
+        ترميز مجموعة طلبات في مصفوفة واحدة
+
+        Args:
+            rows: قائمة من القواميس
+
+        Returns:
+            tuple: (مصفوفة الصفوف الصالحة، أرقام الصفوف الصالحة، {رقم الصف: رسالة الخطأ})
+        """
+        import numpy as np
+        features = np.empty((len(rows), self.n_features), dtype=np.float64)
+        valid_indices = []
+        errors = {}
+
+        for i, row in enumerate(rows):
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError('row must be a JSON object')
+                self.encode_into(features[len(valid_indices)], row)
+                valid_indices.append(i)
+            except KeyError as e:
+                errors[i] = f'missing field {e}'
+            except (ValueError, TypeError) as e:
+                errors[i] = str(e)
+
+        return features[:len(valid_indices)], valid_indices, errors
@@ -1,155 +1,139 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-from flask_sqlalchemy import SQLAlchemy
-import pickle
+from flask import (Flask, current_app, g, render_template, request, jsonify, redirect, url_for, Response,
+                   stream_with_context)
+from flask.cli import with_appcontext
+import click
+import logging
+import os
+import queue
 import json
-from datetime import datetime
-from simple_eda import perform_simple_eda
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///loan_requests.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
-
-# تحميل النموذج المبسط من ملف pickle
-try:
-    with open('simple_model.pkl', 'rb') as f:
-        model_data = pickle.load(f)
-    model = model_data['model']
-    scaler_mean = model_data['scaler_mean']
-    scaler_scale = model_data['scaler_scale']
-    print("تم تحميل النموذج المبسط بنجاح")
-except FileNotFoundError:
-    print("تحذير: ملف simple_model.pkl غير موجود. سيتم استخدام التنبؤ البسيط.")
-    model = None
-    scaler_mean = None
-    scaler_scale = None
+import base64
+import hmac
+import threading
+import time
+from datetime import datetime, timedelta
+from flask_sqlalchemy import SQLAlchemy
+import summary_stats
+from bulk_import import (IMPORT_FORMATS, ImportReport, detect_format, import_rows, insert_requests, read_rows,
+                         text_stream, validate_row)
+from write_behind import WriteBehindQueue, exit_on_sigterm
+import db_tuning
+import compact_schema
+from compact_schema import CATEGORY_VALUES, CreditFlag, categorical_type
+from request_export import EXPORT_COLUMNS, EXPORT_FORMATS, detect_export_format, iter_export, parquet_available
+import metrics
+from metrics import STAGE_SECONDS, log_event
+
+# استيراد هذه الوحدة لا ينشئ التطبيق: flask_app.app يُنشأ عند أول استخدام (get_app)، ومعه
+# إنشاء الجداول وخيط تحميل النموذج وإعداد السجلات. إنشاء التطبيق لا يحمّل النموذج ولا numpy:
+# وحدة التنبؤ (prediction_service) تُستورد عند أول تنبؤ أو في خيط خلفي بعد الإنشاء، ووحدات
+# التحليل (sql_eda و simple_eda) عند أول عرض لنتائج EDA أو بأمر rebuild-stats، والبيانات
+# التجريبية بأمر flask seed.
+
+db = SQLAlchemy()
+
+logger = logging.getLogger(__name__)
+
+# المخطط المضغوط: الحقول الفئوية كرموز رقمية و credit_history كقيمة منطقية
+# (يُحدد قبل إنشاء الجداول؛ لتحويل قاعدة بيانات موجودة: flask compact-db)
+COMPACT_SCHEMA = os.environ.get('LOAN_COMPACT_SCHEMA', '0') == '1'
 
 # نموذج قاعدة البيانات
 class LoanRequest(db.Model):
+    # في المخطط المضغوط تبقى الخصائص نصوصاً (و credit_history رقماً) في ORM والقوالب
     id = db.Column(db.Integer, primary_key=True)
-    gender = db.Column(db.String(10))
-    married = db.Column(db.String(5))
-    dependents = db.Column(db.String(5))
-    education = db.Column(db.String(20))
-    self_employed = db.Column(db.String(5))
+    gender = db.Column(categorical_type('gender', 10, COMPACT_SCHEMA))
+    married = db.Column(categorical_type('married', 5, COMPACT_SCHEMA))
+    dependents = db.Column(categorical_type('dependents', 5, COMPACT_SCHEMA))
+    education = db.Column(categorical_type('education', 20, COMPACT_SCHEMA))
+    self_employed = db.Column(categorical_type('self_employed', 5, COMPACT_SCHEMA))
     applicant_income = db.Column(db.Float)
     coapplicant_income = db.Column(db.Float)
     loan_amount = db.Column(db.Float)
     loan_term = db.Column(db.Integer)
-    credit_history = db.Column(db.Float)
-    property_area = db.Column(db.String(20))
-    prediction = db.Column(db.String(10))
+    credit_history = db.Column(CreditFlag() if COMPACT_SCHEMA else db.Float)
+    property_area = db.Column(categorical_type('property_area', 20, COMPACT_SCHEMA))
+    prediction = db.Column(categorical_type('prediction', 10, COMPACT_SCHEMA))
     request_date = db.Column(db.DateTime, default=datetime.utcnow)
+    # نسخة النموذج التي قيّمت الطلب (بصمة ملفات النموذج أو 'fallback')
+    model_version = db.Column(db.String(40))
 
-def simple_predict_fallback(data):
+    # فهارس لأنماط الوصول: الترتيب بالتاريخ في صفحة العرض (مع التصفية بالنتيجة أو
+    # المنطقة)، وتجميع EDA وإعادة بناء الإحصائيات حسب الجنس والتعليم ونتيجة التنبؤ.
+    # SQLite يضيف id تلقائياً لنهاية كل فهرس، فيكفي لترتيب (request_date, id).
+    __table_args__ = (
+        db.Index('ix_loan_request_request_date', 'request_date'),
+        db.Index('ix_loan_request_prediction_date', 'prediction', 'request_date'),
+        db.Index('ix_loan_request_property_area_date', 'property_area', 'request_date'),
+        db.Index('ix_loan_request_gender_prediction', 'gender', 'prediction'),
+        db.Index('ix_loan_request_education_prediction', 'education', 'prediction'),
+    )
+
+# المسارات وأوامر CLI تُجمع هنا ويضيفها create_app إلى كل تطبيق ينشئه
+# (بنفس أسماء المسارات بدون بادئة، فتبقى url_for('view_requests') في القوالب كما هي)
+ROUTES = []
+COMMANDS = []
+
+def route(rule, **options):
+    """مثل app.route، لكن المسار يُضاف عند إنشاء التطبيق"""
+    def decorator(view):
+        ROUTES.append((rule, view, options))
+        return view
+    return decorator
+
+def cli_command(name):
+    """مثل app.cli.command: أمر click يعمل داخل سياق التطبيق"""
+    def decorator(function):
+        command = click.command(name)(with_appcontext(function))
+        COMMANDS.append(command)
+        return command
+    return decorator
+
+_prediction_lock = threading.Lock()
+
+def prediction_service(app=None):
     """
-    دالة تنبؤ بسيطة كبديل إذا لم يكن النموذج المدرب متاحاً
+    خدمة التنبؤ للتطبيق (النموذج والذاكرة المؤقتة)، تُنشأ عند أول استخدام
+
+    أول استدعاء يستورد numpy ووحدات النموذج؛ النموذج نفسه يُحمّل عند أول تنبؤ
+    (أو مسبقاً بـ preload_model).
     """
-    applicant_income = float(data['applicant_income'])
-    loan_amount = float(data['loan_amount'])
-    credit_history = float(data['credit_history'])
-    
-    # منطق بسيط: إذا الدخل عالي والقرض صغير والتاريخ الائتماني جيد، موافق
-    if applicant_income > 5000 and loan_amount < 200 and credit_history == 1:
-        return 1  # موافق
-    elif applicant_income > 3000 and loan_amount < 100:
-        return 1  # موافق
-    else:
-        return 0  # مرفوض
+    app = app or current_app._get_current_object()
+    service = app.extensions.get('loan_prediction')
+    if service is None:
+        with _prediction_lock:
+            service = app.extensions.get('loan_prediction')
+            if service is None:
+                from prediction_service import PredictionService
+                service = app.extensions['loan_prediction'] = PredictionService(app.config)
+    return service
+
+def preload_model(app):
+    """تحميل النموذج في خيط خلفي، فيبدأ الخادم باستقبال الطلبات دون انتظاره"""
+    thread = threading.Thread(target=lambda: prediction_service(app).registry.load_initial(),
+                              name='model-preload', daemon=True)
+    thread.start()
+    return thread
 
-def predict_with_model(data_dict):
+def predict_request(data):
     """
-    التنبؤ باستخدام النموذج المدرب
+    التنبؤ لطلب واحد بالنموذج المدرب أو بالبديل البسيط
+
+    Returns:
+        tuple: (1 للموافقة و 0 للرفض، نسخة النموذج التي قيّمت الطلب)
     """
-    # تحويل البيانات إلى القيم المطلوبة
-    dependents = data_dict['dependents']
-    if dependents == '3+':
-        dependents = 3.0
-    else:
-        dependents = float(dependents)
-        
-    applicant_income = float(data_dict['applicant_income'])
-    coapplicant_income = float(data_dict['coapplicant_income'])
-    loan_amount = float(data_dict['loan_amount'])
-    loan_term = float(data_dict['loan_term'])
-    credit_history = float(data_dict['credit_history'])
-    
-    gender_male = 1 if data_dict['gender'] == 'Male' else 0
-    married_yes = 1 if data_dict['married'] == 'Yes' else 0
-    education_not_graduate = 1 if data_dict['education'] == 'Not Graduate' else 0
-    self_employed_yes = 1 if data_dict['self_employed'] == 'Yes' else 0
-    property_area_semiurban = 1 if data_dict['property_area'] == 'Semiurban' else 0
-    property_area_urban = 1 if data_dict['property_area'] == 'Urban' else 0
-    
-    # إنشاء مصفوفة الميزات بالترتيب الصحيح
-    features = [
-        dependents,
-        applicant_income,
-        coapplicant_income,
-        loan_amount,
-        loan_term,
-        credit_history,
-        gender_male,
-        married_yes,
-        education_not_graduate,
-        self_employed_yes,
-        property_area_semiurban,
-        property_area_urban
-    ]
-    
-    # تطبيق المقياس يدوياً
-    features_scaled = [(f - scaler_mean[i]) / scaler_scale[i] for i, f in enumerate(features)]
-    
-    # التنبؤ باستخدام النموذج
-    prediction = model.predict([features_scaled])[0]
-    
-    return int(prediction)
-
-def preprocess_form_data(data):
-    """
-    معالجة بيانات النموذج بدون استخدام pandas أو scikit-learn
-    """
-    # تحويل البيانات إلى القيم المطلوبة
-    dependents = data['dependents']
-    if dependents == '3+':
-        dependents = 3.0
-    else:
-        dependents = float(dependents)
-        
-    applicant_income = float(data['applicant_income'])
-    coapplicant_income = float(data['coapplicant_income'])
-    loan_amount = float(data['loan_amount'])
-    loan_term = float(data['loan_term'])
-    credit_history = float(data['credit_history'])
-    
-    gender_male = 1 if data['gender'] == 'Male' else 0
-    married_yes = 1 if data['married'] == 'Yes' else 0
-    education_not_graduate = 1 if data['education'] == 'Not Graduate' else 0
-    self_employed_yes = 1 if data['self_employed'] == 'Yes' else 0
-    property_area_semiurban = 1 if data['property_area'] == 'Semiurban' else 0
-    property_area_urban = 1 if data['property_area'] == 'Urban' else 0
-    
-    # إرجاع البيانات كقاموس
-    return {
-        'dependents': dependents,
-        'applicant_income': applicant_income,
-        'coapplicant_income': coapplicant_income,
-        'loan_amount': loan_amount,
-        'loan_term': loan_term,
-        'credit_history': credit_history,
-        'gender': data['gender'],
-        'married': data['married'],
-        'education': data['education'],
-        'self_employed': data['self_employed'],
-        'property_area': data['property_area']
-    }
+    return prediction_service().predict_request(data)
 
-with app.app_context():
-    db.create_all()
-    
-    # إضافة بيانات تجريبية إذا كانت قاعدة البيانات فارغة
-    if LoanRequest.query.count() == 0:
+def predict_batch(rows):
+    """التنبؤ لمجموعة من الطلبات دفعة واحدة (انظر PredictionService.predict_batch)"""
+    return prediction_service().predict_batch(rows)
+
+def prediction_confidence(model_version=None):
+    """وصف مستوى الثقة في التنبؤ حسب النموذج المستخدم (نسخة الطلب أو النسخة الحالية)"""
+    return prediction_service().confidence(model_version)
+
+def seed_sample_data():
+    """إضافة بيانات تجريبية إذا كانت قاعدة البيانات فارغة"""
+    if LoanRequest.query.first() is None:
         print("إنشاء بيانات تجريبية...")
         sample_data = [
             LoanRequest(
@@ -183,116 +167,323 @@ with app.app_context():
                 property_area='Semiurban', prediction='Rejected'
             )
         ]
-        
+
         for data in sample_data:
             db.session.add(data)
-        
+        # البيانات التجريبية تُحسب في جدول الإحصائيات مثل أي طلب آخر
+        summary_stats.record_requests(db.session, sample_data)
+
         db.session.commit()
         print("تم إنشاء البيانات التجريبية بنجاح!")
 
-@app.route('/')
+def init_database():
+    """
+    إنشاء الجداول الناقصة وترقية قاعدة بيانات موجودة (داخل سياق التطبيق)
+
+    لا تكتب بيانات تجريبية (flask seed)، وعلى قاعدة بيانات محدّثة تقتصر على
+    قراءة المخطط.
+    """
+    # أعمدة أُضيفت إلى LoanRequest بعد إنشاء قاعدة البيانات (مثل model_version)
+    db_tuning.add_missing_columns(db.engine, [LoanRequest.__table__])
+
+    # جدول طلبات موجود بمخطط مختلف عن LOAN_COMPACT_SCHEMA لا يمكن قراءته
+    stored_compact = compact_schema.is_compact(db.engine, LoanRequest.__table__)
+    if stored_compact is not None and stored_compact != COMPACT_SCHEMA:
+        log_event(logger, logging.WARNING, 'schema_mismatch', compact_schema=COMPACT_SCHEMA,
+                  fix='LOAN_COMPACT_SCHEMA=1 FLASK_APP=flask_app.py flask compact-db')
+        return
+
+    db.create_all()
+    if COMPACT_SCHEMA:
+        compact_schema.metadata.create_all(db.engine)
+        with db.engine.begin() as connection:
+            compact_schema.sync_lookup(connection)
+
+    # قاعدة بيانات أُنشئت قبل إضافة الفهارس
+    pending_indexes = db_tuning.missing_indexes(db.engine, [LoanRequest.__table__])
+    if pending_indexes:
+        log_event(logger, logging.WARNING, 'missing_indexes', count=len(pending_indexes),
+                  fix='FLASK_APP=flask_app.py flask migrate-db')
+    summary_stats.metadata.create_all(db.engine)
+
+    # بناء جدول الإحصائيات لقاعدة بيانات موجودة قبل إضافته
+    if summary_stats.is_empty(db.session) and LoanRequest.query.first() is not None:
+        summary_stats.rebuild_summary(db.session, LoanRequest)
+
+def write_requests(app, mappings):
+    """كتابة دفعة من طابور الكتابة المؤجلة (تُستدعى من الخيط الخلفي)"""
+    with app.app_context():
+        insert_requests(db.session, LoanRequest, mappings)
+
+@route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/add_request', methods=['GET', 'POST'])
+@route('/add_request', methods=['GET', 'POST'])
 def add_request():
     if request.method == 'POST':
-        data = request.form.to_dict()
+        with STAGE_SECONDS.time(stage='parse'):
+            data = request.form.to_dict()
         
-        # معالجة البيانات
-        processed_data = preprocess_form_data(data)
+        # التحقق قبل التنبؤ والحفظ في المسارين (المخطط المضغوط لا يقبل قيماً فئوية غير معروفة)
+        try:
+            record = validate_row(data, import_categories())
+        except (KeyError, ValueError, TypeError) as e:
+            return render_template('add_request.html', error=f'بيانات غير صالحة: {e}'), 400
         
         # التنبؤ باستخدام النموذج المدرب أو البديل البسيط
-        if model is not None:
-            prediction = predict_with_model(data)
-        else:
-            prediction = simple_predict_fallback(processed_data)
+        prediction, model_version = predict_request(data)
+        prediction = 'Approved' if prediction == 1 else 'Rejected'
+        record['prediction'] = prediction
+        record['model_version'] = model_version
+        record['request_date'] = datetime.utcnow()
+        
+        # الكتابة المؤجلة: الإضافة إلى الطابور والرد فوراً
+        write_queue = current_app.extensions.get('loan_write_queue')
+        if write_queue is not None:
+            try:
+                write_queue.submit(record)
+                return redirect(url_for('view_requests'))
+            except queue.Full:
+                # الطابور ممتلئ أو متوقف: كتابة مباشرة
+                pass
         
         # حفظ الطلب في قاعدة البيانات
-        loan_request = LoanRequest(
-            gender=processed_data['gender'],
-            married=processed_data['married'],
-            dependents=data['dependents'],  # القيمة الأصلية
-            education=processed_data['education'],
-            self_employed=processed_data['self_employed'],
-            applicant_income=processed_data['applicant_income'],
-            coapplicant_income=processed_data['coapplicant_income'],
-            loan_amount=processed_data['loan_amount'],
-            loan_term=int(processed_data['loan_term']),
-            credit_history=processed_data['credit_history'],
-            property_area=processed_data['property_area'],
-            prediction='Approved' if prediction == 1 else 'Rejected'
-        )
+        loan_request = LoanRequest(**record)
         
         db.session.add(loan_request)
-        db.session.commit()
+        # تحديث جدول الإحصائيات في نفس المعاملة
+        summary_stats.record_requests(db.session, [loan_request])
+        with STAGE_SECONDS.time(stage='db_commit'):
+            db.session.commit()
         
         return redirect(url_for('view_requests'))
         
     return render_template('add_request.html')
 
-@app.route('/view_requests')
+def parse_request_filters(args):
+    """
+    قراءة معاملات التصفية من الرابط والتحقق منها
+    
+    Returns:
+        dict: المعاملات المستخدمة فقط كنصوص (لإعادة استخدامها في الروابط)
+        
+    Raises:
+        ValueError: إذا كانت قيمة التصفية أو التاريخ أو الدخل غير صالحة
+    """
+    filters = {}
+    for key in ('prediction', 'property_area', 'date_from', 'date_to', 'min_income', 'max_income'):
+        value = args.get(key, '').strip()
+        if not value:
+            continue
+        if key in ('prediction', 'property_area'):
+            if value not in CATEGORY_VALUES[key]:
+                raise ValueError(f'invalid {key}: {value}')
+        elif key in ('date_from', 'date_to'):
+            datetime.strptime(value, '%Y-%m-%d')
+        elif key in ('min_income', 'max_income'):
+            float(value)
+        filters[key] = value
+    return filters
+
+def filtered_requests_query(filters):
+    """بناء استعلام الطلبات بعد تطبيق شروط التصفية"""
+    query = LoanRequest.query
+    if 'prediction' in filters:
+        query = query.filter(LoanRequest.prediction == filters['prediction'])
+    if 'property_area' in filters:
+        query = query.filter(LoanRequest.property_area == filters['property_area'])
+    if 'date_from' in filters:
+        query = query.filter(LoanRequest.request_date >= datetime.strptime(filters['date_from'], '%Y-%m-%d'))
+    if 'date_to' in filters:
+        # تاريخ النهاية شامل لليوم كاملاً
+        date_to = datetime.strptime(filters['date_to'], '%Y-%m-%d') + timedelta(days=1)
+        query = query.filter(LoanRequest.request_date < date_to)
+    if 'min_income' in filters:
+        query = query.filter(LoanRequest.applicant_income >= float(filters['min_income']))
+    if 'max_income' in filters:
+        query = query.filter(LoanRequest.applicant_income <= float(filters['max_income']))
+    return query
+
+def encode_cursor(loan_request):
+    """مؤشر الصفحة التالية: تاريخ ورقم آخر طلب في الصفحة"""
+    date = loan_request.request_date.isoformat() if loan_request.request_date else ''
+    return base64.urlsafe_b64encode(f'{date}|{loan_request.id}'.encode()).decode()
+
+def apply_cursor(query, cursor):
+    """
+    تطبيق ترقيم الصفحات بالمفتاح (keyset) على الترتيب (request_date DESC, id DESC)
+    بدلاً من OFFSET، لذلك تبقى تكلفة كل صفحة ثابتة مهما كان عمقها
+    """
+    try:
+        date, request_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        request_id = int(request_id)
+        date = datetime.fromisoformat(date) if date else None
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('invalid cursor')
+    
+    # التواريخ الفارغة تأتي في آخر الترتيب التنازلي في SQLite
+    if date is None:
+        return query.filter(LoanRequest.request_date.is_(None), LoanRequest.id < request_id)
+    return query.filter(db.or_(
+        LoanRequest.request_date < date,
+        db.and_(LoanRequest.request_date == date, LoanRequest.id < request_id),
+        LoanRequest.request_date.is_(None)
+    ))
+
+def fetch_requests_page(args):
+    """
+    جلب صفحة واحدة من الطلبات حسب معاملات الرابط (التصفية، cursor، limit)
+    
+    Returns:
+        tuple: (الطلبات، مؤشر الصفحة التالية أو None، التصفية المستخدمة، حجم الصفحة)
+    """
+    filters = parse_request_filters(args)
+    limit = int(args.get('limit', current_app.config['REQUESTS_PAGE_SIZE']))
+    limit = max(1, min(limit, current_app.config['REQUESTS_MAX_PAGE_SIZE']))
+    
+    query = filtered_requests_query(filters)
+    if args.get('cursor'):
+        query = apply_cursor(query, args['cursor'])
+    
+    # جلب صف إضافي لمعرفة وجود صفحة تالية
+    rows = query.order_by(LoanRequest.request_date.desc(), LoanRequest.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor, filters, limit
+
+def serialize_request(loan_request):
+    """تحويل الطلب إلى قاموس قابل للتحويل إلى JSON"""
+    return {
+        'id': loan_request.id,
+        'request_date': loan_request.request_date.isoformat() if loan_request.request_date else None,
+        'gender': loan_request.gender,
+        'married': loan_request.married,
+        'dependents': loan_request.dependents,
+        'education': loan_request.education,
+        'self_employed': loan_request.self_employed,
+        'applicant_income': loan_request.applicant_income,
+        'coapplicant_income': loan_request.coapplicant_income,
+        'loan_amount': loan_request.loan_amount,
+        'loan_term': loan_request.loan_term,
+        'credit_history': loan_request.credit_history,
+        'property_area': loan_request.property_area,
+        'prediction': loan_request.prediction,
+        'model_version': loan_request.model_version
+    }
+
+def export_rows(filters):
+    """
+    مؤشر على الطلبات المصفّاة كـ tuples بترتيب EXPORT_COLUMNS
+    
+    يُجلب الجدول على دفعات بـ yield_per بترتيب المفتاح الأساسي، لذلك لا يُحمّل
+    أكثر من دفعة واحدة في الذاكرة مهما كان عدد الصفوف.
+    """
+    columns = [getattr(LoanRequest, column) for column in EXPORT_COLUMNS]
+    return (filtered_requests_query(filters)
+            .with_entities(*columns)
+            .order_by(LoanRequest.id)
+            .yield_per(current_app.config['EXPORT_BATCH_SIZE']))
+
+@route('/view_requests')
 def view_requests():
-    requests = LoanRequest.query.all()
-    return render_template('view_requests.html', requests=requests)
+    try:
+        requests, next_cursor, filters, limit = fetch_requests_page(request.args)
+    except ValueError as e:
+        return render_template('view_requests.html', requests=[], filters={}, next_cursor=None,
+                               limit=current_app.config['REQUESTS_PAGE_SIZE'], error=str(e))
+    return render_template('view_requests.html', requests=requests, filters=filters,
+                           next_cursor=next_cursor, limit=limit)
+
+@route('/api/requests')
+def api_requests():
+    """
+    API endpoint لقائمة الطلبات مع التصفية وترقيم الصفحات بالمفتاح
+    """
+    try:
+        requests, next_cursor, filters, limit = fetch_requests_page(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'items': [serialize_request(r) for r in requests],
+        'next_cursor': next_cursor,
+        'filters': filters,
+        'limit': limit
+    })
 
-@app.route('/delete_request/<int:id>')
+@route('/api/export')
+def api_export():
+    """
+    تصدير الطلبات كتدفق CSV أو NDJSON أو Parquet بنفس معاملات التصفية في صفحة العرض
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown format (expected one of {', '.join(EXPORT_FORMATS)})"}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export requires pyarrow'}), 501
+    try:
+        filters = parse_request_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(iter_export(export_rows(filters), fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=loan_requests.{extension}'}
+    )
+
+@route('/delete_request/<int:id>')
 def delete_request(id):
     request_to_delete = LoanRequest.query.get_or_404(id)
+    summary_stats.record_requests(db.session, [request_to_delete], sign=-1)
     db.session.delete(request_to_delete)
-    db.session.commit()
+    with STAGE_SECONDS.time(stage='db_commit'):
+        db.session.commit()
     return redirect(url_for('view_requests'))
 
-@app.route('/eda')
+@route('/eda')
 def eda():
     """صفحة تحليل البيانات الاستكشافي"""
     try:
-        # الحصول على جميع الطلبات من قاعدة البيانات
-        requests = LoanRequest.query.all()
+        # قراءة التحليل من جدول الإحصائيات المحدّث تراكمياً بدلاً من تحميل كل الطلبات
+        analysis_results = summary_stats.summary_eda_results(summary_stats.load_summary(db.session, LoanRequest))
         
-        if not requests:
+        if analysis_results.get('total_requests', 0) == 0:
             return render_template('eda.html', 
                                  error="لا توجد طلبات قروض في قاعدة البيانات للتحليل.")
         
-        # طباعة تشخيص إضافي
-        print(f"=== تشخيص EDA ===")
-        print(f"عدد الطلبات: {len(requests)}")
-        for i, req in enumerate(requests):
-            print(f"طلب {i+1}: {req.prediction} - {req.gender} - {req.applicant_income}")
-        
-        # تنفيذ التحليل
-        analysis_results = perform_simple_eda(requests)
-        
-        # طباعة نتائج التحليل
-        print(f"نتائج التحليل: {analysis_results}")
+        # نتائج التحليل كاملة في السجل (DEBUG فقط، لعيّنة من الطلبات)
+        log_event(logger, logging.DEBUG, 'eda_results', sample_rate=current_app.config['LOG_SAMPLE_RATE'],
+                  results=analysis_results)
         
         if 'error' in analysis_results:
             return render_template('eda.html', error=analysis_results['error'])
         
-        # طباعة تفاصيل توزيع الموافقات
-        if 'approval_distribution' in analysis_results:
-            print(f"توزيع الموافقات: {analysis_results['approval_distribution']}")
-        
         return render_template('eda.html', analysis=analysis_results)
         
     except Exception as e:
-        print(f"خطأ في EDA: {e}")
+        log_event(logger, logging.ERROR, 'eda_failed', error=str(e))
         return render_template('eda.html', 
                              error=f"حدث خطأ أثناء تحليل البيانات: {str(e)}")
 
-@app.route('/charts')
+@route('/charts')
 def charts():
     """صفحة الرسوم البيانية التفاعلية"""
     try:
-        # الحصول على جميع الطلبات من قاعدة البيانات
-        requests = LoanRequest.query.all()
+        # قراءة الإحصائيات المحسوبة مسبقاً بدلاً من تحميل جميع الطلبات
+        summary = summary_stats.load_summary(db.session, LoanRequest)
         
-        if not requests:
+        if not summary['total']:
             return render_template('charts.html', 
                                  error="لا توجد طلبات قروض في قاعدة البيانات للتحليل.")
         
+        # أحدث الطلبات فقط لرسم الدخل مقابل مبلغ القرض
+        recent_requests = LoanRequest.query.order_by(LoanRequest.id.desc()) \
+            .limit(current_app.config['CHARTS_RECENT_REQUESTS']).all()[::-1]
+        
         # تحضير البيانات للرسوم البيانية
-        chart_data = prepare_chart_data(requests)
+        chart_data = prepare_chart_data(summary, recent_requests)
         
         return render_template('charts.html', chart_data=chart_data)
         
@@ -300,12 +491,15 @@ def charts():
         return render_template('charts.html', 
                              error=f"حدث خطأ أثناء تحليل البيانات: {str(e)}")
 
-def prepare_chart_data(requests):
-    """تحضير البيانات للرسوم البيانية"""
-    from collections import Counter
+def prepare_chart_data(summary, recent_requests):
+    """تحضير البيانات للرسوم البيانية من جدول الإحصائيات"""
+    categories = summary['categories']
+    
+    def counts(field):
+        return {value: count for value, (count, _) in categories[field].items()}
     
     # بيانات توزيع الموافقات
-    approval_counts = Counter(req.prediction for req in requests)
+    approval_counts = counts('prediction')
     approval_data = {
         'labels': ['موافق', 'مرفوض'],
         'values': [approval_counts.get('Approved', 0), approval_counts.get('Rejected', 0)],
@@ -313,7 +507,7 @@ def prepare_chart_data(requests):
     }
     
     # بيانات توزيع الجنس
-    gender_counts = Counter(req.gender for req in requests if req.gender)
+    gender_counts = counts('gender')
     gender_data = {
         'labels': list(gender_counts.keys()),
         'values': list(gender_counts.values()),
@@ -321,7 +515,7 @@ def prepare_chart_data(requests):
     }
     
     # بيانات توزيع الحالة الاجتماعية
-    married_counts = Counter(req.married for req in requests if req.married)
+    married_counts = counts('married')
     married_data = {
         'labels': list(married_counts.keys()),
         'values': list(married_counts.values()),
@@ -329,7 +523,7 @@ def prepare_chart_data(requests):
     }
     
     # بيانات توزيع التعليم
-    education_counts = Counter(req.education for req in requests if req.education)
+    education_counts = counts('education')
     education_data = {
         'labels': list(education_counts.keys()),
         'values': list(education_counts.values()),
@@ -337,51 +531,34 @@ def prepare_chart_data(requests):
     }
     
     # بيانات توزيع المنطقة
-    area_counts = Counter(req.property_area for req in requests if req.property_area)
+    area_counts = counts('property_area')
     area_data = {
         'labels': list(area_counts.keys()),
         'values': list(area_counts.values()),
         'colors': ['#17a2b8', '#28a745', '#ffc107']
     }
     
-    # بيانات الدخل مقابل مبلغ القرض
+    # بيانات الدخل مقابل مبلغ القرض (أحدث الطلبات)
     income_loan_data = {
-        'labels': [f'طلب {i+1}' for i in range(len(requests))],
-        'incomes': [req.applicant_income for req in requests if req.applicant_income],
-        'loan_amounts': [req.loan_amount for req in requests if req.loan_amount],
-        'predictions': [req.prediction for req in requests]
+        'labels': [f'طلب {req.id}' for req in recent_requests],
+        'incomes': [req.applicant_income for req in recent_requests if req.applicant_income],
+        'loan_amounts': [req.loan_amount for req in recent_requests if req.loan_amount],
+        'predictions': [req.prediction for req in recent_requests]
     }
     
     # بيانات التاريخ الائتماني
+    credit_counts = counts('credit_history')
     credit_data = {
         'labels': ['تاريخ جيد', 'تاريخ سيء'],
-        'values': [
-            sum(1 for req in requests if req.credit_history == 1),
-            sum(1 for req in requests if req.credit_history == 0)
-        ],
+        'values': [credit_counts.get('1.0', 0), credit_counts.get('0.0', 0)],
         'colors': ['#28a745', '#dc3545']
     }
     
     # بيانات نسبة الموافقة حسب العوامل
     approval_rates = {}
-    
-    # نسبة الموافقة حسب الجنس
-    for gender in gender_counts.keys():
-        approved = sum(1 for req in requests if req.gender == gender and req.prediction == 'Approved')
-        total = gender_counts[gender]
-        approval_rates[f'gender_{gender}'] = round((approved / total) * 100, 1) if total > 0 else 0
-    
-    # نسبة الموافقة حسب التعليم
-    for education in education_counts.keys():
-        approved = sum(1 for req in requests if req.education == education and req.prediction == 'Approved')
-        total = education_counts[education]
-        approval_rates[f'education_{education}'] = round((approved / total) * 100, 1) if total > 0 else 0
-    
-    # نسبة الموافقة حسب المنطقة
-    for area in area_counts.keys():
-        approved = sum(1 for req in requests if req.property_area == area and req.prediction == 'Approved')
-        total = area_counts[area]
-        approval_rates[f'area_{area}'] = round((approved / total) * 100, 1) if total > 0 else 0
+    for prefix, field in (('gender', 'gender'), ('education', 'education'), ('area', 'property_area')):
+        for value, (total, approved) in categories[field].items():
+            approval_rates[f'{prefix}_{value}'] = round((approved / total) * 100, 1) if total > 0 else 0
     
     return {
         'approval': approval_data,
@@ -392,47 +569,275 @@ def prepare_chart_data(requests):
         'income_loan': income_loan_data,
         'credit': credit_data,
         'approval_rates': approval_rates,
-        'total_requests': len(requests)
+        'total_requests': summary['total']
     }
 
-@app.route('/api/predict', methods=['POST'])
+@route('/api/predict', methods=['POST'])
 def api_predict():
     """
     API endpoint للتنبؤ بدون حفظ في قاعدة البيانات
     """
     try:
-        data = request.get_json()
+        with STAGE_SECONDS.time(stage='parse'):
+            data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
         # التنبؤ
-        if model is not None:
-            prediction = predict_with_model(data)
-        else:
-            processed_data = preprocess_form_data(data)
-            prediction = simple_predict_fallback(processed_data)
+        prediction, model_version = predict_request(data)
+        log_event(logger, logging.DEBUG, 'prediction', sample_rate=current_app.config['LOG_SAMPLE_RATE'],
+                  prediction=prediction, model_version=model_version)
         
         return jsonify({
             'prediction': 'Approved' if prediction == 1 else 'Rejected',
-            'confidence': 'High' if model is not None else 'Low (using fallback)'
+            'confidence': prediction_confidence(model_version),
+            'model_version': model_version
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/model_metrics')
+def parse_batch_text(body):
+    """
+    قراءة جسم الطلب الجماعي كمصفوفة JSON أو كأسطر NDJSON
+    
+    Returns:
+        list: أزواج (الصف، الخطأ) بنفس ترتيب المدخلات
+    
+    Raises:
+        ValueError: إذا كانت مصفوفة JSON غير صالحة
+    """
+    if body.lstrip().startswith('['):
+        rows = json.loads(body)
+        return [(row, None) for row in rows]
+    
+    # NDJSON: كائن JSON واحد في كل سطر، مع تسجيل أخطاء التحليل لكل سطر
+    parsed = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            parsed.append((json.loads(line), None))
+        except ValueError as e:
+            parsed.append((None, f'invalid JSON: {e}'))
+    return parsed
+
+def parse_batch_body():
+    """قراءة جسم طلب Flask الجماعي (انظر parse_batch_text)"""
+    return parse_batch_text(request.get_data(as_text=True))
+
+def score_parsed_batch(parsed):
+    """
+    التنبؤ لصفوف parse_batch_text مع إعادة النتائج بترتيب المدخلات الأصلي
+    
+    Returns:
+        list: {'index', 'prediction'} أو {'index', 'error'} لكل صف
+    """
+    valid_indices = [i for i, (_, error) in enumerate(parsed) if error is None]
+    batch_results = predict_batch([parsed[i][0] for i in valid_indices])
+    
+    results = [{'index': i, 'error': error} for i, (_, error) in enumerate(parsed)]
+    for i, result in zip(valid_indices, batch_results):
+        result['index'] = i
+        results[i] = result
+    return results
+
+@route('/api/predict/batch', methods=['POST'])
+def api_predict_batch():
+    """
+    API endpoint للتنبؤ بمجموعة طلبات دفعة واحدة (JSON array أو NDJSON)
+    """
+    try:
+        with STAGE_SECONDS.time(stage='parse'):
+            parsed = parse_batch_body()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid JSON body: {e}'}), 400
+    
+    if not parsed:
+        return jsonify({'error': 'No data provided'}), 400
+    if len(parsed) > current_app.config['PREDICT_BATCH_MAX_ROWS']:
+        return jsonify({'error': f"Too many rows (max {current_app.config['PREDICT_BATCH_MAX_ROWS']})"}), 413
+    
+    try:
+        results = score_parsed_batch(parsed)
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'errors': sum(1 for r in results if 'error' in r),
+            'confidence': prediction_confidence()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def import_categories():
+    """القيم الفئوية المسموح بها عند الاستيراد (المخطط المضغوط لا يقبل قيماً غير معروفة)"""
+    return CATEGORY_VALUES if COMPACT_SCHEMA else None
+
+@route('/api/import', methods=['POST'])
+def api_import():
+    """
+    استيراد جماعي لطلبات بصيغة loan_prediction.csv أو NDJSON مع التقييم والحفظ
+    
+    يُقرأ الملف كتدفق (رفع ملف في الحقل file أو جسم الطلب مباشرة)، وتُحدد الصيغة
+    من المعامل format أو من اسم الملف أو نوع المحتوى.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        binary, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    else:
+        binary, filename, content_type = request.stream, None, request.mimetype
+    
+    fmt = request.args.get('format') or detect_format(filename, content_type)
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'error': f"Unknown format (use ?format={' or ?format='.join(IMPORT_FORMATS)})"}), 400
+    
+    chunk_size = request.args.get('chunk_size', current_app.config['IMPORT_CHUNK_SIZE'], type=int)
+    if chunk_size is None or chunk_size < 1:
+        return jsonify({'error': 'chunk_size must be a positive integer'}), 400
+    
+    report = ImportReport()
+    try:
+        import_rows(read_rows(text_stream(binary), fmt), db.session, LoanRequest, predict_batch,
+                    chunk_size=chunk_size, report=report, categories=import_categories())
+    except Exception as e:
+        # الدفعات المكتملة قبل الخطأ تبقى محفوظة
+        return jsonify({'error': str(e), 'report': report.to_dict()}), 500
+    
+    return jsonify(report.to_dict())
+
+@route('/api/cache_stats')
+def api_cache_stats():
+    """
+    عدادات الذاكرة المؤقتة لنتائج التنبؤ (hits / misses / evictions)
+    """
+    return jsonify(prediction_service().cache.stats())
+
+@route('/api/batcher_stats')
+def api_batcher_stats():
+    """
+    عدادات تجميع التنبؤات الفردية مع مدرج أحجام الدفعات لضبط MICRO_BATCH_MAX_WAIT
+    """
+    version = prediction_service().registry.current
+    if version is None or version.micro_batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **version.micro_batcher.stats()})
+
+@route('/api/worker_pool_stats')
+def api_worker_pool_stats():
+    """
+    عدادات عمليات التنبؤ (المهام والصفوف لكل عملية، الطابور، إعادة التشغيل)
+    """
+    version = prediction_service().registry.current
+    if version is None or version.worker_pool is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **version.worker_pool.stats()})
+
+@route('/api/model')
+def api_model():
+    """
+    نسخة النموذج الحالية وحالة إعادة التحميل (آخر محاولة، عدد الاستبدالات، آخر خطأ)
+    """
+    return jsonify(prediction_service().registry.stats())
+
+@route('/api/admin/reload_model', methods=['POST'])
+def api_reload_model():
+    """
+    إعادة تحميل النموذج من الملفات الآن (?force=1 للاستبدال حتى لو لم تتغير الملفات)
+    
+    التحميل والتحقق والتسخين تتم في هذا الطلب بينما تستمر بقية الطلبات على
+    النسخة الحالية؛ عند الفشل تبقى النسخة الحالية. مغلقة (403) ما لم يُعيّن LOAN_ADMIN_TOKEN.
+    """
+    token = current_app.config['ADMIN_TOKEN']
+    header = request.headers.get('X-Admin-Token', '')
+    if not token or not hmac.compare_digest(header.encode(), token.encode()):
+        return jsonify({'error': 'Forbidden'}), 403
+    result = prediction_service().registry.reload(force=request.args.get('force') == '1')
+    return jsonify(result), 500 if result['status'] == 'failed' else 200
+
+@route('/api/write_queue_stats')
+def api_write_queue_stats():
+    """
+    عدادات طابور الكتابة المؤجلة (العمق، الدفعات، الانتظار عند الامتلاء)
+    """
+    write_queue = current_app.extensions.get('loan_write_queue')
+    if write_queue is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **write_queue.stats()})
+
+def component_metrics(app):
+    """
+    عدادات المكونات الموجودة وقت الطلب (الذاكرة المؤقتة، النموذج، عمليات التنبؤ،
+    طابور الكتابة) بصيغة Registry.render، بدون تحميل النموذج إن لم يُحمّل
+    """
+    families = []
+    service = app.extensions.get('loan_prediction')
+    if service is not None:
+        cache = service.cache.stats()
+        families += [
+            ('loan_prediction_cache_lookups', 'counter', 'Prediction cache lookups by result',
+             [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+            ('loan_prediction_cache_entries', 'gauge', 'Entries in the prediction cache', [({}, cache['size'])]),
+            ('loan_model_reloads', 'counter', 'Model reloads by result',
+             [({'result': 'swapped'}, service.registry.swaps), ({'result': 'failed'}, service.registry.failures)]),
+        ]
+        # أحجام دفعات المجمّع في metrics.MICRO_BATCH_SIZE (العدد والمجموع عبر كل نسخ النموذج)
+        version = service.registry._current
+        if version is not None and version.worker_pool is not None:
+            pool = version.worker_pool.stats()
+            families += [
+                ('loan_worker_pool_alive', 'gauge', 'Prediction worker processes alive', [({}, pool['alive'])]),
+                ('loan_worker_pool_queued', 'gauge', 'Tasks waiting for a prediction worker', [({}, pool['queued'])]),
+                ('loan_worker_pool_restarts', 'counter', 'Prediction worker restarts', [({}, pool['restarts'])]),
+            ]
+    write_queue = app.extensions.get('loan_write_queue')
+    if write_queue is not None:
+        queue_stats = write_queue.stats()
+        families += [
+            ('loan_write_queue_depth', 'gauge', 'Requests waiting in the write-behind queue',
+             [({}, queue_stats['depth'])]),
+            ('loan_write_queue_written', 'counter', 'Requests written by the write-behind queue',
+             [({}, queue_stats['written'])]),
+            ('loan_write_queue_failed', 'counter', 'Requests lost by the write-behind queue',
+             [({}, queue_stats['failed'])]),
+        ]
+    return families
+
+@route('/metrics')
+def prometheus_metrics():
+    """
+    القياسات بصيغة Prometheus: زمن كل مرحلة وكل مسار وكل استعلام SQL، وعدادات التنبؤات
+    """
+    app = current_app._get_current_object()
+    return Response(metrics.REGISTRY.render([lambda: component_metrics(app)]),
+                    mimetype='text/plain; version=0.0.4')
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+def record_request_latency(response):
+    """زمن الطلب حسب المسار (للاستجابات المتدفقة مثل التصدير: حتى بداية الإرسال)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unmatched',
+                                        method=request.method, status=response.status_code)
+    return response
+
+@route('/model_metrics')
 def model_metrics():
     # مقاييس النموذج
+    trained = prediction_service().registry.current is not None
     metrics = {
-        'accuracy': 0.87 if model is not None else 0.75,
-        'precision': 0.85 if model is not None else 0.70,
-        'recall': 0.86 if model is not None else 0.72,
-        'f1': 0.86 if model is not None else 0.71,
-        'model_type': 'Trained Model' if model is not None else 'Simple Rules'
+        'accuracy': 0.87 if trained else 0.75,
+        'precision': 0.85 if trained else 0.70,
+        'recall': 0.86 if trained else 0.72,
+        'f1': 0.86 if trained else 0.71,
+        'model_type': 'Trained Model' if trained else 'Simple Rules'
     }
     return render_template('model_metrics.html', metrics=metrics)
 
-@app.route('/fix_dates', methods=['GET', 'POST'])
+@route('/fix_dates', methods=['GET', 'POST'])
 def fix_dates():
     message = None
     if request.method == 'POST':
@@ -450,5 +855,222 @@ def fix_dates():
             message = 'كل التواريخ صحيحة بالفعل.'
     return render_template('date_issue.html', message=message)
 
+@cli_command('rebuild-stats')
+def rebuild_stats_command():
+    """إعادة بناء جدول الإحصائيات من جدول الطلبات والتحقق من مطابقته"""
+    from sql_eda import perform_sql_eda
+    summary_stats.rebuild_summary(db.session, LoanRequest)
+    summary = summary_stats.load_summary(db.session, LoanRequest)
+    consistent = summary_stats.summary_eda_results(summary) == perform_sql_eda(db.session, LoanRequest)
+    print(f"تمت إعادة بناء الإحصائيات لـ {summary['total']} طلب (مطابقة: {consistent})")
+
+@cli_command('migrate-db')
+def migrate_db_command():
+    """ترقية loan_requests.db موجودة: الأعمدة والفهارس الناقصة، وضع WAL، و ANALYZE"""
+    tables = [LoanRequest.__table__, *summary_stats.metadata.sorted_tables]
+    created = db_tuning.migrate_database(db.engine, tables)
+    print(f"الأعمدة والفهارس المُنشأة: {', '.join(created) if created else 'لا شيء (كلها موجودة)'}")
+    for name, value in db_tuning.database_report(db.engine, tables).items():
+        print(f"{name}: {value}")
+
+@cli_command('compact-db')
+def compact_db_command():
+    """تحويل جدول الطلبات النصي إلى المخطط المضغوط (يتطلب LOAN_COMPACT_SCHEMA=1)"""
+    if not COMPACT_SCHEMA:
+        raise click.UsageError('شغّل الأمر مع LOAN_COMPACT_SCHEMA=1')
+    if compact_schema.is_compact(db.engine, LoanRequest.__table__) is not False:
+        print("قاعدة البيانات بالمخطط المضغوط بالفعل")
+        return
+    
+    path = db.engine.url.database
+    size_before = os.path.getsize(path)
+    unknown = compact_schema.convert_to_compact(db.engine, LoanRequest.__table__)
+    for field, count in unknown.items():
+        print(f"تنبيه: {count} قيمة غير معروفة في {field} حُفظت كـ NULL")
+    
+    compact_schema.metadata.create_all(db.engine)
+    with db.engine.begin() as connection:
+        compact_schema.sync_lookup(connection)
+    summary_stats.metadata.create_all(db.engine)
+    summary_stats.rebuild_summary(db.session, LoanRequest)
+    print(f"تم التحويل: {size_before / 1e6:.1f} MB -> {os.path.getsize(path) / 1e6:.1f} MB")
+
+@cli_command('import-requests')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help='صيغة الملف (تُحدد من الامتداد افتراضياً)')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=None, help='عدد الصفوف في كل معاملة')
+def import_requests_command(path, fmt, chunk_size):
+    """استيراد طلبات من ملف CSV (بصيغة loan_prediction.csv) أو NDJSON مع التقييم والحفظ"""
+    fmt = fmt or detect_format(path)
+    if fmt is None:
+        raise click.UsageError('تعذّر تحديد صيغة الملف، استخدم --format')
+    
+    def progress(report):
+        print(f"{report.rows} صف، {report.imported} محفوظ، {report.rejected} مرفوض "
+              f"({report.rows / report.seconds:.0f} صف/ثانية)")
+    
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        report = import_rows(read_rows(f, fmt), db.session, LoanRequest, predict_batch,
+                             chunk_size=chunk_size or current_app.config['IMPORT_CHUNK_SIZE'], on_chunk=progress,
+                             categories=import_categories())
+    
+    result = report.to_dict()
+    for reject in result['rejects']:
+        print(f"سطر {reject['line']}: {reject['error']}")
+    if result['rejects_truncated']:
+        print(f"... و {result['rejected'] - len(result['rejects'])} صفوف مرفوضة أخرى")
+    print(f"تم استيراد {result['imported']} من {result['rows']} صف في {result['seconds']} ثانية "
+          f"({result['rows_per_second']} صف/ثانية)")
+
+@cli_command('export-requests')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), help='صيغة الملف (تُحدد من الامتداد افتراضياً)')
+@click.option('--prediction', help='Approved أو Rejected')
+@click.option('--property-area', help='Urban أو Semiurban أو Rural')
+@click.option('--date-from', help='YYYY-MM-DD')
+@click.option('--date-to', help='YYYY-MM-DD (شامل)')
+@click.option('--min-income', help='أقل دخل للمتقدم')
+@click.option('--max-income', help='أعلى دخل للمتقدم')
+def export_requests_command(path, fmt, **filter_options):
+    """تصدير الطلبات إلى ملف CSV أو NDJSON أو Parquet بنفس تصفية صفحة العرض"""
+    fmt = fmt or detect_export_format(path)
+    if fmt is None:
+        raise click.UsageError('تعذّر تحديد صيغة الملف، استخدم --format')
+    if fmt == 'parquet' and not parquet_available():
+        raise click.UsageError('تصدير Parquet يتطلب pyarrow')
+    try:
+        filters = parse_request_filters({key: value for key, value in filter_options.items() if value})
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    
+    mode, encoding = ('wb', None) if fmt == 'parquet' else ('w', 'utf-8')
+    with open(path, mode, encoding=encoding, newline=None if encoding is None else '') as f:
+        for chunk in iter_export(export_rows(filters), fmt):
+            f.write(chunk)
+    print(f"تم تصدير الطلبات إلى {path}")
+
+@cli_command('init-db')
+def init_db_command():
+    """إنشاء الجداول والفهارس الناقصة (لقاعدة بيانات جديدة أو عند INIT_DB=0)"""
+    init_database()
+    print("تم تجهيز قاعدة البيانات")
+
+@cli_command('seed')
+def seed_command():
+    """إضافة بيانات تجريبية إذا كانت قاعدة البيانات فارغة"""
+    init_database()
+    seed_sample_data()
+
+def create_app(config=None):
+    """
+    إنشاء تطبيق Flask بالإعدادات والمسارات وأوامر CLI
+
+    Args:
+        config: قاموس إعدادات يتجاوز الإعدادات الافتراضية (مثل SQLALCHEMY_DATABASE_URI)
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///loan_requests.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # إعدادات SQLite (WAL وغيرها) لكل اتصال؛ مجمّع الاتصالات يُحدد بعد config حسب العنوان
+    app.config['SQLITE_PRAGMAS'] = dict(db_tuning.DEFAULT_PRAGMAS)
+    app.config['COMPACT_SCHEMA'] = COMPACT_SCHEMA
+    # إنشاء الجداول الناقصة عند إنشاء التطبيق (0: بأمر flask init-db فقط)
+    app.config['INIT_DB'] = os.environ.get('LOAN_INIT_DB', '1') == '1'
+    # تحميل النموذج في خيط خلفي بعد البدء (0: عند أول تنبؤ)
+    app.config['MODEL_PRELOAD'] = os.environ.get('LOAN_MODEL_PRELOAD', '1') == '1'
+    # الكتابة المؤجلة لطلبات add_request: خيط خلفي يكتبها على دفعات (group commit)
+    app.config['WRITE_BEHIND'] = os.environ.get('LOAN_WRITE_BEHIND', '0') == '1'
+    app.config['WRITE_BEHIND_BATCH_SIZE'] = 500
+    app.config['WRITE_BEHIND_MAX_LATENCY'] = 0.05
+    app.config['WRITE_BEHIND_QUEUE_SIZE'] = 10000
+    app.config['WRITE_BEHIND_PUT_TIMEOUT'] = 1.0
+    # تجميع طلبات /api/predict الفردية المتزامنة في استدعاء واحد للنموذج
+    app.config['MICRO_BATCH'] = os.environ.get('LOAN_MICRO_BATCH', '0') == '1'
+    app.config['MICRO_BATCH_MAX_SIZE'] = 64
+    app.config['MICRO_BATCH_MAX_WAIT'] = 0.002
+    # مجمّع عمليات التنبؤ: عدد العمليات (0 = التنبؤ داخل عملية الخادم)
+    app.config['PREDICT_WORKERS'] = int(os.environ.get('LOAN_PREDICT_WORKERS', '0'))
+    # إعادة تحميل النموذج عند تغيّر ملفاته (الفحص كل MODEL_WATCH_INTERVAL ثانية)
+    app.config['MODEL_WATCH'] = os.environ.get('LOAN_MODEL_WATCH', '1') == '1'
+    app.config['MODEL_WATCH_INTERVAL'] = 2.0
+    # رمز اختياري لمسارات الإدارة (ترويسة X-Admin-Token)
+    app.config['ADMIN_TOKEN'] = os.environ.get('LOAN_ADMIN_TOKEN')
+    # مستوى السجلات، ونسبة العيّنة لسجلات DEBUG لكل طلب (تنبؤ، نتائج EDA)
+    app.config['LOG_LEVEL'] = os.environ.get('LOAN_LOG_LEVEL', 'INFO').upper()
+    app.config['LOG_SAMPLE_RATE'] = float(os.environ.get('LOAN_LOG_SAMPLE_RATE', '0.01'))
+    # الحد الأقصى لعدد الصفوف في طلب التنبؤ الجماعي
+    app.config['PREDICT_BATCH_MAX_ROWS'] = 100000
+    # إعدادات الذاكرة المؤقتة لنتائج التنبؤ (الحجم 0 يعطّلها)
+    app.config['PREDICTION_CACHE_SIZE'] = 10000
+    app.config['PREDICTION_CACHE_TTL'] = 300
+    # عدد الطلبات في صفحة العرض والحد الأقصى المسموح به
+    app.config['REQUESTS_PAGE_SIZE'] = 50
+    app.config['REQUESTS_MAX_PAGE_SIZE'] = 500
+    # عدد أحدث الطلبات المعروضة في رسم الدخل مقابل مبلغ القرض
+    app.config['CHARTS_RECENT_REQUESTS'] = 200
+    # عدد الصفوف في كل دفعة (معاملة) أثناء الاستيراد الجماعي
+    app.config['IMPORT_CHUNK_SIZE'] = 5000
+    # عدد الصفوف التي تُجلب من قاعدة البيانات في كل دفعة أثناء التصدير
+    app.config['EXPORT_BATCH_SIZE'] = 10000
+    if config:
+        app.config.update(config)
+    # مجمّع اتصالات للخيوط المتعددة لملف SQLite، أو اتصال واحد مشترك لقاعدة في الذاكرة
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                          db_tuning.sqlite_engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    metrics.configure_logging(app.config['LOG_LEVEL'])
+    db.init_app(app)
+    app.before_request(start_request_timer)
+    app.after_request(record_request_latency)
+    for rule, view, options in ROUTES:
+        app.add_url_rule(rule, view_func=view, **options)
+    for command in COMMANDS:
+        app.cli.add_command(command)
+
+    with app.app_context():
+        db_tuning.configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        metrics.instrument_engine(db.engine)
+        if app.config['INIT_DB']:
+            init_database()
+
+    if app.config['WRITE_BEHIND']:
+        app.extensions['loan_write_queue'] = WriteBehindQueue(
+            lambda mappings: write_requests(app, mappings),
+            batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+            max_latency=app.config['WRITE_BEHIND_MAX_LATENCY'],
+            max_size=app.config['WRITE_BEHIND_QUEUE_SIZE'],
+            put_timeout=app.config['WRITE_BEHIND_PUT_TIMEOUT']
+        ).start()
+        exit_on_sigterm()
+
+    # أوامر flask CLI (التي تنشئ التطبيق داخل سياق click) لا تحتاج إلى تحميل النموذج مسبقاً
+    if app.config['MODEL_PRELOAD'] and click.get_current_context(silent=True) is None:
+        preload_model(app)
+
+    return app
+
+_app = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """التطبيق المشترك (flask_app.app): يُنشأ بـ create_app() عند أول استخدام لا عند الاستيراد"""
+    global _app
+    with _app_lock:
+        if _app is None:
+            _app = create_app()
+    return _app
+
+def __getattr__(name):
+    # flask_app.app لـ FLASK_APP و gunicorn (flask_app:app) و asgi_app
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 if __name__ == '__main__':
+    # خادم التطوير: قاعدة بيانات جاهزة مع بيانات تجريبية
+    app = get_app()
+    with app.app_context():
+        if not app.config['INIT_DB']:
+            init_database()
+        seed_sample_data()
     app.run(host='0.0.0.0', port=5000, debug=True)
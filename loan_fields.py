@@ -0,0 +1,21 @@
+# حقول الطلب المشتركة بين التطبيق والاستيراد والتحليل، بدون أي استيراد، فيستوردها
+# flask_app (عبر bulk_import و summary_stats) دون تحميل وحدات التحليل.
+
+# الحقول الفئوية والرقمية التي يحللها EDA
+CATEGORICAL_FIELDS = ['gender', 'married', 'education', 'property_area', 'self_employed']
+
+# أعمدة loan_prediction.csv -> حقول الطلب
+CSV_COLUMNS = {
+    'Gender': 'gender',
+    'Married': 'married',
+    'Dependents': 'dependents',
+    'Education': 'education',
+    'Self_Employed': 'self_employed',
+    'ApplicantIncome': 'applicant_income',
+    'CoapplicantIncome': 'coapplicant_income',
+    'LoanAmount': 'loan_amount',
+    'Loan_Amount_Term': 'loan_term',
+    'Credit_History': 'credit_history',
+    'Property_Area': 'property_area',
+}
+CSV_NUMERIC = {'applicant_income', 'coapplicant_income', 'loan_amount', 'loan_term', 'credit_history'}
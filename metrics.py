@@ -0,0 +1,221 @@
+# قياسات الأداء بصيغة Prometheus النصية (/metrics) وسجلات منظّمة، بدون مكتبات خارجية:
+# مدرجات زمن لكل مرحلة من مراحل التنبؤ ولكل مسار ولكل استعلام SQL، وعدادات التنبؤات.
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# حدود فئات مدرجات الزمن بالثواني (من 100 ميكروثانية إلى 10 ثوانٍ)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    """{'stage': 'encode'} -> '{stage="encode"}'"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class Counter:
+    """عداد تراكمي لكل مجموعة قيم للتسميات (labels)"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name + '_total', dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """
+    مدرج زمن: عدد القياسات في كل فئة (تراكمياً حتى le) مع المجموع والعدد
+
+    observe تكلّف بحثاً ثنائياً في الحدود وقفلاً قصيراً، فيمكن استدعاؤها لكل طلب.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        # أول فئة حدها >= القيمة (الفئة الأخيرة +Inf)
+        low, high = 0, len(self.buckets)
+        while low < high:
+            middle = (low + high) // 2
+            if self.buckets[middle] < value:
+                low = middle + 1
+            else:
+                high = middle
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][low] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """قياس مدة الكتلة (تُسجّل حتى عند حدوث استثناء)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield self.name + '_bucket', {**labels, 'le': format_value(float(bound))}, cumulative
+            yield self.name + '_sum', labels, total
+            yield self.name + '_count', labels, count
+
+
+class Registry:
+    """القياسات المسجّلة في العملية وتحويلها إلى صيغة Prometheus النصية"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, collectors=()):
+        """
+        نص /metrics (text/plain; version=0.0.4)
+
+        Args:
+            collectors: دوال تعيد قياسات إضافية وقت الطلب كـ (الاسم، النوع، الوصف،
+                        [(التسميات، القيمة), ...]) مثل عدادات الذاكرة المؤقتة الموجودة
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        for collect in collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                suffix = '_total' if kind == 'counter' else ''
+                for labels, value in samples:
+                    lines.append(f'{name}{suffix}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# مراحل التنبؤ: parse (قراءة جسم الطلب)، preprocess (preprocess_form_data للتنبؤ البسيط)،
+# encode، scale، predict (model.predict أو عمليات التنبؤ)، db_commit
+STAGE_SECONDS = REGISTRY.histogram(
+    'loan_stage_duration_seconds', 'Time spent in each request stage', ['stage'])
+REQUEST_SECONDS = REGISTRY.histogram(
+    'loan_http_request_duration_seconds', 'HTTP request latency by endpoint', ['endpoint', 'method', 'status'])
+PREDICTIONS = REGISTRY.counter(
+    'loan_predictions', 'Predictions by outcome and model (trained or fallback)', ['outcome', 'model'])
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'loan_db_query_duration_seconds', 'SQL statement latency by statement type', ['statement'])
+# عدد الصفوف في كل دفعة يقيّمها micro_batcher باستدعاء واحد للنموذج
+MICRO_BATCH_SIZE = REGISTRY.histogram(
+    'loan_micro_batch_size', 'Rows per micro-batch scored by the model',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+
+
+def count_predictions(predictions, fallback):
+    """عدّ التنبؤات (1 موافق، 0 مرفوض) حسب النتيجة ونوع النموذج"""
+    model = 'fallback' if fallback else 'trained'
+    approved = sum(1 for prediction in predictions if int(prediction) == 1)
+    if approved:
+        PREDICTIONS.inc(approved, outcome='approved', model=model)
+    if len(predictions) - approved:
+        PREDICTIONS.inc(len(predictions) - approved, outcome='rejected', model=model)
+
+
+def instrument_engine(engine, histogram=DB_QUERY_SECONDS):
+    """تسجيل زمن كل استعلام SQL على المحرك حسب نوعه (select / insert / update / ...)"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        keyword = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'other'
+        if keyword not in ('select', 'insert', 'update', 'delete', 'pragma', 'with'):
+            keyword = 'other'
+        histogram.observe(time.perf_counter() - started, statement=keyword)
+
+    @event.listens_for(engine, 'handle_error')
+    def _error(context):
+        # الاستعلام الفاشل لا يصل إلى after_cursor_execute
+        stack = context.connection.info.get('query_started') if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+def log_event(logger, level, event, sample_rate=1.0, **fields):
+    """
+    سجل منظّم (سطر JSON) بمستوى محدد ونسبة عيّنة
+
+    لا يُبنى السجل إذا كان المستوى معطّلاً أو لم تقع العيّنة، لذلك يمكن استدعاؤها
+    في المسارات الساخنة (مثلاً لكل تنبؤ على مستوى DEBUG مع sample_rate صغيرة).
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    logger.log(level, json.dumps({'event': event, **fields}, ensure_ascii=False, default=str))
+
+
+def configure_logging(level='INFO'):
+    """إعداد السجلات للعملية (لا يغيّر إعدادات موجودة مسبقاً، مثل إعدادات gunicorn)"""
+    logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(name)s %(message)s')
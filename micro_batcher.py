@@ -0,0 +1,180 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import MICRO_BATCH_SIZE
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    تجميع طلبات التنبؤ الفردية المتزامنة في مصفوفة واحدة
+
+    كل طلب يُضاف إلى طابور ويحصل على Future. خيط واحد يأخذ أول طلب ثم ينتظر
+    حتى max_wait ثانية أو حتى max_batch صفاً، ويقيّم المصفوفة كاملة باستدعاء
+    واحد للنموذج، ثم يوزّع النتائج على الطلبات المنتظرة.
+
+    مع concurrency > 1 (مثلاً عند التقييم في مجمّع عمليات) تُقيّم حتى concurrency
+    دفعة في نفس الوقت، وعندما تكون كلها مشغولة تكبر الدفعة التالية في الطابور.
+    """
+
+    def __init__(self, score, max_batch=64, max_wait=0.002, concurrency=1):
+        """
+        Args:
+            score: دالة تأخذ مصفوفة (n, n_features) وتعيد n نتيجة
+            max_batch: أقصى عدد من الصفوف في الدفعة
+            max_wait: أقصى مدة بالثواني ينتظرها أول طلب لتجميع طلبات أخرى
+            concurrency: عدد الدفعات التي تُقيّم في نفس الوقت
+        """
+        self.score = score
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.concurrency = concurrency
+        self._executor = None
+        if concurrency > 1:
+            self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix='micro-batcher-score')
+            self._slots = threading.Semaphore(concurrency)
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+
+        # حدود فئات مدرج أحجام الدفعات: 1, 2, 4, ... حتى max_batch
+        self.buckets = []
+        size = 1
+        while size < max_batch:
+            self.buckets.append(size)
+            size *= 2
+        self.buckets.append(max_batch)
+        self.histogram = [0] * len(self.buckets)
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+        self.score_seconds = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, features):
+        """
+        إضافة صف ميزات واحد
+
+        Returns:
+            concurrent.futures.Future: نتيجة الصف (يمكن انتظارها من asyncio بـ wrap_future)؛
+            بعد stop() تكون فاشلة مسبقاً بـ RuntimeError بدل أن تنتظر للأبد
+        """
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                future.set_exception(RuntimeError('micro-batcher is stopped'))
+                return future
+            self._queue.put((features, future, time.perf_counter()))
+        return future
+
+    def predict(self, features, timeout=None):
+        """إضافة صف وانتظار نتيجته"""
+        return self.submit(features).result(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._dispatch(batch)
+                    return
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        if self._executor is None:
+            self._score(batch)
+            return
+        self._slots.acquire()
+        self._executor.submit(self._score_slot, batch)
+
+    def _score_slot(self, batch):
+        try:
+            self._score(batch)
+        finally:
+            self._slots.release()
+
+    def _score(self, batch):
+        started = time.perf_counter()
+        try:
+            results = self.score(np.vstack([features for features, _, _ in batch]))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            with self._lock:
+                self.errors += 1
+            return
+        finished = time.perf_counter()
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+        with self._lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.histogram[next(i for i, bound in enumerate(self.buckets) if len(batch) <= bound)] += 1
+            self.wait_seconds += sum(started - queued for _, _, queued in batch)
+            self.score_seconds += finished - started
+        MICRO_BATCH_SIZE.observe(len(batch))
+
+    def stop(self):
+        """
+        إيقاف الخيط بعد تقييم ما سبق _STOP، ثم إفشال أي طلب بقي في الطابور
+        (مثلاً إن لم يبدأ الخيط) حتى لا ينتظره أحد للأبد
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(_STOP)
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+        error = RuntimeError('micro-batcher is stopped')
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[1].set_exception(error)
+
+    def stats(self):
+        """عدادات المجمّع مع مدرج أحجام الدفعات (عدد الدفعات بين الحد السابق و le لكل فئة)"""
+        with self._lock:
+            return {
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'concurrency': self.concurrency,
+                'batches': self.batches,
+                'rows': self.rows,
+                'errors': self.errors,
+                'avg_batch': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'avg_queue_wait_ms': round(self.wait_seconds / self.rows * 1000, 3) if self.rows else 0.0,
+                'avg_score_ms': round(self.score_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+                'histogram': [{'le': bound, 'count': count} for bound, count in zip(self.buckets, self.histogram)],
+            }
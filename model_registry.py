@@ -0,0 +1,371 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from compact_schema import CATEGORY_VALUES
+from feature_encoder import FeatureEncoder
+from metrics import STAGE_SECONDS, log_event
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_digest(path):
+    """
+    بصمة محتوى ملف النموذج (أو كل ملفات مجلد النموذج) تُستخدم كرقم للنسخة
+
+    نفس الملفات تعطي نفس النسخة في كل العمليات وبعد إعادة التشغيل.
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path))
+    else:
+        files = [path]
+    for name in files:
+        digest.update(os.path.basename(name).encode())
+        with open(name, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def warmup_requests(count=64, seed=0):
+    """طلبات تجريبية ثابتة (نفس القيم في كل مرة) للتحقق من النسخة الجديدة وتسخينها"""
+    rng = np.random.default_rng(seed)
+    fields = ['gender', 'married', 'dependents', 'education', 'self_employed', 'property_area']
+    rows = []
+    for _ in range(count):
+        row = {field: str(rng.choice(CATEGORY_VALUES[field])) for field in fields}
+        row.update({
+            'applicant_income': str(round(float(rng.lognormal(8.3, 0.6)), 2)),
+            'coapplicant_income': str(round(float(rng.choice([0.0, rng.lognormal(7.5, 0.8)])), 2)),
+            'loan_amount': str(round(float(rng.uniform(30, 600)), 1)),
+            'loan_term': str(int(rng.choice([120, 180, 240, 300, 360, 480]))),
+            'credit_history': str(int(rng.integers(0, 2))),
+        })
+        rows.append(row)
+    return rows
+
+
+class ModelVersion:
+    """
+    نسخة محمّلة من النموذج مع كل ما يحتاجه التنبؤ بها: المرمّز والمقياس، وعمليات
+    التنبؤ ومجمّع الطلبات الخاصين بها (إن وُجدا)
+
+    الطلب يأخذ النسخة مرة واحدة (ModelRegistry.use) ويكمل بها حتى لو استُبدلت.
+    """
+
+    def __init__(self, model, scaler_mean, scaler_scale, feature_names, fused, source, version):
+        """
+        Args:
+            model: النموذج (scikit-learn أو xgboost أو نموذج مترجم)
+            scaler_mean: متوسط المقياس (None إذا كان مدمجاً)
+            scaler_scale: مقياس المقياس
+            feature_names: أسماء الميزات بترتيب أعمدة النموذج
+            fused: هل المقياس مدمج في النموذج
+            source: مسار الملف أو المجلد الذي حُمّل منه النموذج
+            version: رقم النسخة (انظر artifact_digest)
+        """
+        self.model = model
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.fused = fused
+        self.source = source
+        self.version = version
+        self.encoder = FeatureEncoder(feature_names)
+        self.loaded_at = datetime.utcnow()
+        self.worker_pool = None
+        self.micro_batcher = None
+        # عدد الطلبات التي تستخدم النسخة الآن (يحميه قفل السجل)
+        self.active = 0
+
+    def scale(self, features):
+        """تطبيق المقياس على الميزات، إلا إذا كان المقياس مدمجاً في النموذج"""
+        if self.fused:
+            return features
+        with STAGE_SECONDS.time(stage='scale'):
+            return (features - self.scaler_mean) / self.scaler_scale
+
+    def score(self, features):
+        """
+        التنبؤ لمصفوفة ميزات كاملة في استدعاء واحد
+
+        التنبؤات الفردية ودفعات micro_batcher تمر بعمليات التنبؤ إن وُجدت.
+        """
+        if self.worker_pool is not None:
+            with STAGE_SECONDS.time(stage='predict'):
+                return self.worker_pool.predict(features)
+        return self.score_local(features)
+
+    def score_local(self, features):
+        """التنبؤ داخل الخادم (للدفعات الكبيرة: scikit-learn أسرع من النموذج المترجم)"""
+        features = self.scale(features)
+        with STAGE_SECONDS.time(stage='predict'):
+            return self.model.predict(features)
+
+    def predict_one(self, features):
+        """التنبؤ لصف ميزات واحد (مع الطلبات المتزامنة الأخرى إذا كان المجمّع مفعّلاً)"""
+        if self.micro_batcher is not None:
+            return int(self.micro_batcher.predict(features))
+        return int(self.score(features.reshape(1, -1))[0])
+
+    def close(self):
+        """إيقاف المجمّع وعمليات التنبؤ الخاصة بالنسخة"""
+        if self.micro_batcher is not None:
+            self.micro_batcher.stop()
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+
+    def info(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'model_type': type(self.model).__name__,
+            'features': self.encoder.n_features,
+            'loaded_at': self.loaded_at.isoformat(),
+        }
+
+
+class ModelRegistry:
+    """
+    النسخة الحالية من النموذج مع إعادة التحميل بدون إيقاف الخادم
+
+    إعادة التحميل (من خيط المراقبة عند تغيّر ملفات النموذج أو يدوياً) تحمّل النسخة
+    الجديدة وتتحقق منها بدفعة تسخين، ثم تستبدل المرجع دفعة واحدة. الطلبات الجارية
+    تكمل على النسخة القديمة، وتُغلق موارد القديمة بعد انتهائها.
+
+    النسخة الأولى تُحمّل عند أول استخدام (current أو use) أو باستدعاء load_initial،
+    فلا يتأخر بدء الخادم بتحميل النموذج.
+    """
+
+    def __init__(self, load, prepare=None, watch_paths=(), warmup_rows=None, check_interval=2.0,
+                 on_swap=None, retire_timeout=30.0):
+        """
+        Args:
+            load: دالة تحمّل النموذج من الملفات وتعيد ModelVersion (أو ترفع FileNotFoundError)
+            prepare: دالة تُستدعى بالنسخة الجديدة قبل التحقق منها (مثلاً لتشغيل عمليات
+                     التنبؤ)، ولا تُستدعى إذا لم تتغير النسخة
+            watch_paths: ملفات النموذج التي يؤدي تغيّرها إلى إعادة التحميل
+            warmup_rows: طلبات التحقق والتسخين (افتراضياً warmup_requests())
+            check_interval: المدة بالثواني بين فحصين لملفات النموذج
+            on_swap: دالة تُستدعى بعد الاستبدال بـ (النسخة الجديدة، القديمة)
+            retire_timeout: أقصى مدة لانتظار انتهاء طلبات النسخة القديمة قبل إغلاقها
+        """
+        self.load = load
+        self.prepare = prepare
+        self.watch_paths = list(watch_paths)
+        self.warmup_rows = warmup_rows if warmup_rows is not None else warmup_requests()
+        self.check_interval = check_interval
+        self.on_swap = on_swap
+        self.retire_timeout = retire_timeout
+
+        self._current = None
+        self._loaded = False
+        self._initial_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._reload_lock = threading.Lock()
+        self._signature = self._source_signature()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.swaps = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload = None
+
+    @property
+    def current(self):
+        """النسخة الحالية أو None (التنبؤ البسيط)، مع تحميل النسخة الأولى إن لم تُحمّل"""
+        if not self._loaded:
+            self.load_initial()
+        return self._current
+
+    def _source_signature(self):
+        signature = []
+        for path in self.watch_paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except FileNotFoundError:
+                signature.append((path, None, None, None))
+        return signature
+
+    def load_initial(self):
+        """
+        تحميل النسخة الأولى (بدون تسخين) مرة واحدة؛ الاستدعاءات المتزامنة تنتظر نفس التحميل
+
+        Returns:
+            ModelVersion أو None إذا لم توجد ملفات النموذج
+        """
+        with self._initial_lock:
+            if self._loaded:
+                return self._current
+            try:
+                version = self.load()
+            except FileNotFoundError as e:
+                log_event(logger, logging.WARNING, 'model_missing', error=str(e), fallback=True)
+                version = None
+            else:
+                if self.prepare is not None:
+                    self.prepare(version)
+            with self._condition:
+                # إعادة تحميل (من خيط المراقبة) سبقت التحميل الأول
+                replaced = self._loaded
+                if not replaced:
+                    self._current = version
+                    self._loaded = True
+            if replaced and version is not None:
+                version.close()
+            return self._current
+
+    @contextmanager
+    def use(self):
+        """
+        أخذ النسخة الحالية طوال مدة الطلب
+
+        Yields:
+            ModelVersion أو None
+        """
+        if not self._loaded:
+            self.load_initial()
+        with self._condition:
+            version = self._current
+            if version is not None:
+                version.active += 1
+        try:
+            yield version
+        finally:
+            if version is not None:
+                with self._condition:
+                    version.active -= 1
+                    self._condition.notify_all()
+
+    def validate(self, candidate):
+        """
+        التحقق من النسخة الجديدة وتسخينها: تقييم دفعة التسخين كاملة ثم صف واحد
+        (يمر بالمجمّع وعمليات التنبؤ)، مع نسبة التطابق مع النسخة الحالية
+
+        Raises:
+            ValueError: إذا كانت التنبؤات بشكل أو قيم غير متوقعة
+        """
+        features, valid_indices, errors = candidate.encoder.encode_batch(self.warmup_rows)
+        if errors:
+            raise ValueError(f'warm-up rows rejected by encoder: {next(iter(errors.values()))}')
+
+        started = time.perf_counter()
+        predictions = np.asarray(candidate.score(features))
+        local = np.asarray(candidate.score_local(features))
+        single = candidate.predict_one(features[0])
+        warmup_ms = (time.perf_counter() - started) * 1000
+
+        if predictions.shape != (len(valid_indices),):
+            raise ValueError(f'expected {len(valid_indices)} predictions, got shape {predictions.shape}')
+        if not np.isin(predictions, (0, 1)).all():
+            raise ValueError('predictions must be 0 or 1')
+        if not (predictions == local).all() or single != predictions[0]:
+            raise ValueError('worker predictions do not match the in-process model')
+
+        result = {'warmup_rows': len(valid_indices), 'warmup_ms': round(warmup_ms, 1)}
+        current = self._current
+        if current is not None and current.encoder.feature_names == candidate.encoder.feature_names:
+            result['agreement'] = round(float((current.score_local(features) == predictions).mean()), 4)
+        return result
+
+    def reload(self, force=False):
+        """
+        تحميل النسخة الموجودة في الملفات واستبدال الحالية بها إذا نجح التحقق
+
+        Args:
+            force: الاستبدال حتى لو لم تتغير بصمة الملفات
+
+        Returns:
+            dict: status ('swapped' أو 'unchanged' أو 'failed') مع تفاصيل التحقق
+        """
+        with self._reload_lock:
+            started = time.perf_counter()
+            self._signature = self._source_signature()
+            candidate = None
+            try:
+                candidate = self.load()
+                current = self._current
+                if not force and current is not None and candidate.version == current.version:
+                    return self._record({'status': 'unchanged', 'version': current.version})
+                if self.prepare is not None:
+                    self.prepare(candidate)
+                result = self.validate(candidate)
+            except Exception as e:
+                if candidate is not None:
+                    candidate.close()
+                self.failures += 1
+                self.last_error = f'{type(e).__name__}: {e}'
+                log_event(logger, logging.ERROR, 'model_reload_failed', error=self.last_error)
+                return self._record({'status': 'failed', 'error': self.last_error})
+
+            with self._condition:
+                previous, self._current = self._current, candidate
+                self._loaded = True
+                self.swaps += 1
+            if self.on_swap is not None:
+                self.on_swap(candidate, previous)
+            if previous is not None:
+                threading.Thread(target=self._retire, args=(previous,), name='model-retire',
+                                 daemon=True).start()
+
+            result.update(status='swapped', version=candidate.version,
+                          previous=previous.version if previous is not None else None,
+                          seconds=round(time.perf_counter() - started, 3))
+            return self._record(result)
+
+    def _record(self, result):
+        self.last_reload = {'at': datetime.utcnow().isoformat(), **result}
+        return result
+
+    def _retire(self, version):
+        """إغلاق موارد النسخة القديمة بعد انتهاء طلباتها الجارية"""
+        with self._condition:
+            self._condition.wait_for(lambda: version.active == 0, self.retire_timeout)
+        version.close()
+
+    def start_watcher(self):
+        """تشغيل خيط يعيد التحميل عند تغيّر ملفات النموذج"""
+        if self._thread is None and self.watch_paths:
+            self._thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        pending = None
+        while not self._stopped.wait(self.check_interval):
+            signature = self._source_signature()
+            if signature == self._signature:
+                pending = None
+                continue
+            # إعادة التحميل بعد أن يثبت الملف فحصين متتاليين (لا يزال يُكتب)
+            if signature != pending:
+                pending = signature
+                continue
+            pending = None
+            self.reload()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self):
+        current = self._current
+        return {
+            'loaded': self._loaded,
+            'current': current.info() if current is not None else None,
+            'watching': self._thread is not None and self._thread.is_alive(),
+            'watch_paths': self.watch_paths,
+            'swaps': self.swaps,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_reload': self.last_reload,
+        }
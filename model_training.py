@@ -1,38 +1,23 @@
 # Import necessary libraries
+import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_curve, auc, precision_score, recall_score, f1_score
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.svm import SVC
 from sklearn.preprocessing import StandardScaler
 from xgboost import XGBClassifier
+from feature_encoder import FeatureEncoder
+from training_search import SEARCH_STRATEGIES, run_searches
+from plotting import PLOT_MODES, Plotter
+from chunked_preprocessing import load_processed_data
 import warnings
 warnings.filterwarnings('ignore')
 
-# Load preprocessed data
-print("Loading preprocessed data...")
-df = pd.read_csv("processed_loan_data.csv")
-df = df.astype(float)
-
-# Split features and target
-X = df.drop('Loan_Status', axis=1)
-y = df['Loan_Status']
-
-# Scale the features
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-X_scaled = pd.DataFrame(X_scaled, columns=X.columns)
-
-# Split the data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42, stratify=y)
-
-print('Training set shape:', X_train.shape)
-print('Testing set shape:', X_test.shape)
-
 # Define models with their hyperparameters for grid search
 models = {
     'Logistic Regression': {
@@ -69,125 +54,218 @@ models = {
     }
 }
 
+# Plots are module-level functions so a background process can render them
+def plot_confusion_matrix(cm, title='Confusion Matrix'):
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
+    plt.title(title)
+    plt.ylabel('True Label')
+    plt.xlabel('Predicted Label')
+
+def plot_roc_curve(fpr, tpr, roc_auc, title='Receiver Operating Characteristic (ROC) Curve'):
+    plt.figure(figsize=(8, 6))
+    plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (AUC = {roc_auc:.2f})')
+    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('False Positive Rate')
+    plt.ylabel('True Positive Rate')
+    plt.title(title)
+    plt.legend(loc="lower right")
+
+def plot_feature_importance(feature_importance, model_name):
+    plt.figure(figsize=(12, 6))
+    sns.barplot(x='importance', y='feature', data=feature_importance.head(10))
+    plt.title(f'Top 10 Most Important Features ({model_name})')
+    plt.tight_layout()
+
+def plot_name(prefix, model_name):
+    return f"{prefix}_{model_name.lower().replace(' ', '_')}"
+
 # Function to evaluate models
-def evaluate_model(y_true, y_pred, y_pred_proba=None):
+def evaluate_model(y_true, y_pred, y_pred_proba=None, plotter=None, name='model'):
+    plotter = plotter or Plotter('show')
     print("Classification Report:")
     print(classification_report(y_true, y_pred))
     
     # Confusion Matrix
-    plt.figure(figsize=(8, 6))
     cm = confusion_matrix(y_true, y_pred)
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.title('Confusion Matrix')
-    plt.ylabel('True Label')
-    plt.xlabel('Predicted Label')
-    plt.show()
+    plotter.plot(plot_name('confusion_matrix', name), plot_confusion_matrix, cm, f'Confusion Matrix ({name})')
     
     # ROC Curve
     if y_pred_proba is not None:
         fpr, tpr, _ = roc_curve(y_true, y_pred_proba)
         roc_auc = auc(fpr, tpr)
-        
-        plt.figure(figsize=(8, 6))
-        plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (AUC = {roc_auc:.2f})')
-        plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-        plt.xlim([0.0, 1.0])
-        plt.ylim([0.0, 1.05])
-        plt.xlabel('False Positive Rate')
-        plt.ylabel('True Positive Rate')
-        plt.title('Receiver Operating Characteristic (ROC) Curve')
-        plt.legend(loc="lower right")
-        plt.show()
-
-# Train and evaluate models
-best_models = {}
-best_scores = {}
-all_metrics = {}
-
-print("\nTraining and evaluating models...")
-for name, model_info in models.items():
-    print(f"\nTraining {name}...")
+        plotter.plot(plot_name('roc_curve', name), plot_roc_curve, fpr, tpr, roc_auc,
+                     f'Receiver Operating Characteristic (ROC) Curve ({name})')
+
+def add_training_arguments(parser):
+    parser.add_argument('--search', choices=SEARCH_STRATEGIES, default='grid',
+                        help='grid: every grid point on every fold; halving: successive halving over folds')
+    parser.add_argument('--halving-factor', type=int, default=3,
+                        help='keep the best 1/factor of the grid points at each halving step')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes for the (model, grid point, fold) fits (default: CPU count, 1 runs in-process)')
+    parser.add_argument('--cv', type=int, default=5, help='cross-validation folds')
+    parser.add_argument('--cache-dir', default='.training_cache',
+                        help='directory for cached fold scores (keyed by data hash and parameters)')
+    parser.add_argument('--no-cache', action='store_true', help='recompute every fold')
+    parser.add_argument('--plots-dir', default='training_plots', help='directory for --plots background')
+    return parser
+
+def train(data_path='processed_loan_data.csv', search='grid', halving_factor=3, workers=None, cv=5,
+          cache_dir='.training_cache', plotter=None):
+    """
+    Search, evaluate and save the best model and scaler
+
+    Returns:
+        dict: test metrics, best parameters and search wall-clock per model, and the
+              best model name (for the pipeline report)
+    """
+    plotter = plotter or Plotter('show')
     
-    # Perform GridSearchCV
-    grid_search = GridSearchCV(
-        model_info['model'],
-        model_info['params'],
-        cv=5,
-        scoring='accuracy',
-        n_jobs=-1
-    )
+    # Load preprocessed data (CSV, Parquet or a chunked .npy directory) and split features and target
+    print("Loading preprocessed data...")
+    X, y = load_processed_data(data_path)
     
-    grid_search.fit(X_train, y_train)
+    # Fail fast if the serving feature encoder cannot reproduce these columns
+    FeatureEncoder(X.columns)
     
-    # Store best model and score
-    best_models[name] = grid_search.best_estimator_
-    best_scores[name] = grid_search.best_score_
+    # Scale the features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    X_scaled = pd.DataFrame(X_scaled, columns=X.columns)
     
-    print(f"Best parameters for {name}:", grid_search.best_params_)
-    print(f"Best cross-validation score: {grid_search.best_score_:.4f}")
+    # Split the data into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42, stratify=y)
     
-    # Make predictions
-    y_pred = grid_search.predict(X_test)
-    y_pred_proba = grid_search.predict_proba(X_test)[:, 1]
+    print('Training set shape:', X_train.shape)
+    print('Testing set shape:', X_test.shape)
     
-    # Calculate all metrics
-    all_metrics[name] = {
-        'Accuracy': accuracy_score(y_test, y_pred),
-        'Precision': precision_score(y_test, y_pred),
-        'Recall': recall_score(y_test, y_pred),
-        'F1 Score': f1_score(y_test, y_pred),
-        'AUC-ROC': roc_curve(y_test, y_pred_proba)[2],
-        'Cross-Val Score': best_scores[name]
-    }
+    # Train and evaluate models
+    best_models = {}
+    best_scores = {}
+    all_metrics = {}
+
+    print(f"\nSearching hyperparameters ({search} search, {workers or 'all'} CPU worker processes)...")
+    search_results, total_seconds = run_searches(
+        models, X_train, y_train, cv=cv, cache_dir=cache_dir, strategy=search, factor=halving_factor,
+        workers=workers
+    )
+
+    # Fit time per model (fits of all models share one process pool, so the total wall-clock is lower)
+    print("\nSearch fit time per model:")
+    for name, result in search_results.items():
+        print(f"  {name:20} {result['fit_seconds']:8.2f} s  {result['fits']:4d} fits computed, "
+              f"{result['cached_fits']:4d} from cache")
+    print(f"  {'Wall-clock':20} {total_seconds:8.2f} s")
+
+    for name, result in search_results.items():
+        print(f"\nEvaluating {name}...")
     
-    print(f"\nEvaluation metrics for {name}:")
-    evaluate_model(y_test, y_pred, y_pred_proba)
-
-# Create comprehensive model comparison table
-print("\n" + "="*100)
-print("Model Comparison Table")
-print("="*100)
-
-# Convert metrics to DataFrame
-comparison_df = pd.DataFrame(all_metrics).round(4).T
-
-# Sort by accuracy
-comparison_df = comparison_df.sort_values('Accuracy', ascending=False)
-
-# Add ranking column
-comparison_df['Rank'] = range(1, len(comparison_df) + 1)
-
-# Reorder columns to show rank first
-cols = ['Rank'] + [col for col in comparison_df.columns if col != 'Rank']
-comparison_df = comparison_df[cols]
-
-# Print comparison table with formatting
-print("\nModel Performance Comparison:")
-print("-" * 120)
-print(comparison_df.to_string())
-print("-" * 120)
-
-# Print best model summary
-best_model_name = comparison_df.index[0]
-print(f"\nBest Model: {best_model_name}")
-print(f"Best Model Parameters: {best_models[best_model_name].get_params()}")
-
-# Save the best model and scaler
-import joblib
-joblib.dump(best_models[best_model_name], 'best_loan_model.joblib')
-joblib.dump(scaler, 'scaler.joblib')
-print("\nBest model saved as 'best_loan_model.joblib'")
-print("Scaler saved as 'scaler.joblib'")
-
-# Plot feature importance for the best model if it's a tree-based model
-if hasattr(best_models[best_model_name], 'feature_importances_'):
-    feature_importance = pd.DataFrame({
-        'feature': X_train.columns,
-        'importance': best_models[best_model_name].feature_importances_
-    }).sort_values('importance', ascending=False)
+        # Store best model and score
+        best_models[name] = result['best_estimator']
+        best_scores[name] = result['best_score']
     
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x='importance', y='feature', data=feature_importance.head(10))
-    plt.title(f'Top 10 Most Important Features ({best_model_name})')
-    plt.tight_layout()
-    plt.show()
\ No newline at end of file
+        print(f"Best parameters for {name}:", result['best_params'])
+        print(f"Best cross-validation score: {result['best_score']:.4f}")
+    
+        # Make predictions
+        y_pred = best_models[name].predict(X_test)
+        y_pred_proba = best_models[name].predict_proba(X_test)[:, 1]
+    
+        # Calculate all metrics
+        fpr, tpr, _ = roc_curve(y_test, y_pred_proba)
+        all_metrics[name] = {
+            'Accuracy': accuracy_score(y_test, y_pred),
+            'Precision': precision_score(y_test, y_pred),
+            'Recall': recall_score(y_test, y_pred),
+            'F1 Score': f1_score(y_test, y_pred),
+            'AUC-ROC': auc(fpr, tpr),
+            'Cross-Val Score': best_scores[name]
+        }
+    
+        print(f"\nEvaluation metrics for {name}:")
+        evaluate_model(y_test, y_pred, y_pred_proba, plotter, name)
+
+    # Create comprehensive model comparison table
+    print("\n" + "="*100)
+    print("Model Comparison Table")
+    print("="*100)
+
+    # Convert metrics to DataFrame
+    comparison_df = pd.DataFrame(all_metrics).round(4).T
+
+    # Sort by accuracy
+    comparison_df = comparison_df.sort_values('Accuracy', ascending=False)
+
+    # Add ranking column
+    comparison_df['Rank'] = range(1, len(comparison_df) + 1)
+
+    # Reorder columns to show rank first
+    cols = ['Rank'] + [col for col in comparison_df.columns if col != 'Rank']
+    comparison_df = comparison_df[cols]
+
+    # Print comparison table with formatting
+    print("\nModel Performance Comparison:")
+    print("-" * 120)
+    print(comparison_df.to_string())
+    print("-" * 120)
+
+    # Print best model summary
+    best_model_name = comparison_df.index[0]
+    print(f"\nBest Model: {best_model_name}")
+    print(f"Best Model Parameters: {best_models[best_model_name].get_params()}")
+
+    # Save the best model and scaler
+    import joblib
+    joblib.dump(best_models[best_model_name], 'best_loan_model.joblib')
+    joblib.dump(scaler, 'scaler.joblib')
+    print("\nBest model saved as 'best_loan_model.joblib'")
+    print("Scaler saved as 'scaler.joblib'")
+
+    # Plot feature importance for the best model if it's a tree-based model
+    if hasattr(best_models[best_model_name], 'feature_importances_'):
+        feature_importance = pd.DataFrame({
+            'feature': X_train.columns,
+            'importance': best_models[best_model_name].feature_importances_
+        }).sort_values('importance', ascending=False)
+    
+        plotter.plot('feature_importance', plot_feature_importance, feature_importance, best_model_name)
+
+    return {
+        'train_rows': len(X_train),
+        'test_rows': len(X_test),
+        'search': {'strategy': search, 'cv': cv, 'wall_seconds': round(total_seconds, 3)},
+        'models': {
+            name: {
+                'metrics': {metric: round(float(value), 4) for metric, value in all_metrics[name].items()},
+                'rank': int(comparison_df.loc[name, 'Rank']),
+                'best_params': result['best_params'],
+                'fit_seconds': round(result['fit_seconds'], 3),
+                'fits': result['fits'],
+                'cached_fits': result['cached_fits'],
+            }
+            for name, result in search_results.items()
+        },
+        'best_model': best_model_name,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Train and compare loan approval models')
+    parser.add_argument('--data', default='processed_loan_data.csv',
+                        help='processed data: CSV, .parquet or a directory from chunked preprocessing')
+    add_training_arguments(parser)
+    parser.add_argument('--plots', choices=PLOT_MODES, default='show',
+                        help='show: open windows; background: save PNGs with Agg; skip: no plots')
+    args = parser.parse_args()
+
+    plotter = Plotter(args.plots, args.plots_dir)
+    try:
+        train(args.data, search=args.search, halving_factor=args.halving_factor, workers=args.workers, cv=args.cv,
+              cache_dir=None if args.no_cache else args.cache_dir, plotter=plotter)
+    finally:
+        plotter.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# رسوم التدريب والمعالجة: عرضها في نافذة (التشغيل اليدوي)، أو حفظها كصور PNG بواجهة Agg
+# في مجمّع عمليات خلفي فلا ينتظر التدريب الرسم ولا يحتاج إلى شاشة، أو تخطيها.
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+PLOT_MODES = ('show', 'background', 'skip')
+
+
+def _render(draw, path, args):
+    # يُنفّذ في عملية الرسم: Agg لا يحتاج إلى شاشة
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    import matplotlib.pyplot as plt
+    try:
+        draw(*args)
+        plt.savefig(path, dpi=100, bbox_inches='tight')
+    finally:
+        plt.close('all')
+    return path
+
+
+class Plotter:
+    """
+    تنفيذ دوال الرسم حسب الوضع: show (plt.show كما في التشغيل اليدوي)، background
+    (صورة في directory من مجمّع عمليات)، أو skip
+
+    دوال الرسم يجب أن تكون على مستوى الوحدة (تُرسل إلى عملية أخرى) وترسم على plt مباشرة،
+    وبياناتها تُمرّر كمعاملات.
+    """
+
+    def __init__(self, mode='show', directory='training_plots', workers=2):
+        if mode not in PLOT_MODES:
+            raise ValueError(f'Unknown plot mode: {mode} (expected one of {", ".join(PLOT_MODES)})')
+        self.mode = mode
+        self.directory = directory
+        self._pool = None
+        self._pending = []
+        if mode == 'background':
+            os.makedirs(directory, exist_ok=True)
+            self._pool = ProcessPoolExecutor(max_workers=workers)
+
+    def plot(self, name, draw, *args):
+        """رسم واحد باسم name (اسم ملف الصورة بدون الامتداد)"""
+        if self.mode == 'skip':
+            return
+        if self.mode == 'show':
+            import matplotlib.pyplot as plt
+            draw(*args)
+            plt.show()
+            return
+        path = os.path.join(self.directory, name + '.png')
+        self._pending.append((name, self._pool.submit(_render, draw, path, args)))
+
+    def close(self):
+        """
+        انتظار الرسوم المتبقية وإغلاق المجمّع
+
+        Returns:
+            dict: {'written': {الاسم: المسار}, 'errors': {الاسم: رسالة الخطأ}}؛ خطأ رسم
+                  واحد لا يوقف التدريب
+        """
+        written, errors = {}, {}
+        for name, future in self._pending:
+            try:
+                written[name] = future.result()
+            except Exception as e:
+                errors[name] = f'{type(e).__name__}: {e}'
+        self._pending = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        return {'written': written, 'errors': errors}
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    ذاكرة تخزين مؤقت (LRU) لنتائج التنبؤ، مفتاحها متجه الميزات المرمّز
+
+    آمنة للاستخدام من عدة خيوط (threads). نتائج نسخ النموذج المختلفة تُفصل بالمفتاح
+    (namespace = نسخة النموذج من model_registry)، فلا تُعاد نتيجة نسخة سابقة؛ وتُفرّغ بـ
+    clear() بعد استبدال النموذج لتحرير الذاكرة فقط.
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0):
+        """
+        Args:
+            max_size: أقصى عدد من النتائج المحفوظة (0 يعطّل الذاكرة المؤقتة)
+            ttl: مدة صلاحية النتيجة بالثواني (None بدون انتهاء)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(features, namespace=None):
+        """
+        مفتاح ثابت لمتجه الميزات (إضافة 0.0 توحّد -0.0 مع 0.0)
+
+        namespace (مثل نسخة النموذج) يفصل نتائج النسخ المختلفة لنفس الميزات.
+        """
+        key = (np.asarray(features, dtype=np.float64) + 0.0).tobytes()
+        if namespace is None:
+            return key
+        return namespace.encode() + b'\0' + key
+
+    def get(self, features, namespace=None):
+        """
+        البحث عن نتيجة محفوظة
+
+        Returns:
+            النتيجة المحفوظة أو None
+        """
+        if not self.max_size:
+            return None
+        key = self.make_key(features, namespace)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl is not None and now - entry[1] > self.ttl):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, features, value, namespace=None):
+        """حفظ نتيجة تنبؤ مع حذف الأقدم استخداماً عند امتلاء الذاكرة"""
+        if not self.max_size:
+            return
+        key = self.make_key(features, namespace)
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """تفريغ كل النتائج المحفوظة"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """عدادات الذاكرة المؤقتة للمشغّلين"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,270 @@
+# التنبؤ في تطبيق Flask: تحميل النموذج ونسخه، الذاكرة المؤقتة، والتنبؤ الفردي والجماعي.
+# تستورد flask_app هذه الوحدة عند أول تنبؤ فقط (انظر flask_app.prediction_service)،
+# لأنها تجلب numpy والنموذج (scikit-learn / xgboost عند فتح ملف pickle).
+import logging
+import os
+import pickle
+
+from feature_encoder import FeatureEncoder, parse_numeric_fields
+from metrics import STAGE_SECONDS, count_predictions, log_event
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry, ModelVersion, artifact_digest
+from prediction_cache import PredictionCache
+from tree_compiler import ARTIFACT_HEADER, CompiledLinear, CompiledTrees, compile_model, load_artifact, load_compiled
+from worker_pool import WorkerPool
+
+# ملفات النموذج بترتيب الأفضلية
+MODEL_ARTIFACT_PATH = 'compiled_model'
+COMPILED_MODEL_PATH = 'compiled_model.npz'
+FUSED_MODEL_PATH = 'simple_model_fused.pkl'
+MODEL_PATH = 'simple_model.pkl'
+
+# نسخة التنبؤ البسيط في عمود model_version
+FALLBACK_MODEL_VERSION = 'fallback'
+
+logger = logging.getLogger(__name__)
+
+
+def load_model_artifact():
+    """
+    تحميل النموذج بالترتيب: مجلد النموذج المترجم (compiled_model/) الذي يُفتح بـ mmap
+    بدون pickle، ثم compiled_model.npz، ثم النسخة المدمجة (simple_model_fused.pkl)،
+    ثم simple_model.pkl. النموذج المترجم والمدمج لا يحتاجان إلى خطوة المقياس
+    (إلا إذا حُفظ المجلد مع مقياس غير مدمج).
+
+    Returns:
+        tuple: (النموذج، متوسط المقياس، مقياس المقياس، أسماء الميزات، هل النموذج مدمج، مسار الملف)
+    """
+    try:
+        compiled, feature_names, scaler_mean, scaler_scale = load_artifact(MODEL_ARTIFACT_PATH)
+        log_event(logger, logging.INFO, 'model_file_loaded', source=MODEL_ARTIFACT_PATH)
+        return compiled, scaler_mean, scaler_scale, feature_names, scaler_mean is None, MODEL_ARTIFACT_PATH
+    except FileNotFoundError:
+        pass
+
+    try:
+        compiled, feature_names = load_compiled(COMPILED_MODEL_PATH)
+        log_event(logger, logging.INFO, 'model_file_loaded', source=COMPILED_MODEL_PATH)
+        return compiled, None, None, feature_names, True, COMPILED_MODEL_PATH
+    except FileNotFoundError:
+        pass
+
+    try:
+        with open(FUSED_MODEL_PATH, 'rb') as f:
+            model_data = pickle.load(f)
+        log_event(logger, logging.INFO, 'model_file_loaded', source=FUSED_MODEL_PATH)
+        return model_data['model'], None, None, model_data['feature_names'], True, FUSED_MODEL_PATH
+    except FileNotFoundError:
+        pass
+
+    with open(MODEL_PATH, 'rb') as f:
+        model_data = pickle.load(f)
+    log_event(logger, logging.INFO, 'model_file_loaded', source=MODEL_PATH)
+    return (model_data['model'], model_data['scaler_mean'], model_data['scaler_scale'],
+            model_data.get('feature_names'), False, MODEL_PATH)
+
+
+def load_model_version():
+    """تحميل النموذج من الملفات كنسخة جديدة (عند أول تنبؤ وعند كل إعادة تحميل)"""
+    model, scaler_mean, scaler_scale, feature_names, model_fused, source = load_model_artifact()
+    return ModelVersion(model, scaler_mean, scaler_scale, feature_names, model_fused,
+                        source=source, version=artifact_digest(source))
+
+
+def create_worker_pool(version, processes):
+    """
+    عمليات التنبؤ لنسخة النموذج: يُترجم النموذج (مع دمج المقياس) ويُحفظ في مجلد
+    مؤقت خاص بالنسخة تفتحه العمليات بـ mmap، فتعمل بـ numpy فقط
+    """
+    if isinstance(version.model, (CompiledTrees, CompiledLinear)) and version.fused:
+        compiled = version.model
+    elif version.fused:
+        compiled = compile_model(version.model)
+    else:
+        compiled = compile_model(version.model, version.scaler_mean, version.scaler_scale)
+    return WorkerPool.from_model(compiled, version.encoder.feature_names, processes=processes)
+
+
+def simple_predict_fallback(data):
+    """
+    دالة تنبؤ بسيطة كبديل إذا لم يكن النموذج المدرب متاحاً
+    """
+    applicant_income = float(data['applicant_income'])
+    loan_amount = float(data['loan_amount'])
+    credit_history = float(data['credit_history'])
+
+    # منطق بسيط: إذا الدخل عالي والقرض صغير والتاريخ الائتماني جيد، موافق
+    if applicant_income > 5000 and loan_amount < 200 and credit_history == 1:
+        return 1  # موافق
+    elif applicant_income > 3000 and loan_amount < 100:
+        return 1  # موافق
+    else:
+        return 0  # مرفوض
+
+
+def preprocess_form_data(data):
+    """
+    معالجة بيانات النموذج بدون استخدام pandas أو scikit-learn
+    """
+    # تحويل البيانات إلى القيم المطلوبة
+    numeric = parse_numeric_fields(data)
+
+    # إرجاع البيانات كقاموس
+    return {
+        **numeric,
+        'gender': data['gender'],
+        'married': data['married'],
+        'education': data['education'],
+        'self_employed': data['self_employed'],
+        'property_area': data['property_area']
+    }
+
+
+class PredictionService:
+    """
+    النموذج وكل ما يحتاجه التنبؤ لتطبيق Flask واحد: سجل نسخ النموذج والذاكرة المؤقتة
+
+    يُحمّل النموذج عند أول استخدام للسجل (أول طلب تنبؤ) أو في خيط خلفي بعد بدء
+    الخادم (انظر flask_app.preload_model)، وليس عند إنشاء الخدمة.
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config: إعدادات التطبيق (app.config): PREDICT_WORKERS، MICRO_BATCH، MODEL_WATCH، ...
+        """
+        self.config = config
+        # ذاكرة مؤقتة لنتائج التنبؤ، مفتاحها الميزات ونسخة النموذج وتُفرّغ عند استبدال النموذج
+        self.cache = PredictionCache(max_size=config['PREDICTION_CACHE_SIZE'], ttl=config['PREDICTION_CACHE_TTL'])
+        # نسخة النموذج الحالية؛ الطلبات تأخذها بـ registry.use() وتكمل بها حتى لو استُبدلت
+        self.registry = ModelRegistry(
+            load_model_version,
+            prepare=self.prepare_version,
+            watch_paths=[os.path.join(MODEL_ARTIFACT_PATH, ARTIFACT_HEADER), COMPILED_MODEL_PATH,
+                         FUSED_MODEL_PATH, MODEL_PATH],
+            check_interval=config['MODEL_WATCH_INTERVAL'],
+            on_swap=self.on_swap
+        )
+        # مرمّز الميزات الافتراضي للتنبؤ البسيط بدون نموذج
+        self.fallback_encoder = FeatureEncoder()
+        if config['MODEL_WATCH']:
+            self.registry.start_watcher()
+
+    def prepare_version(self, version):
+        """تشغيل عمليات التنبؤ والمجمّع الخاصين بالنسخة حسب الإعدادات"""
+        if self.config['PREDICT_WORKERS'] > 0:
+            try:
+                version.worker_pool = create_worker_pool(version, self.config['PREDICT_WORKERS']).start()
+                log_event(logger, logging.INFO, 'worker_pool_started', version=version.version,
+                          processes=version.worker_pool.processes)
+            except (ValueError, RuntimeError) as e:
+                # التنبؤ داخل الخادم
+                log_event(logger, logging.WARNING, 'worker_pool_failed', version=version.version, error=str(e))
+
+        if self.config['MICRO_BATCH']:
+            version.micro_batcher = MicroBatcher(
+                version.score,
+                max_batch=self.config['MICRO_BATCH_MAX_SIZE'],
+                max_wait=self.config['MICRO_BATCH_MAX_WAIT'],
+                # دفعة لكل عملية في نفس الوقت
+                concurrency=version.worker_pool.processes if version.worker_pool is not None else 1
+            ).start()
+
+    def on_swap(self, version, previous):
+        """تفريغ نتائج النسخة القديمة من الذاكرة المؤقتة بعد استبدال النموذج"""
+        self.cache.clear()
+        log_event(logger, logging.INFO, 'model_swapped', version=version.version, source=version.source,
+                  previous=previous.version if previous is not None else None)
+
+    def predict_with_model(self, version, data_dict):
+        """
+        التنبؤ باستخدام نسخة النموذج المدرب
+        """
+        with STAGE_SECONDS.time(stage='encode'):
+            features = version.encoder.encode(data_dict)
+
+        # الطلبات المتكررة تُجاب من الذاكرة المؤقتة
+        cached = self.cache.get(features, version.version)
+        if cached is not None:
+            return cached
+
+        # تطبيق المقياس والتنبؤ (مع الطلبات المتزامنة الأخرى إذا كان المجمّع مفعّلاً)
+        prediction = version.predict_one(features)
+        self.cache.put(features, prediction, version.version)
+
+        return prediction
+
+    def predict_fallback_batch(self, features):
+        """
+        نسخة متجهة من simple_predict_fallback تعمل على مصفوفة ميزات كاملة
+        """
+        numeric_index = self.fallback_encoder.numeric_index
+        applicant_income = features[:, numeric_index['applicant_income']]
+        loan_amount = features[:, numeric_index['loan_amount']]
+        credit_history = features[:, numeric_index['credit_history']]
+
+        approved = ((applicant_income > 5000) & (loan_amount < 200) & (credit_history == 1)) | \
+                   ((applicant_income > 3000) & (loan_amount < 100))
+        return approved.astype(int)
+
+    def predict_batch(self, rows):
+        """
+        التنبؤ لمجموعة من الطلبات دفعة واحدة
+
+        Args:
+            rows: قائمة من القواميس بنفس حقول /api/predict
+
+        Returns:
+            list: نتيجة لكل صف بنفس ترتيب المدخلات، إما {'prediction': ..., 'model_version': ...}
+                  أو {'error': ...}
+        """
+        with self.registry.use() as version:
+            # ترميز كل الصفوف في مصفوفة واحدة مع تسجيل أخطاء كل صف على حدة
+            encoder = version.encoder if version is not None else self.fallback_encoder
+            with STAGE_SECONDS.time(stage='encode'):
+                features, valid_indices, errors = encoder.encode_batch(rows)
+            results = [None] * len(rows)
+            for i, error in errors.items():
+                results[i] = {'index': i, 'error': error}
+
+            if valid_indices:
+                if version is not None:
+                    # تطبيق المقياس والتنبؤ على المصفوفة كاملة في استدعاء واحد
+                    predictions = version.score_local(features)
+                    model_version = version.version
+                else:
+                    predictions = self.predict_fallback_batch(features)
+                    model_version = FALLBACK_MODEL_VERSION
+                count_predictions(predictions, version is None)
+
+                for i, prediction in zip(valid_indices, predictions):
+                    results[i] = {'index': i, 'prediction': 'Approved' if int(prediction) == 1 else 'Rejected',
+                                  'model_version': model_version}
+
+        return results
+
+    def predict_request(self, data):
+        """
+        التنبؤ لطلب واحد بالنموذج المدرب أو بالبديل البسيط
+
+        Returns:
+            tuple: (1 للموافقة و 0 للرفض، نسخة النموذج التي قيّمت الطلب)
+        """
+        with self.registry.use() as version:
+            if version is not None:
+                prediction = self.predict_with_model(version, data)
+                count_predictions([prediction], False)
+                return prediction, version.version
+        with STAGE_SECONDS.time(stage='preprocess'):
+            data = preprocess_form_data(data)
+        prediction = simple_predict_fallback(data)
+        count_predictions([prediction], True)
+        return prediction, FALLBACK_MODEL_VERSION
+
+    def confidence(self, model_version=None):
+        """وصف مستوى الثقة في التنبؤ حسب النموذج المستخدم (نسخة الطلب أو النسخة الحالية)"""
+        if model_version is None:
+            fallback = self.registry.current is None
+        else:
+            fallback = model_version == FALLBACK_MODEL_VERSION
+        return 'Low (using fallback)' if fallback else 'High'
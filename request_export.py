@@ -0,0 +1,159 @@
+import csv
+import importlib.util
+import io
+import json
+from datetime import datetime
+
+# أعمدة التصدير بنفس ترتيب serialize_request
+EXPORT_COLUMNS = [
+    'id', 'request_date', 'gender', 'married', 'dependents', 'education', 'self_employed',
+    'applicant_income', 'coapplicant_income', 'loan_amount', 'loan_term', 'credit_history',
+    'property_area', 'prediction', 'model_version'
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def parquet_available():
+    # Parquet اختياري: يتطلب pyarrow (يُستورد عند أول تصدير Parquet فقط)
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def detect_export_format(path):
+    """تحديد صيغة التصدير من امتداد الملف"""
+    name = (path or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.parquet'):
+        return 'parquet'
+    return None
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _text(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_csv(rows, batch_size=1000):
+    """
+    تحويل صفوف الطلبات (tuples بترتيب EXPORT_COLUMNS) إلى CSV على دفعات نصية
+
+    كل دفعة تُكتب في نفس المخزن المؤقت ثم يُفرّغ، لذلك تبقى الذاكرة ثابتة.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for batch in _batches(rows, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_text(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows, batch_size=1000):
+    """تحويل صفوف الطلبات إلى أسطر NDJSON (كائن JSON لكل طلب) على دفعات نصية"""
+    for batch in _batches(rows, batch_size):
+        yield ''.join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(_text, row))), ensure_ascii=False) + '\n'
+            for row in batch
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """ملف للكتابة فقط يحتفظ بالبايتات المكتوبة حتى تُسحب بـ drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('request_date', pa.timestamp('us')),
+        ('gender', pa.string()),
+        ('married', pa.string()),
+        ('dependents', pa.string()),
+        ('education', pa.string()),
+        ('self_employed', pa.string()),
+        ('applicant_income', pa.float64()),
+        ('coapplicant_income', pa.float64()),
+        ('loan_amount', pa.float64()),
+        ('loan_term', pa.int64()),
+        ('credit_history', pa.float64()),
+        ('property_area', pa.string()),
+        ('prediction', pa.string()),
+        ('model_version', pa.string()),
+    ])
+
+
+def iter_parquet(rows, batch_size=50000):
+    """
+    تحويل صفوف الطلبات إلى ملف Parquet على دفعات بايتات
+
+    كل دفعة تُكتب كـ row group مستقلة وتُرسل فوراً، فلا يُحمّل الملف كاملاً في الذاكرة.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+
+    schema = _parquet_schema(pa)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    try:
+        for batch in _batches(rows, batch_size):
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_export(rows, fmt):
+    """اختيار مولّد التصدير المناسب للصيغة"""
+    if fmt == 'csv':
+        return iter_csv(rows)
+    if fmt == 'ndjson':
+        return iter_ndjson(rows)
+    if fmt == 'parquet':
+        return iter_parquet(rows)
+    raise ValueError(f'Unsupported export format: {fmt} (expected one of {", ".join(EXPORT_FORMATS)})')
@@ -1,167 +1,229 @@
+import csv
 import json
-from collections import Counter
 import math
+import random
+import sys
 
-def calculate_basic_stats(data_list):
-    """حساب الإحصائيات الأساسية"""
-    if not data_list:
-        return {}
-    
-    n = len(data_list)
-    total = sum(data_list)
-    mean = total / n
-    
-    # حساب الانحراف المعياري
-    variance = sum((x - mean) ** 2 for x in data_list) / n
-    std_dev = math.sqrt(variance)
-    
-    return {
-        'count': n,
-        'mean': round(mean, 2),
-        'std': round(std_dev, 2),
-        'min': min(data_list),
-        'max': max(data_list)
-    }
-
-def create_approval_distribution(requests):
-    """إنشاء توزيع الموافقات"""
-    if not requests:
-        return None
-    
-    approval_counts = Counter(req.prediction for req in requests)
-    total = len(requests)
-    
-    # التأكد من وجود قيم
-    approved_count = approval_counts.get('Approved', 0)
-    rejected_count = approval_counts.get('Rejected', 0)
-    
-    data = {
-        'labels': ['Approved', 'Rejected'],
-        'values': [approved_count, rejected_count],
-        'percentages': [round((approved_count / total) * 100, 1), round((rejected_count / total) * 100, 1)]
-    }
-    
-    return data
-
-def create_income_analysis(requests):
-    """تحليل الدخل"""
-    if not requests:
-        return None
-    
-    try:
-        incomes = [req.applicant_income for req in requests if req.applicant_income is not None]
-        approved_incomes = [req.applicant_income for req in requests if req.prediction == 'Approved' and req.applicant_income is not None]
-        rejected_incomes = [req.applicant_income for req in requests if req.prediction == 'Rejected' and req.applicant_income is not None]
-        
-        return {
-            'all_incomes': calculate_basic_stats(incomes) if incomes else {},
-            'approved_incomes': calculate_basic_stats(approved_incomes) if approved_incomes else {},
-            'rejected_incomes': calculate_basic_stats(rejected_incomes) if rejected_incomes else {}
-        }
-    except Exception as e:
-        print(f"Error in income analysis: {e}")
-        return None
-
-def create_loan_amount_analysis(requests):
-    """تحليل مبالغ القروض"""
-    if not requests:
-        return None
-    
-    try:
-        amounts = [req.loan_amount for req in requests if req.loan_amount is not None]
-        approved_amounts = [req.loan_amount for req in requests if req.prediction == 'Approved' and req.loan_amount is not None]
-        rejected_amounts = [req.loan_amount for req in requests if req.prediction == 'Rejected' and req.loan_amount is not None]
-        
-        return {
-            'all_amounts': calculate_basic_stats(amounts) if amounts else {},
-            'approved_amounts': calculate_basic_stats(approved_amounts) if approved_amounts else {},
-            'rejected_amounts': calculate_basic_stats(rejected_amounts) if rejected_amounts else {}
-        }
-    except Exception as e:
-        print(f"Error in loan amount analysis: {e}")
-        return None
-
-def create_categorical_analysis(requests, field_name):
-    """تحليل المتغيرات الفئوية"""
-    if not requests:
-        return None
-    
-    try:
-        # الحصول على قيم الحقل
-        field_values = []
-        for req in requests:
-            if hasattr(req, field_name):
-                value = getattr(req, field_name)
-                if value is not None:
-                    field_values.append(value)
-        
-        if not field_values:
+from loan_fields import CATEGORICAL_FIELDS, CSV_COLUMNS, CSV_NUMERIC
+
+# الحقول الرقمية التي يحللها EDA
+NUMERIC_ANALYSES = {
+    'applicant_income': ('income_analysis', 'incomes'),
+    'loan_amount': ('loan_amount_analysis', 'amounts'),
+    'credit_history': ('credit_history_analysis', 'credit'),
+}
+
+
+class QuantileSketch:
+    """
+    عينة خزان (reservoir) بحجم ثابت لتقدير الوسيط والكميات بذاكرة ثابتة
+
+    النتيجة دقيقة تماماً ما دام عدد القيم لا يتجاوز حجم العينة.
+    """
+
+    def __init__(self, size=1024, seed=42):
+        self.size = size
+        self.count = 0
+        self.sample = []
+        self._random = random.Random(seed)
+
+    def add(self, x):
+        self.count += 1
+        if len(self.sample) < self.size:
+            self.sample.append(x)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.size:
+                self.sample[index] = x
+
+    def quantile(self, q):
+        if not self.sample:
             return None
-        
-        # حساب التوزيع
-        value_counts = Counter(field_values)
-        
-        # حساب نسب الموافقة لكل قيمة
-        approval_rates = {}
-        for value in value_counts.keys():
-            approved_count = sum(1 for req in requests 
-                               if getattr(req, field_name) == value and req.prediction == 'Approved')
-            total_count = value_counts[value]
-            approval_rate = (approved_count / total_count) * 100 if total_count > 0 else 0
-            approval_rates[value] = round(approval_rate, 1)
-        
-        return {
-            'value_counts': dict(value_counts),
-            'approval_rates': approval_rates
-        }
-    except Exception as e:
-        print(f"Error in categorical analysis for {field_name}: {e}")
-        return None
-
-def create_credit_history_analysis(requests):
-    """تحليل التاريخ الائتماني"""
-    if not requests:
-        return None
-    
-    try:
-        credit_histories = [req.credit_history for req in requests if req.credit_history is not None]
-        approved_credit = [req.credit_history for req in requests if req.prediction == 'Approved' and req.credit_history is not None]
-        rejected_credit = [req.credit_history for req in requests if req.prediction == 'Rejected' and req.credit_history is not None]
-        
-        return {
-            'all_credit': calculate_basic_stats(credit_histories) if credit_histories else {},
-            'approved_credit': calculate_basic_stats(approved_credit) if approved_credit else {},
-            'rejected_credit': calculate_basic_stats(rejected_credit) if rejected_credit else {}
-        }
-    except Exception as e:
-        print(f"Error in credit history analysis: {e}")
-        return None
+        ordered = sorted(self.sample)
+        position = q * (len(ordered) - 1)
+        lower = math.floor(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
 
-def perform_simple_eda(requests):
-    """تنفيذ تحليل البيانات الاستكشافي البسيط"""
-    if not requests:
-        return {
-            'error': 'لا توجد بيانات متاحة للتحليل'
+
+class RunningStats:
+    """إحصائيات تراكمية في مرور واحد (خوارزمية Welford للمتوسط والتباين)"""
+
+    def __init__(self, sketch_size=None):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch(sketch_size) if sketch_size else None
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        if self.sketch is not None:
+            self.sketch.add(x)
+
+    def to_dict(self):
+        if not self.n:
+            return {}
+        stats = {
+            'count': self.n,
+            'mean': round(self.mean, 2),
+            'std': round(math.sqrt(self.m2 / self.n), 2),
+            'min': self.min,
+            'max': self.max
         }
-    
-    try:
+        if self.sketch is not None:
+            stats['median'] = round(self.sketch.quantile(0.5), 2)
+        return stats
+
+
+def calculate_basic_stats(data_list):
+    """حساب الإحصائيات الأساسية"""
+    stats = RunningStats()
+    for x in data_list:
+        stats.add(x)
+    return stats.to_dict()
+
+
+def _field(record, name):
+    """قراءة حقل من كائن ORM أو من قاموس"""
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name, None)
+
+
+class EDAAccumulator:
+    """
+    تحليل استكشافي في مرور واحد على الطلبات بذاكرة ثابتة
+
+    لكل حقل رقمي ثلاث مجموعات (الكل، الموافق، المرفوض)، ولكل حقل فئوي عدد الطلبات
+    وعدد الموافقات لكل قيمة.
+    """
+
+    def __init__(self, sketch_size=None):
+        self.total = 0
+        self.prediction_counts = {}
+        self.numeric = {field: {group: RunningStats(sketch_size) for group in ('all', 'Approved', 'Rejected')}
+                        for field in NUMERIC_ANALYSES}
+        self.categorical = {field: {} for field in CATEGORICAL_FIELDS}
+
+    def add(self, record):
+        self.total += 1
+        prediction = _field(record, 'prediction')
+        self.prediction_counts[prediction] = self.prediction_counts.get(prediction, 0) + 1
+        approved = prediction == 'Approved'
+
+        for field, groups in self.numeric.items():
+            value = _field(record, field)
+            if value is None:
+                continue
+            groups['all'].add(value)
+            if prediction in ('Approved', 'Rejected'):
+                groups[prediction].add(value)
+
+        for field, counts in self.categorical.items():
+            value = _field(record, field)
+            if value is None:
+                continue
+            entry = counts.get(value)
+            if entry is None:
+                entry = counts[value] = [0, 0]
+            entry[0] += 1
+            if approved:
+                entry[1] += 1
+
+    def results(self):
+        """النتائج بنفس شكل perform_simple_eda"""
+        total = self.total
+        approved_count = self.prediction_counts.get('Approved', 0)
+        rejected_count = self.prediction_counts.get('Rejected', 0)
+
         results = {
-            'total_requests': len(requests),
-            'approval_distribution': create_approval_distribution(requests),
-            'income_analysis': create_income_analysis(requests),
-            'loan_amount_analysis': create_loan_amount_analysis(requests),
-            'credit_history_analysis': create_credit_history_analysis(requests),
-            'gender_analysis': create_categorical_analysis(requests, 'gender'),
-            'married_analysis': create_categorical_analysis(requests, 'married'),
-            'education_analysis': create_categorical_analysis(requests, 'education'),
-            'property_area_analysis': create_categorical_analysis(requests, 'property_area'),
-            'self_employed_analysis': create_categorical_analysis(requests, 'self_employed')
+            'total_requests': total,
+            'approval_distribution': {
+                'labels': ['Approved', 'Rejected'],
+                'values': [approved_count, rejected_count],
+                'percentages': [round((approved_count / total) * 100, 1), round((rejected_count / total) * 100, 1)]
+            }
         }
-        
+
+        for field, (analysis_key, suffix) in NUMERIC_ANALYSES.items():
+            groups = self.numeric[field]
+            results[analysis_key] = {
+                f'all_{suffix}': groups['all'].to_dict(),
+                f'approved_{suffix}': groups['Approved'].to_dict(),
+                f'rejected_{suffix}': groups['Rejected'].to_dict()
+            }
+
+        for field, counts in self.categorical.items():
+            results[f'{field}_analysis'] = {
+                'value_counts': {value: count for value, (count, _) in counts.items()},
+                'approval_rates': {value: round((approved / count) * 100, 1)
+                                   for value, (count, approved) in counts.items()}
+            } if counts else None
+
         return results
-        
+
+
+def perform_simple_eda(requests, sketch_size=None):
+    """
+    تنفيذ تحليل البيانات الاستكشافي البسيط في مرور واحد
+
+    Args:
+        requests: أي iterable من الطلبات (قائمة، مؤشر ORM بـ yield_per، أو csv_records)
+        sketch_size: حجم عينة تقدير الوسيط (None بدون وسيط)
+    """
+    try:
+        accumulator = EDAAccumulator(sketch_size)
+        for record in requests:
+            accumulator.add(record)
+
+        if not accumulator.total:
+            return {
+                'error': 'لا توجد بيانات متاحة للتحليل'
+            }
+
+        return accumulator.results()
+
     except Exception as e:
         print(f"Error in perform_simple_eda: {e}")
         return {
             'error': f'خطأ في تحليل البيانات: {str(e)}'
-        } 
\ No newline at end of file
+        }
+
+
+def csv_records(path):
+    """قراءة ملف بصيغة loan_prediction.csv صفاً بصف كقواميس بحقول الطلب"""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        for values in reader:
+            # عمود فهرس بدون اسم في بداية الصف (كما في loan_prediction.csv)
+            if len(values) == len(header) + 1:
+                values = values[1:]
+            row = dict(zip(header, values))
+            record = {}
+            for column, field in CSV_COLUMNS.items():
+                value = (row.get(column) or '').strip()
+                if not value:
+                    record[field] = None
+                elif field in CSV_NUMERIC:
+                    record[field] = float(value)
+                else:
+                    record[field] = value
+            status = (row.get('Loan_Status') or '').strip()
+            record['prediction'] = {'Y': 'Approved', 'N': 'Rejected'}.get(status, status or None)
+            yield record
+
+
+if __name__ == '__main__':
+    # مثال: python simple_eda.py loan_prediction.csv
+    path = sys.argv[1] if len(sys.argv) > 1 else 'loan_prediction.csv'
+    print(json.dumps(perform_simple_eda(csv_records(path), sketch_size=4096), indent=2, ensure_ascii=False))
@@ -0,0 +1,139 @@
+import logging
+import math
+from sqlalchemy import func
+
+from metrics import log_event
+from loan_fields import CATEGORICAL_FIELDS
+from simple_eda import NUMERIC_ANALYSES
+from summary_stats import merge_accumulator, new_accumulator
+
+logger = logging.getLogger(__name__)
+
+
+def stats_from_sums(acc):
+    """
+    حساب نفس نتائج calculate_basic_stats من المجاميع
+
+    التباين (على مستوى المجتمع) = مجموع المربعات / n - المتوسط²
+    """
+    n = acc['count']
+    if not n:
+        return {}
+    mean = acc['sum'] / n
+    variance = max(acc['sumsq'] / n - mean ** 2, 0.0)
+    return {
+        'count': n,
+        'mean': round(mean, 2),
+        'std': round(math.sqrt(variance), 2),
+        'min': acc['min'],
+        'max': acc['max']
+    }
+
+
+def build_eda_results(total, prediction_counts, category_counts, numeric_sums):
+    """
+    بناء قاموس النتائج بنفس شكل perform_simple_eda من المجاميع
+
+    Args:
+        total: عدد الطلبات الكلي
+        prediction_counts: {نتيجة التنبؤ: العدد}
+        category_counts: {الحقل: {القيمة: [العدد، عدد الموافقات]}}
+        numeric_sums: {الحقل: {'all' | 'Approved' | 'Rejected': مجاميع}}
+    """
+    approved_count = prediction_counts.get('Approved', 0)
+    rejected_count = prediction_counts.get('Rejected', 0)
+
+    results = {
+        'total_requests': total,
+        'approval_distribution': {
+            'labels': ['Approved', 'Rejected'],
+            'values': [approved_count, rejected_count],
+            'percentages': [round((approved_count / total) * 100, 1), round((rejected_count / total) * 100, 1)]
+        }
+    }
+
+    for field, (analysis_key, suffix) in NUMERIC_ANALYSES.items():
+        sums = numeric_sums[field]
+        results[analysis_key] = {
+            f'all_{suffix}': stats_from_sums(sums['all']),
+            f'approved_{suffix}': stats_from_sums(sums['Approved']),
+            f'rejected_{suffix}': stats_from_sums(sums['Rejected'])
+        }
+
+    for field in CATEGORICAL_FIELDS:
+        counts = category_counts[field]
+        if not counts:
+            results[f'{field}_analysis'] = None
+            continue
+        results[f'{field}_analysis'] = {
+            'value_counts': {value: count for value, (count, _) in counts.items()},
+            'approval_rates': {value: round((approved / count) * 100, 1) if count > 0 else 0
+                               for value, (count, approved) in counts.items()}
+        }
+
+    return results
+
+
+def perform_sql_eda(session, model):
+    """
+    تنفيذ نفس تحليل perform_simple_eda باستعلام تجميعي واحد في قاعدة البيانات
+
+    يُجمّع الجدول حسب كل الحقول الفئوية ونتيجة التنبؤ مع COUNT/SUM/MIN/MAX
+    للحقول الرقمية، ثم تُدمج المجموعات (بضع عشرات فقط) في بايثون. لذلك يعتمد
+    الوقت على عدد المجموعات وليس على عدد الطلبات.
+
+    Args:
+        session: جلسة SQLAlchemy
+        model: نموذج LoanRequest
+    """
+    try:
+        group_columns = [getattr(model, field) for field in CATEGORICAL_FIELDS] + [model.prediction]
+        aggregates = [func.count()]
+        for field in NUMERIC_ANALYSES:
+            column = getattr(model, field)
+            aggregates += [func.count(column), func.sum(column), func.sum(column * column),
+                           func.min(column), func.max(column)]
+
+        rows = session.query(*group_columns, *aggregates).group_by(*group_columns).all()
+
+        total = 0
+        prediction_counts = {}
+        category_counts = {field: {} for field in CATEGORICAL_FIELDS}
+        numeric_sums = {field: {key: new_accumulator() for key in ('all', 'Approved', 'Rejected')}
+                        for field in NUMERIC_ANALYSES}
+
+        n_categories = len(CATEGORICAL_FIELDS)
+        for row in rows:
+            prediction = row[n_categories]
+            count = row[n_categories + 1]
+            total += count
+            prediction_counts[prediction] = prediction_counts.get(prediction, 0) + count
+
+            for field, value in zip(CATEGORICAL_FIELDS, row[:n_categories]):
+                if value is None:
+                    continue
+                entry = category_counts[field].setdefault(value, [0, 0])
+                entry[0] += count
+                if prediction == 'Approved':
+                    entry[1] += count
+
+            offset = n_categories + 2
+            for field in NUMERIC_ANALYSES:
+                sums = row[offset:offset + 5]
+                offset += 5
+                merge_accumulator(numeric_sums[field]['all'], *sums)
+                if prediction in ('Approved', 'Rejected'):
+                    merge_accumulator(numeric_sums[field][prediction], *sums)
+
+        if not total:
+            return {
+                'error': 'لا توجد بيانات متاحة للتحليل'
+            }
+
+        return build_eda_results(total, prediction_counts, category_counts, numeric_sums)
+
+    except Exception as e:
+        log_event(logger, logging.ERROR, 'sql_eda_failed', error=str(e))
+        return {
+            'error': f'خطأ في تحليل البيانات: {str(e)}'
+        }
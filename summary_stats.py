@@ -0,0 +1,263 @@
+from collections import defaultdict
+
+from sqlalchemy import MetaData, Table, Column, String, Integer, Float, Boolean, func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from loan_fields import CATEGORICAL_FIELDS
+
+# الحقول الفئوية المحفوظة في الملخص (credit_history تُعامل كفئة للرسوم البيانية أيضاً)
+SUMMARY_CATEGORY_FIELDS = CATEGORICAL_FIELDS + ['prediction', 'credit_history']
+SUMMARY_NUMERIC_FIELDS = ['applicant_income', 'coapplicant_income', 'loan_amount', 'loan_term', 'credit_history']
+# صف العدد الكلي في جدول الفئات
+TOTAL_FIELD = '__all__'
+PREDICTION_GROUPS = ('Approved', 'Rejected')
+
+metadata = MetaData()
+
+# لكل (حقل، قيمة): عدد الطلبات وعدد الموافقات
+category_stats = Table(
+    'summary_category_stats', metadata,
+    Column('field', String(30), primary_key=True),
+    Column('value', String(30), primary_key=True),
+    Column('count', Integer, nullable=False),
+    Column('approved', Integer, nullable=False)
+)
+
+# لكل (حقل رقمي، مجموعة): العدد والمجموع ومجموع المربعات وأصغر وأكبر قيمة.
+# الحذف لا يمكنه تحديث min/max تراكمياً، لذلك يُعلّم الصف stale ويُعاد حسابهما عند القراءة.
+numeric_stats = Table(
+    'summary_numeric_stats', metadata,
+    Column('field', String(30), primary_key=True),
+    Column('grp', String(10), primary_key=True),  # 'all' أو 'Approved' أو 'Rejected'
+    Column('count', Integer, nullable=False),
+    Column('sum', Float, nullable=False),
+    Column('sumsq', Float, nullable=False),
+    Column('min', Float),
+    Column('max', Float),
+    Column('stale', Boolean, nullable=False)
+)
+
+
+def new_accumulator():
+    """مجاميع حقل رقمي: العدد، المجموع، مجموع المربعات، أصغر وأكبر قيمة"""
+    return {'count': 0, 'sum': 0.0, 'sumsq': 0.0, 'min': None, 'max': None}
+
+
+def merge_accumulator(acc, count, total, sumsq, minimum, maximum):
+    """دمج مجاميع مجموعة واحدة في المجاميع الكلية"""
+    if not count:
+        return
+    acc['count'] += count
+    acc['sum'] += total
+    acc['sumsq'] += sumsq
+    acc['min'] = minimum if acc['min'] is None else min(acc['min'], minimum)
+    acc['max'] = maximum if acc['max'] is None else max(acc['max'], maximum)
+
+
+def _get(record, field):
+    """قراءة حقل من كائن ORM أو من قاموس"""
+    if isinstance(record, dict):
+        return record.get(field)
+    return getattr(record, field)
+
+
+def category_value(field, value):
+    """القيمة النصية المخزنة لفئة ما (credit_history تُخزّن كـ '1.0' أو '0.0')"""
+    if field == 'credit_history':
+        return str(float(value))
+    return str(value)
+
+
+def _collect_deltas(records, sign):
+    """تجميع تغييرات مجموعة من الطلبات في بايثون قبل كتابتها دفعة واحدة"""
+    categories = defaultdict(lambda: [0, 0])
+    numeric = defaultdict(new_accumulator)
+
+    for record in records:
+        prediction = _get(record, 'prediction')
+        approved = sign if prediction == 'Approved' else 0
+
+        keys = [(TOTAL_FIELD, '')]
+        for field in SUMMARY_CATEGORY_FIELDS:
+            value = _get(record, field)
+            if value is not None:
+                keys.append((field, category_value(field, value)))
+        for key in keys:
+            categories[key][0] += sign
+            categories[key][1] += approved
+
+        groups = ['all'] + ([prediction] if prediction in PREDICTION_GROUPS else [])
+        for field in SUMMARY_NUMERIC_FIELDS:
+            value = _get(record, field)
+            if value is None:
+                continue
+            value = float(value)
+            for group in groups:
+                merge_accumulator(numeric[(field, group)], sign, sign * value, sign * value * value, value, value)
+
+    return categories, numeric
+
+
+def record_requests(session, records, sign=1):
+    """
+    تحديث الملخص بطلبات مضافة (sign=1) أو محذوفة (sign=-1)
+
+    يُنفّذ داخل نفس المعاملة (transaction) التي تضيف أو تحذف الطلبات، والتحديث
+    ذري في SQL (count = count + delta)، لذلك لا تضيع تحديثات العمليات المتزامنة.
+    """
+    categories, numeric = _collect_deltas(records, sign)
+    if not categories:
+        return
+
+    stmt = sqlite_insert(category_stats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['field', 'value'],
+        set_={
+            'count': category_stats.c.count + stmt.excluded.count,
+            'approved': category_stats.c.approved + stmt.excluded.approved
+        }
+    )
+    session.execute(stmt, [
+        {'field': field, 'value': value, 'count': count, 'approved': approved}
+        for (field, value), (count, approved) in categories.items()
+    ])
+
+    if not numeric:
+        return
+
+    stmt = sqlite_insert(numeric_stats)
+    columns = numeric_stats.c
+    excluded = stmt.excluded
+    set_ = {
+        'count': columns.count + excluded.count,
+        'sum': columns.sum + excluded.sum,
+        'sumsq': columns.sumsq + excluded.sumsq,
+    }
+    if sign > 0:
+        set_['min'] = func.min(func.coalesce(columns.min, excluded.min), excluded.min)
+        set_['max'] = func.max(func.coalesce(columns.max, excluded.max), excluded.max)
+    else:
+        # حذف القيمة الصغرى أو الكبرى يجعل min/max غير معروفين حتى إعادة الحساب
+        set_['stale'] = or_(columns.stale,
+                            func.coalesce(excluded.min <= columns.min, True),
+                            func.coalesce(excluded.max >= columns.max, True))
+    stmt = stmt.on_conflict_do_update(index_elements=['field', 'grp'], set_=set_)
+
+    session.execute(stmt, [
+        {'field': field, 'grp': group, 'count': acc['count'], 'sum': acc['sum'], 'sumsq': acc['sumsq'],
+         'min': acc['min'], 'max': acc['max'], 'stale': sign < 0}
+        for (field, group), acc in numeric.items()
+    ])
+
+
+def refresh_stale_extremes(session, model):
+    """إعادة حساب min/max للصفوف المعلّمة stale بعد الحذف"""
+    stale = session.query(numeric_stats.c.field, numeric_stats.c.grp).filter(numeric_stats.c.stale).all()
+    for field, group in stale:
+        column = getattr(model, field)
+        query = session.query(func.min(column), func.max(column))
+        if group != 'all':
+            query = query.filter(model.prediction == group)
+        minimum, maximum = query.one()
+        session.execute(
+            numeric_stats.update()
+            .where((numeric_stats.c.field == field) & (numeric_stats.c.grp == group))
+            .values(min=minimum, max=maximum, stale=False)
+        )
+    if stale:
+        session.commit()
+
+
+def load_summary(session, model):
+    """
+    قراءة الملخص المحسوب مسبقاً
+
+    Returns:
+        dict: total و categories ({الحقل: {القيمة: [العدد، الموافقات]}})
+              و numeric ({الحقل: {المجموعة: مجاميع}})
+    """
+    refresh_stale_extremes(session, model)
+
+    categories = {field: {} for field in SUMMARY_CATEGORY_FIELDS + [TOTAL_FIELD]}
+    for field, value, count, approved in session.query(
+            category_stats.c.field, category_stats.c.value, category_stats.c.count, category_stats.c.approved):
+        if count > 0:
+            categories.setdefault(field, {})[value] = [count, approved]
+
+    numeric = {field: {group: new_accumulator() for group in ('all',) + PREDICTION_GROUPS}
+               for field in SUMMARY_NUMERIC_FIELDS}
+    for field, group, count, total, sumsq, minimum, maximum in session.query(
+            numeric_stats.c.field, numeric_stats.c.grp, numeric_stats.c.count, numeric_stats.c.sum,
+            numeric_stats.c.sumsq, numeric_stats.c.min, numeric_stats.c.max):
+        if field in numeric and count > 0:
+            numeric[field][group] = {'count': count, 'sum': total, 'sumsq': sumsq, 'min': minimum, 'max': maximum}
+
+    total = categories[TOTAL_FIELD].get('', [0, 0])[0]
+    return {'total': total, 'categories': categories, 'numeric': numeric}
+
+
+def summary_eda_results(summary):
+    """بناء نتائج EDA (بنفس شكل perform_simple_eda) من الملخص"""
+    total = summary['total']
+    if not total:
+        return {
+            'error': 'لا توجد بيانات متاحة للتحليل'
+        }
+    categories = summary['categories']
+    prediction_counts = {value: count for value, (count, _) in categories['prediction'].items()}
+    category_counts = {field: categories[field] for field in CATEGORICAL_FIELDS}
+    # وحدة التحليل تُستورد عند أول عرض لنتائج EDA، لا مع flask_app
+    from sql_eda import build_eda_results
+    return build_eda_results(total, prediction_counts, category_counts, summary['numeric'])
+
+
+def is_empty(session):
+    """هل جدول الملخص فارغ (قاعدة بيانات قديمة أو جديدة)"""
+    return session.query(category_stats.c.field).first() is None
+
+
+def rebuild_summary(session, model):
+    """
+    إعادة بناء الملخص بالكامل من جدول الطلبات باستعلامات تجميعية
+
+    تُستخدم لمطابقة الملخص مع الجدول الأساسي (مثلاً بعد تعديل يدوي لقاعدة البيانات).
+    """
+    session.execute(category_stats.delete())
+    session.execute(numeric_stats.delete())
+
+    categories = defaultdict(lambda: [0, 0])
+    for field in SUMMARY_CATEGORY_FIELDS + [TOTAL_FIELD]:
+        columns = [model.prediction] if field == TOTAL_FIELD else [getattr(model, field), model.prediction]
+        for row in session.query(*columns, func.count()).group_by(*columns):
+            if field == TOTAL_FIELD:
+                value, (prediction, count) = '', row
+            else:
+                value, prediction, count = row
+                if value is None:
+                    continue
+                value = category_value(field, value)
+            categories[(field, value)][0] += count
+            if prediction == 'Approved':
+                categories[(field, value)][1] += count
+
+    numeric = defaultdict(new_accumulator)
+    for field in SUMMARY_NUMERIC_FIELDS:
+        column = getattr(model, field)
+        for prediction, *sums in session.query(
+                model.prediction, func.count(column), func.sum(column), func.sum(column * column),
+                func.min(column), func.max(column)).group_by(model.prediction):
+            merge_accumulator(numeric[(field, 'all')], *sums)
+            if prediction in PREDICTION_GROUPS:
+                merge_accumulator(numeric[(field, prediction)], *sums)
+
+    if categories:
+        session.execute(category_stats.insert(), [
+            {'field': field, 'value': value, 'count': count, 'approved': approved}
+            for (field, value), (count, approved) in categories.items()
+        ])
+    rows = [{'field': field, 'grp': group, 'count': acc['count'], 'sum': acc['sum'], 'sumsq': acc['sumsq'],
+             'min': acc['min'], 'max': acc['max'], 'stale': False}
+            for (field, group), acc in numeric.items() if acc['count']]
+    if rows:
+        session.execute(numeric_stats.insert(), rows)
+    session.commit()
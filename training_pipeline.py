@@ -0,0 +1,133 @@
+# إعادة التدريب بأمر واحد بدون شاشة ولا خطوات تفاعلية: معالجة البيانات ← التدريب ← تحويل
+# النموذج، مع حفظ الرسوم كصور (Agg) في مجمّع عمليات خلفي وتقرير JSON بالقياسات والأزمنة:
+#   python training_pipeline.py --search halving --report training_report.json
+#   python training_pipeline.py --plots skip --stages train,convert      # بيانات معالجة موجودة
+import matplotlib
+matplotlib.use('Agg')
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+from model_training import add_training_arguments
+from plotting import Plotter
+
+STAGES = ('preprocess', 'train', 'convert')
+
+
+def run_preprocess(args, plotter):
+    if args.chunksize:
+        from chunked_preprocessing import preprocess_chunked
+        return preprocess_chunked(args.input, args.data, args.chunksize)
+    # imblearn مطلوبة لهذه المرحلة فقط
+    from data_preprocessing import preprocess
+    return preprocess(args.input, args.data, plotter)
+
+
+def run_train(args, plotter):
+    from model_training import train
+    return train(args.data, search=args.search, halving_factor=args.halving_factor, workers=args.workers,
+                 cv=args.cv, cache_dir=None if args.no_cache else args.cache_dir, plotter=plotter)
+
+
+def run_convert(args, plotter):
+    from convert_model_to_pickle import create_compiled_model, create_fused_model, create_simple_prediction_function
+    create_simple_prediction_function(args.data)
+    return {
+        'fused_agreement': create_fused_model(data_path=args.data),
+        'compiled_agreement': create_compiled_model(data_path=args.data),
+    }
+
+
+STAGE_FUNCTIONS = {'preprocess': run_preprocess, 'train': run_train, 'convert': run_convert}
+
+
+def write_report(report, path):
+    """كتابة التقرير إلى ملف مؤقت ثم استبداله، فلا يقرأ أحد تقريراً ناقصاً"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(temporary, path)
+
+
+def run_pipeline(args):
+    """
+    تنفيذ المراحل بالترتيب وإرجاع التقرير
+
+    تتوقف السلسلة عند أول مرحلة فاشلة (status='failed' مع الخطأ) فلا يُحوّل نموذج لم
+    يكتمل تدريبه. الرسوم تُنتظر في النهاية وأخطاؤها تُسجّل في التقرير دون إيقاف التدريب.
+    """
+    started = time.perf_counter()
+    report = {
+        'started': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'options': {key: value for key, value in vars(args).items() if key != 'report'},
+        'status': 'ok',
+        'stages': {},
+    }
+    plotter = Plotter(args.plots, args.plots_dir, workers=args.plot_workers)
+    try:
+        for stage in args.stages:
+            stage_started = time.perf_counter()
+            print(f"\n=== {stage} ===")
+            try:
+                result = STAGE_FUNCTIONS[stage](args, plotter)
+            except Exception as e:
+                report['status'] = 'failed'
+                report['failed_stage'] = stage
+                report['error'] = f'{type(e).__name__}: {e}'
+                report['traceback'] = traceback.format_exc()
+                print(report['traceback'], file=sys.stderr)
+                break
+            finally:
+                report['stages'][stage] = {'seconds': round(time.perf_counter() - stage_started, 3)}
+            report['stages'][stage]['result'] = result
+    finally:
+        plots_started = time.perf_counter()
+        report['plots'] = plotter.close()
+        report['plots']['wait_seconds'] = round(time.perf_counter() - plots_started, 3)
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Preprocess, train and convert the loan model in one run')
+    parser.add_argument('--stages', default=','.join(STAGES), help='stages to run, comma separated')
+    parser.add_argument('--input', default='loan_prediction.csv', help='raw applications for preprocessing')
+    parser.add_argument('--data', default=None,
+                        help='processed training data (default processed_loan_data.csv; with --chunksize '
+                             'a .parquet file or .npy directory, default processed_loan_data)')
+    parser.add_argument('--chunksize', type=int, default=0,
+                        help='preprocess in chunks of this many rows (files larger than memory, no SMOTE)')
+    parser.add_argument('--plots', choices=('background', 'skip'), default='background',
+                        help='background: save PNGs with Agg in worker processes; skip: no plots')
+    parser.add_argument('--plot-workers', type=int, default=2, help='processes rendering plots')
+    parser.add_argument('--report', default='training_report.json', help='JSON report path')
+    add_training_arguments(parser)
+    args = parser.parse_args()
+    args.stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)} (expected {', '.join(STAGES)})")
+    args.stages = [stage for stage in STAGES if stage in args.stages]
+    if args.data is None:
+        args.data = 'processed_loan_data' if args.chunksize else 'processed_loan_data.csv'
+    if args.chunksize and 'preprocess' in args.stages and args.data.lower().endswith('.csv'):
+        parser.error('--chunksize writes a .parquet file or a .npy directory; pass --data without .csv')
+
+    report = run_pipeline(args)
+    write_report(report, args.report)
+    stages = ', '.join(f"{stage} {info['seconds']:.1f} s" for stage, info in report['stages'].items())
+    print(f"\nPipeline {report['status']} in {report['seconds']:.1f} s ({stages}); report saved to {args.report}")
+    return 0 if report['status'] == 'ok' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
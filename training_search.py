@@ -0,0 +1,244 @@
+# البحث عن أفضل المعاملات لكل نموذج في model_training: كل (نموذج، معاملات، طيّة) مهمة مستقلة
+# في مجمّع عمليات واحد بعدد الأنوية (ProcessPoolExecutor)، ونتيجة كل مهمة تُحفظ على القرص بمفتاح
+# يشمل بصمة البيانات، فإعادة التشغيل بنفس البيانات لا تحسب إلا نقاط الشبكة الجديدة.
+import hashlib
+import importlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+SEARCH_STRATEGIES = ('grid', 'halving')
+
+
+def data_hash(X, y):
+    """بصمة بيانات التدريب (الأعمدة والقيم والهدف)"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in getattr(X, 'columns', [])]).encode())
+    for values in (X, y):
+        array = np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _library_version(estimator):
+    # نتائج نفس المعاملات قد تتغير بين نسخ المكتبة (sklearn أو xgboost)
+    module = importlib.import_module(type(estimator).__module__.split('.')[0])
+    return getattr(module, '__version__', None)
+
+
+class FoldCache:
+    """
+    نتائج الطيّات على القرص: ملف JSON صغير لكل (بيانات، نموذج، معاملات كاملة، طيّة)
+
+    الكتابة إلى ملف مؤقت ثم os.replace، فيمكن لعدة عمليات الكتابة في نفس المجلد.
+    directory=None يعطّل الحفظ.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, estimator, fingerprint, cv, fold):
+        description = {
+            'data': fingerprint,
+            'estimator': f'{type(estimator).__module__}.{type(estimator).__qualname__}',
+            'version': _library_version(estimator),
+            'params': estimator.get_params(deep=False),
+            'cv': cv,
+            'fold': fold,
+            'scoring': 'accuracy',
+        }
+        encoded = json.dumps(description, sort_keys=True, default=repr)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        if self.directory is None:
+            self.misses += 1
+            return None
+        try:
+            with open(self._path(key)) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(result, f)
+        os.replace(temporary, path)
+
+
+# بيانات التدريب والطيّات في كل عملية من المجمّع: تُرسل مرة واحدة عند بدء العملية لا مع كل مهمة
+_worker_data = {}
+
+
+def _init_worker(X, y, folds):
+    _worker_data.update(X=X, y=y, folds=folds)
+
+
+def _fold_score(estimator, fold):
+    X, y = _worker_data['X'], _worker_data['y']
+    train, test = _worker_data['folds'][fold]
+    started = time.perf_counter()
+    model = clone(estimator).fit(X.iloc[train], y.iloc[train])
+    score = accuracy_score(y.iloc[test], model.predict(X.iloc[test]))
+    return {'score': float(score), 'fit_seconds': time.perf_counter() - started}
+
+
+def _fit_best(estimator):
+    started = time.perf_counter()
+    model = clone(estimator).fit(_worker_data['X'], _worker_data['y'])
+    return model, time.perf_counter() - started
+
+
+def _map(pool, function, arguments):
+    # pool=None ينفّذ في نفس العملية (workers=1)
+    if pool is None:
+        return [function(*args) for args in arguments]
+    futures = [pool.submit(function, *args) for args in arguments]
+    return [future.result() for future in futures]
+
+
+def _rungs(n_folds, factor, strategy):
+    """عدد الطيّات في كل مرحلة: الشبكة كاملة تُقيّم على كل الطيّات مباشرة"""
+    if strategy == 'grid':
+        return [n_folds]
+    rungs, folds = [], 1
+    while folds < n_folds:
+        rungs.append(folds)
+        folds *= factor
+    return rungs + [n_folds]
+
+
+class _ModelSearch:
+    """حالة البحث لنموذج واحد: درجات كل نقطة من الشبكة لكل طيّة، والنقاط الباقية في halving"""
+
+    def __init__(self, name, estimator, grid, fingerprint, cv, cache_dir, factor):
+        self.name = name
+        self.estimator = estimator
+        self.fingerprint = fingerprint
+        self.cv = cv
+        self.factor = factor
+        self.cache = FoldCache(cache_dir)
+        self.candidates = [{'params': params, 'scores': {}} for params in ParameterGrid(grid)]
+        self.survivors = self.candidates
+        self.fits = 0
+        self.fit_seconds = 0.0
+
+    def tasks(self, rung, n_folds):
+        """المهام غير المحفوظة للمرحلة: (النقطة، الطيّة، النموذج بمعاملاته، مفتاح الحفظ)"""
+        if rung:
+            keep = max(1, len(self.survivors) // self.factor)
+            # sorted مستقر: عند التساوي تبقى النقطة الأسبق في الشبكة
+            self.survivors = sorted(self.survivors, key=lambda candidate: -_mean(candidate))[:keep]
+        tasks = []
+        for candidate in self.survivors:
+            configured = clone(self.estimator).set_params(**candidate['params'])
+            for fold in range(n_folds):
+                if fold in candidate['scores']:
+                    continue
+                key = self.cache.key(configured, self.fingerprint, self.cv, fold)
+                result = self.cache.get(key)
+                if result is None:
+                    tasks.append((candidate, fold, configured, key))
+                else:
+                    candidate['scores'][fold] = result['score']
+        return tasks
+
+    def record(self, task, result):
+        candidate, fold, _, key = task
+        self.cache.put(key, result)
+        candidate['scores'][fold] = result['score']
+        self.fits += 1
+        self.fit_seconds += result['fit_seconds']
+
+    def best(self):
+        """النقطة الأعلى متوسطاً بين المكتملة على كل الطيّات (الأولى في ترتيب الشبكة عند التساوي)"""
+        complete = [candidate for candidate in self.candidates if len(candidate['scores']) == self.cv]
+        return max(complete, key=_mean)
+
+
+def _mean(candidate):
+    return np.mean(list(candidate['scores'].values()))
+
+
+def run_searches(models, X, y, cv=5, cache_dir=None, strategy='grid', factor=3, workers=None):
+    """
+    البحث عن أفضل معاملات كل النماذج: {الاسم: {'model': ..., 'params': شبكة}} كما في model_training
+
+    التحقق المتقاطع بـ StratifiedKFold مثل GridSearchCV. strategy='grid' يقيّم كل نقاط الشبكة
+    على كل الطيّات. strategy='halving' (successive halving) يقيّم كل النقاط على طيّة واحدة، ثم
+    يكمل أفضل 1/factor منها فقط على طيّات أكثر حتى كل الطيّات، فتتوقف النقاط الضعيفة مبكراً.
+
+    كل (نموذج، نقطة، طيّة) غير محفوظة مهمة في مجمّع واحد بـ workers عملية (افتراضياً عدد
+    الأنوية؛ workers=1 في نفس العملية)، فيتوزع بحث Random Forest الكبير على كل الأنوية كما
+    في GridSearchCV(n_jobs=-1). مراحل halving لكل النماذج تُرسل معاً، ثم تُدرّب أفضل نقطة لكل
+    نموذج على كل بيانات التدريب في نفس المجمّع. النتائج بنفس ترتيب models.
+
+    Returns:
+        tuple: ({الاسم: best_estimator، best_params، best_score، candidates (لكل نقطة متوسطها
+               وعدد طيّاتها)، fits و cached_fits، و fit_seconds (مجموع أزمنة التدريب)}،
+               الزمن الكلي بالثواني)
+    """
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f'Unknown search strategy: {strategy} (expected one of {", ".join(SEARCH_STRATEGIES)})')
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    fingerprint = data_hash(X, y)
+    folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+    searches = [_ModelSearch(name, info['model'], info['params'], fingerprint, cv, cache_dir, factor)
+                for name, info in models.items()]
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y, folds))
+    else:
+        _init_worker(X, y, folds)
+    try:
+        for rung, n_folds in enumerate(_rungs(cv, factor, strategy)):
+            tasks = [(search, task) for search in searches for task in search.tasks(rung, n_folds)]
+            scores = _map(pool, _fold_score, [(task[2], task[1]) for _, task in tasks])
+            for (search, task), result in zip(tasks, scores):
+                search.record(task, result)
+
+        best = [search.best() for search in searches]
+        fitted = _map(pool, _fit_best, [(clone(search.estimator).set_params(**candidate['params']),)
+                                        for search, candidate in zip(searches, best)])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _worker_data.clear()
+
+    results = {}
+    for search, candidate, (estimator, seconds) in zip(searches, best, fitted):
+        results[search.name] = {
+            'name': search.name,
+            'best_estimator': estimator,
+            'best_params': candidate['params'],
+            'best_score': float(_mean(candidate)),
+            'candidates': [{'params': item['params'], 'mean_score': float(_mean(item)),
+                            'folds': len(item['scores'])} for item in search.candidates],
+            'fits': search.fits,
+            'cached_fits': search.cache.hits,
+            'fit_seconds': search.fit_seconds + seconds,
+        }
+    return results, time.perf_counter() - started
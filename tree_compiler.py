@@ -0,0 +1,431 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+# هذه الوحدة تعتمد على numpy فقط، لذلك يمكن لتطبيق الويب تحميل النموذج المترجم
+# بدون استيراد scikit-learn أو xgboost
+
+
+def _ordered_key(x, int_type):
+    """تحويل قيم float إلى أعداد صحيحة تحافظ على الترتيب (ودالتها العكسية هي نفسها)"""
+    bits = x.view(int_type)
+    return bits ^ ((bits >> (8 * bits.itemsize - 1)) & np.iinfo(int_type).max)
+
+
+def fold_thresholds(thresholds, mean, scale, strict, dtype=np.float32):
+    """
+    تحويل عتبات مقاسة إلى عتبات على الميزات الخام
+
+    (x - mean) / scale < t  تكافئ  x < t * scale + mean  لأن scale > 0.
+    النماذج الأصلية تقارن الميزات المقاسة بدقة float32، لذلك نبحث (بالتنصيف) عن
+    العتبة الخام التي تعطي نفس القرار تماماً لكل قيمة من النوع dtype.
+
+    Args:
+        thresholds: العتبات الأصلية (float32 لـ XGBoost و float64 لـ scikit-learn)
+        mean: متوسط المقياس لميزة كل عتبة
+        scale: مقياس المقياس لميزة كل عتبة
+        strict: True إذا كان شرط الفرع الأيسر x < t (XGBoost) و False إذا كان x <= t (scikit-learn)
+        dtype: نوع الميزات الخام عند المقارنة
+
+    Returns:
+        عتبات float64 تُستخدم بنفس نوع المقارنة (strict) على ميزات من النوع dtype
+    """
+    thresholds = np.asarray(thresholds)
+    int_type = np.int32 if dtype == np.float32 else np.int64
+
+    def goes_left(key):
+        x = _ordered_key(key, int_type).view(dtype).astype(np.float64)
+        scaled = ((x - mean) / scale).astype(np.float32)
+        return scaled < thresholds if strict else scaled <= thresholds
+
+    # نطاق أوسع بكثير من دقة float32 للعتبة حول التقدير التقريبي
+    estimate = thresholds.astype(np.float64) * scale + mean
+    width = (np.abs(thresholds.astype(np.float64)) + 1.0) * 1e-4 * scale
+    lo = _ordered_key((estimate - width).astype(dtype), int_type).astype(np.int64)
+    hi = _ordered_key((estimate + width).astype(dtype), int_type).astype(np.int64)
+
+    # lo تذهب لليسار دائماً و hi لا تذهب، حتى يصبحا متجاورين
+    while (hi - lo > 1).any():
+        mid = lo + (hi - lo) // 2
+        left = goes_left(mid.astype(int_type))
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+
+    # أكبر قيمة تذهب لليسار (x <= t) أو أصغر قيمة لا تذهب (x < t)
+    boundary = hi if strict else lo
+    return _ordered_key(boundary.astype(int_type), int_type).view(dtype).astype(np.float64)
+
+
+class CompiledTrees:
+    """
+    مجموعة أشجار مسطحة في مصفوفات numpy متجاورة
+
+    كل الأشجار تشترك في نفس المصفوفات (feature, threshold, left, right, value)
+    و roots تحدد عقدة الجذر لكل شجرة. الأوراق تشير إلى نفسها في left و right،
+    لذلك يمكن السير في كل الأشجار لكل الصفوف معاً لعدد max_depth من الخطوات.
+
+    kind:
+        'forest': value احتمال الموافقة في الورقة، والنتيجة متوسط الأشجار
+        'boosting': value هامش (logit) في الورقة، والنتيجة base_score + مجموع الأشجار
+
+    input_dtype: دقة مقارنة الميزات؛ float32 مثل scikit-learn و xgboost، أو float64
+    عندما يكون المقياس مدمجاً في العتبات (انظر fold_thresholds)
+    """
+
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'missing_left', 'roots')
+
+    def __init__(self, kind, feature, threshold, left, right, value, missing_left, roots,
+                 max_depth, base_score=0.0, strict=False, input_dtype='float32'):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.base_score = float(base_score)
+        self.strict = bool(strict)
+        self.input_dtype = np.dtype(input_dtype)
+
+    def leaves(self, X):
+        """إرجاع رقم الورقة لكل صف ولكل شجرة، بشكل (n_rows, n_trees)"""
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0])).copy()
+
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            if self.strict:
+                go_left = x < self.threshold[node]
+            else:
+                go_left = x <= self.threshold[node]
+            go_left |= np.isnan(x) & self.missing_left[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        return node
+
+    def decision_function(self, X):
+        """النتيجة الخام: متوسط الاحتمالات (forest) أو الهامش (boosting)"""
+        values = self.value[self.leaves(X)]
+        if self.kind == 'forest':
+            return values.mean(axis=1)
+        return self.base_score + values.sum(axis=1)
+
+    def predict_proba(self, X):
+        """احتمال كل فئة بشكل (n_rows, 2) كما في scikit-learn"""
+        score = self.decision_function(X)
+        if self.kind == 'boosting':
+            score = 1.0 / (1.0 + np.exp(-score))
+        return np.column_stack([1.0 - score, score])
+
+    def predict(self, X):
+        """التنبؤ بالفئة (1 للموافقة، 0 للرفض)"""
+        score = self.decision_function(X)
+        threshold = 0.5 if self.kind == 'forest' else 0.0
+        return (score > threshold).astype(np.int64)
+
+    def to_arrays(self):
+        """المصفوفات والبيانات الوصفية اللازمة للحفظ"""
+        meta = {'kind': self.kind, 'max_depth': self.max_depth,
+                'base_score': self.base_score, 'strict': self.strict,
+                'input_dtype': self.input_dtype.name}
+        return {name: getattr(self, name) for name in self.ARRAYS}, meta
+
+
+class CompiledLinear:
+    """نموذج خطي مترجم (LogisticRegression): النتيجة X·coef + intercept"""
+
+    ARRAYS = ('coef', 'intercept')
+
+    def __init__(self, coef, intercept):
+        self.kind = 'linear'
+        self.coef = coef
+        self.intercept = intercept
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X @ self.coef + self.intercept[0]
+
+    def predict_proba(self, X):
+        score = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - score, score])
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0).astype(np.int64)
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}, {'kind': self.kind}
+
+
+def _flatten(trees, strict):
+    """
+    دمج قائمة أشجار في مصفوفات متجاورة
+
+    Args:
+        trees: قائمة قواميس تحتوي على left, right, feature, threshold, value, missing_left
+            بأرقام عقد محلية لكل شجرة (-1 للورقة)
+        strict: نوع المقارنة في العقد
+    """
+    sizes = [len(tree['left']) for tree in trees]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+
+    feature, threshold, left, right, value, missing_left = [], [], [], [], [], []
+    max_depth = 0
+    for tree, offset in zip(trees, offsets):
+        local_left = np.asarray(tree['left'], dtype=np.int32)
+        local_right = np.asarray(tree['right'], dtype=np.int32)
+        is_leaf = local_left == -1
+        own = np.arange(len(local_left), dtype=np.int32)
+
+        # الأوراق تشير إلى نفسها حتى يبقى السير ثابتاً بعد الوصول إليها
+        left.append(np.where(is_leaf, own, local_left) + offset)
+        right.append(np.where(is_leaf, own, local_right) + offset)
+        feature.append(np.where(is_leaf, 0, tree['feature']).astype(np.int32))
+        threshold.append(np.where(is_leaf, np.inf, tree['threshold']).astype(np.float64))
+        value.append(np.asarray(tree['value'], dtype=np.float64))
+        missing_left.append(np.asarray(tree['missing_left'], dtype=bool))
+        max_depth = max(max_depth, _depth(local_left, local_right))
+
+    return dict(
+        feature=np.concatenate(feature), threshold=np.concatenate(threshold),
+        left=np.concatenate(left), right=np.concatenate(right),
+        value=np.concatenate(value), missing_left=np.concatenate(missing_left),
+        roots=offsets, max_depth=max_depth, strict=strict
+    )
+
+
+def _depth(left, right):
+    """أقصى عمق للشجرة (عدد الانتقالات من الجذر إلى أبعد ورقة)"""
+    depth = 0
+    level = [0]
+    while True:
+        children = [child for node in level for child in (left[node], right[node]) if child != -1]
+        if not children:
+            return depth
+        depth += 1
+        level = children
+
+
+def _sklearn_tree(estimator, value):
+    tree = estimator.tree_
+    missing = getattr(tree, 'missing_go_to_left', None)
+    return {
+        'left': tree.children_left,
+        'right': tree.children_right,
+        'feature': tree.feature,
+        'threshold': tree.threshold,
+        'value': value,
+        'missing_left': missing if missing is not None else np.zeros(tree.node_count, dtype=bool),
+    }
+
+
+def _xgboost_trees(model):
+    """استخراج الأشجار والهامش الابتدائي من نموذج XGBoost عبر تمثيل JSON"""
+    raw = json.loads(bytes(model.get_booster().save_raw(raw_format='json')))
+    learner = raw['learner']
+
+    trees = []
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'])
+        # split_conditions تحمل قيمة الورقة في الأوراق
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        trees.append({
+            'left': left,
+            'right': tree['right_children'],
+            'feature': tree['split_indices'],
+            'threshold': conditions,
+            'value': np.where(left == -1, conditions, 0.0),
+            'missing_left': np.asarray(tree['default_left'], dtype=bool),
+        })
+
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    if learner['objective']['name'] == 'binary:logistic':
+        base_score = float(np.log(base_score / (1.0 - base_score)))
+    return trees, base_score
+
+
+def _fold_trees(trees, scaler_mean, scaler_scale, strict):
+    """نقل المقياس إلى عتبات العقد الداخلية لكل شجرة"""
+    for tree in trees:
+        internal = np.asarray(tree['left']) != -1
+        features = np.asarray(tree['feature'])[internal]
+        threshold = np.array(tree['threshold'], dtype=np.float64)
+        original = threshold[internal].astype(np.float32) if strict else threshold[internal]
+        threshold[internal] = fold_thresholds(original, scaler_mean[features], scaler_scale[features],
+                                              strict, dtype=np.float64)
+        tree['threshold'] = threshold
+
+
+def compile_model(model, scaler_mean=None, scaler_scale=None):
+    """
+    ترجمة النموذج المدرب إلى مصفوفات numpy
+
+    Args:
+        model: RandomForest أو GradientBoosting أو XGBoost أو LogisticRegression
+        scaler_mean: متوسط المقياس (اختياري، يُدمج في العتبات أو المعاملات)
+        scaler_scale: مقياس المقياس
+
+    Returns:
+        CompiledTrees أو CompiledLinear
+    """
+    name = type(model).__name__
+    fold = scaler_mean is not None
+    # بعد دمج المقياس تُقارن الميزات الخام بدقة float64 (انظر fold_thresholds)
+    input_dtype = 'float64' if fold else 'float32'
+    if fold:
+        scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+        scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+
+    if name == 'XGBClassifier':
+        trees, base_score = _xgboost_trees(model)
+        if fold:
+            _fold_trees(trees, scaler_mean, scaler_scale, strict=True)
+        return CompiledTrees('boosting', base_score=base_score, input_dtype=input_dtype,
+                             **_flatten(trees, strict=True))
+
+    if name == 'RandomForestClassifier':
+        trees = []
+        for estimator in model.estimators_:
+            value = estimator.tree_.value[:, 0, :]
+            # احتمال الفئة 1 في كل ورقة (القيم قد تكون أعداداً أو نسباً حسب الإصدار)
+            trees.append(_sklearn_tree(estimator, value[:, 1] / value.sum(axis=1)))
+        if fold:
+            _fold_trees(trees, scaler_mean, scaler_scale, strict=False)
+        return CompiledTrees('forest', input_dtype=input_dtype, **_flatten(trees, strict=False))
+
+    if name == 'GradientBoostingClassifier':
+        trees = [_sklearn_tree(estimator, estimator.tree_.value[:, 0, 0] * model.learning_rate)
+                 for estimator in model.estimators_[:, 0]]
+        base_score = float(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0, 0])
+        if fold:
+            _fold_trees(trees, scaler_mean, scaler_scale, strict=False)
+        return CompiledTrees('boosting', base_score=base_score, input_dtype=input_dtype,
+                             **_flatten(trees, strict=False))
+
+    if hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+        coef = np.asarray(model.coef_, dtype=np.float64)[0]
+        intercept = np.asarray(model.intercept_, dtype=np.float64)
+        if fold:
+            # w·((x - m) / s) + b = (w / s)·x + (b - w·(m / s))
+            intercept = intercept - coef @ (scaler_mean / scaler_scale)
+            coef = coef / scaler_scale
+        return CompiledLinear(coef, intercept)
+
+    raise ValueError(f'Cannot compile {name}')
+
+
+def save_compiled(compiled, path, feature_names):
+    """حفظ النموذج المترجم في ملف npz واحد"""
+    arrays, meta = compiled.to_arrays()
+    meta['feature_names'] = list(feature_names)
+    np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+
+def load_compiled(path):
+    """
+    تحميل نموذج مترجم من ملف npz
+
+    Returns:
+        tuple: (النموذج المترجم، أسماء الميزات)
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        compiled = from_arrays({name: data[name] for name in data.files if name != 'meta'}, meta)
+    return compiled, meta['feature_names']
+
+
+def from_arrays(arrays, meta):
+    """
+    إعادة بناء النموذج المترجم من ناتج to_arrays
+
+    المصفوفات تُستخدم كما هي بدون نسخ، فيمكن أن تكون np.memmap أو مصفوفات
+    فوق ذاكرة مشتركة.
+    """
+    if meta['kind'] == 'linear':
+        return CompiledLinear(*(arrays[name] for name in CompiledLinear.ARRAYS))
+    return CompiledTrees(
+        meta['kind'], *(arrays[name] for name in CompiledTrees.ARRAYS),
+        max_depth=meta['max_depth'], base_score=meta['base_score'], strict=meta['strict'],
+        input_dtype=meta['input_dtype'])
+
+
+# إصدار صيغة مجلد النموذج (model.json + ملف .npy لكل مصفوفة)
+ARTIFACT_FORMAT = 1
+ARTIFACT_HEADER = 'model.json'
+
+
+def save_artifact(compiled, directory, feature_names, scaler_mean=None, scaler_scale=None):
+    """
+    حفظ النموذج المترجم كمجلد: ترويسة JSON صغيرة وملف .npy خام لكل مصفوفة
+
+    يُكتب المجلد بجانب الهدف ثم يُستبدل به، فلا يرى القارئ مجلداً نصف مكتوب،
+    والعمليات التي فتحت النسخة القديمة بـ mmap تبقى تقرأ ملفاتها حتى تغلقها.
+
+    Args:
+        compiled: CompiledTrees أو CompiledLinear
+        directory: مسار المجلد
+        feature_names: أسماء الميزات بترتيب أعمدة النموذج
+        scaler_mean: متوسط المقياس إذا لم يكن مدمجاً في النموذج (يُطبّق قبل التنبؤ)
+        scaler_scale: مقياس المقياس
+    """
+    arrays, meta = compiled.to_arrays()
+    if scaler_mean is not None:
+        arrays['scaler_mean'] = np.asarray(scaler_mean, dtype=np.float64)
+        arrays['scaler_scale'] = np.asarray(scaler_scale, dtype=np.float64)
+
+    directory = os.path.normpath(directory)
+    staging = f'{directory}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    header = {'format': ARTIFACT_FORMAT, 'meta': meta, 'feature_names': list(feature_names), 'arrays': {}}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        np.save(os.path.join(staging, f'{name}.npy'), array, allow_pickle=False)
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+    with open(os.path.join(staging, ARTIFACT_HEADER), 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2)
+
+    if os.path.exists(directory):
+        previous = f'{directory}.old'
+        shutil.rmtree(previous, ignore_errors=True)
+        os.rename(directory, previous)
+        os.rename(staging, directory)
+        shutil.rmtree(previous, ignore_errors=True)
+    else:
+        os.rename(staging, directory)
+
+
+def load_artifact(directory, mmap_mode='r'):
+    """
+    تحميل مجلد النموذج بدون pickle؛ المصفوفات تُفتح بـ mmap فلا تُنسخ في الذاكرة
+    وتشترك فيها كل العمليات التي تفتح نفس الملفات
+
+    Returns:
+        tuple: (النموذج المترجم، أسماء الميزات، متوسط المقياس أو None، مقياس المقياس أو None)
+
+    Raises:
+        FileNotFoundError: إذا لم يوجد المجلد أو ترويسته
+        ValueError: إذا كانت الصيغة غير مدعومة أو لا تطابق مصفوفة ما ترويستها
+    """
+    with open(os.path.join(directory, ARTIFACT_HEADER), encoding='utf-8') as f:
+        header = json.load(f)
+    if header.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f'Unsupported model artifact format: {header.get("format")!r}')
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        array = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ValueError(f'Model array {name} does not match {ARTIFACT_HEADER}')
+        arrays[name] = array
+
+    compiled = from_arrays(arrays, header['meta'])
+    return compiled, header['feature_names'], arrays.get('scaler_mean'), arrays.get('scaler_scale')
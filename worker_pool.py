@@ -0,0 +1,249 @@
+# مجمّع عمليات التنبؤ: كل عملية تفتح مجلد النموذج (tree_compiler.save_artifact) بـ mmap،
+# فتشترك العمليات في نفس صفحات الذاكرة ويُقيّم كل منها الدفعات على نواة مستقلة
+# بدون قفل GIL واحد. يمكن تشغيل العامل مباشرة:
+#   python worker_pool.py <مجلد النموذج>
+# (يقرأ المصفوفات من stdin ويكتب النتائج في stdout بصيغة multiprocessing.connection)
+import atexit
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+from metrics import log_event
+from tree_compiler import load_artifact, save_artifact
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """
+    مجموعة عمليات تنبؤ تقرأ مصفوفات ميزات من طابور مشترك
+
+    لكل عملية خيط إرسال في العملية الرئيسية يأخذ المهمة التالية من الطابور،
+    فتبقى كل العمليات مشغولة ما دامت هناك مهام. الدفعات الكبيرة تُقسّم على
+    العمليات، والعملية التي تتوقف تُستبدل تلقائياً.
+    """
+
+    def __init__(self, directory, processes=None, min_chunk=1024, start_timeout=30.0):
+        """
+        Args:
+            directory: مجلد النموذج (انظر tree_compiler.save_artifact)
+            processes: عدد العمليات (افتراضياً عدد الأنوية)
+            min_chunk: أقل عدد صفوف في الجزء عند تقسيم دفعة كبيرة على العمليات
+            start_timeout: أقصى مدة بالثواني لانتظار جاهزية كل عملية
+        """
+        self.directory = os.path.abspath(directory)
+        self.processes = processes or os.cpu_count() or 1
+        self.min_chunk = min_chunk
+        self.start_timeout = start_timeout
+
+        # مجلد مؤقت أنشأه from_model ويُحذف عند الإيقاف
+        self._owned_directory = None
+        self._started = False
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._workers = []
+        self._closed = False
+
+        self.tasks = 0
+        self.rows = 0
+        self.errors = 0
+        self.restarts = 0
+        self.score_seconds = 0.0
+
+    @classmethod
+    def from_model(cls, compiled, feature_names, **kwargs):
+        """مجمّع لنموذج مترجم في الذاكرة: يُحفظ في مجلد مؤقت يُحذف عند الإيقاف"""
+        directory = os.path.join(tempfile.mkdtemp(prefix='loan-model-'), 'model')
+        save_artifact(compiled, directory, feature_names)
+        pool = cls(directory, **kwargs)
+        pool._owned_directory = os.path.dirname(directory)
+        return pool
+
+    def start(self):
+        """تشغيل العمليات (وإيقافها تلقائياً عند الخروج)"""
+        if self._started:
+            return self
+        self._started = True
+        for slot in range(self.processes):
+            self._workers.append(self._spawn())
+            thread = threading.Thread(target=self._serve, args=(slot,), name=f'predict-worker-{slot}',
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        atexit.register(self.close)
+        return self
+
+    def _spawn(self):
+        """تشغيل عملية عامل وانتظار رسالة الجاهزية منها"""
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), self.directory],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        writer = Connection(os.dup(process.stdin.fileno()), readable=False)
+        reader = Connection(os.dup(process.stdout.fileno()), writable=False)
+        process.stdin.close()
+        process.stdout.close()
+        if not reader.poll(self.start_timeout):
+            process.kill()
+            raise RuntimeError(f'prediction worker {process.pid} did not start')
+        try:
+            reader.recv()
+        except EOFError:
+            raise RuntimeError(f'prediction worker {process.pid} exited during startup '
+                               f'(code {process.wait()})')
+        return {'process': process, 'writer': writer, 'reader': reader, 'tasks': 0, 'rows': 0}
+
+    def _serve(self, slot):
+        """خيط الإرسال لعملية واحدة: مهمة واحدة في كل مرة حتى الإيقاف"""
+        while True:
+            item = self._tasks.get()
+            if item is _STOP:
+                return
+            matrix, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            worker = self._workers[slot]
+            started = time.perf_counter()
+            try:
+                worker['writer'].send(matrix)
+                status, payload = worker['reader'].recv()
+            except (EOFError, OSError):
+                code = worker['process'].poll()
+                future.set_exception(RuntimeError(f'prediction worker {worker["process"].pid} exited (code {code})'))
+                with self._lock:
+                    self.errors += 1
+                self._replace(slot)
+                continue
+
+            if status != 'ok':
+                future.set_exception(RuntimeError(payload))
+                with self._lock:
+                    self.errors += 1
+                continue
+            future.set_result(payload)
+            with self._lock:
+                self.tasks += 1
+                self.rows += len(matrix)
+                self.score_seconds += time.perf_counter() - started
+                worker['tasks'] += 1
+                worker['rows'] += len(matrix)
+
+    def _replace(self, slot):
+        old = self._workers[slot]
+        old['writer'].close()
+        old['reader'].close()
+        old['process'].kill()
+        old['process'].wait()
+        if self._closed:
+            return
+        try:
+            self._workers[slot] = self._spawn()
+        except RuntimeError as e:
+            log_event(logger, logging.ERROR, 'worker_restart_failed', slot=slot, error=str(e))
+            return
+        with self._lock:
+            self.restarts += 1
+        log_event(logger, logging.WARNING, 'worker_restarted', slot=slot, pid=self._workers[slot]['process'].pid)
+
+    def submit(self, features):
+        """
+        إضافة مصفوفة ميزات (n, n_features) إلى الطابور
+
+        Returns:
+            concurrent.futures.Future: التنبؤات (n,) لصفوف المصفوفة
+        """
+        if self._closed:
+            raise RuntimeError('worker pool is closed')
+        future = Future()
+        self._tasks.put((np.ascontiguousarray(features, dtype=np.float64), future))
+        return future
+
+    def predict(self, features, timeout=None):
+        """التنبؤ لمصفوفة كاملة، مع تقسيم الدفعات الكبيرة على العمليات"""
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        parts = min(self.processes, len(features) // self.min_chunk)
+        if parts <= 1:
+            return self.submit(features).result(timeout)
+        futures = [self.submit(chunk) for chunk in np.array_split(features, parts)]
+        return np.concatenate([future.result(timeout) for future in futures])
+
+    def close(self, timeout=10.0):
+        """إيقاف العمليات بعد إنهاء المهام الموجودة في الطابور (وحذف مجلد from_model المؤقت)"""
+        if self._closed or not self._started:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._tasks.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        for worker in self._workers:
+            try:
+                worker['writer'].send(None)
+            except OSError:
+                pass
+            worker['writer'].close()
+            worker['reader'].close()
+            try:
+                worker['process'].wait(timeout)
+            except subprocess.TimeoutExpired:
+                worker['process'].kill()
+        if self._owned_directory is not None:
+            shutil.rmtree(self._owned_directory, ignore_errors=True)
+
+    def stats(self):
+        """عدادات المجمّع مع عدد المهام والصفوف لكل عملية"""
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'alive': sum(1 for worker in self._workers if worker['process'].poll() is None),
+                'queued': self._tasks.qsize(),
+                'tasks': self.tasks,
+                'rows': self.rows,
+                'errors': self.errors,
+                'restarts': self.restarts,
+                'avg_task_ms': round(self.score_seconds / self.tasks * 1000, 3) if self.tasks else 0.0,
+                'workers': [{'pid': worker['process'].pid, 'tasks': worker['tasks'], 'rows': worker['rows']}
+                            for worker in self._workers],
+            }
+
+
+def worker_main(directory):
+    """حلقة عملية العامل: مصفوفة من stdin، التنبؤات إلى stdout، حتى None أو نهاية الملف"""
+    compiled, _, scaler_mean, scaler_scale = load_artifact(directory)
+    reader = Connection(os.dup(0), writable=False)
+    writer = Connection(os.dup(1), readable=False)
+    # أي طباعة في العامل تذهب إلى stderr حتى لا تختلط بالنتائج
+    os.dup2(2, 1)
+
+    writer.send(('ready', os.getpid()))
+    while True:
+        try:
+            matrix = reader.recv()
+        except EOFError:
+            return
+        if matrix is None:
+            return
+        try:
+            if scaler_mean is not None:
+                matrix = (matrix - scaler_mean) / scaler_scale
+            writer.send(('ok', compiled.predict(matrix)))
+        except Exception as e:
+            writer.send(('error', f'{type(e).__name__}: {e}'))
+
+
+if __name__ == '__main__':
+    worker_main(sys.argv[1])
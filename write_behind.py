@@ -0,0 +1,216 @@
+import atexit
+import logging
+import queue
+import signal
+import sys
+import threading
+import time
+
+from metrics import log_event
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    طابور كتابة مؤجلة: الطلبات تُضاف إلى طابور في الذاكرة ويكتبها خيط خلفي
+    على دفعات (group commit) بدلاً من معاملة لكل طلب
+
+    الطابور محدود الحجم: عند امتلائه ينتظر المُرسل (backpressure) حتى put_timeout
+    ثم يرفع queue.Full ليكتب المُرسل الطلب مباشرة. عند إيقاف البرنامج يُفرّغ
+    الطابور بالكامل قبل الخروج.
+    """
+
+    def __init__(self, flush, batch_size=500, max_latency=0.05, max_size=10000, put_timeout=1.0,
+                 max_retries=3):
+        """
+        Args:
+            flush: دالة تكتب قائمة من السجلات في معاملة واحدة
+            batch_size: أقصى عدد من السجلات في كل دفعة
+            max_latency: أقصى مدة بالثواني ينتظرها أول سجل في الدفعة قبل الكتابة
+            max_size: سعة الطابور
+            put_timeout: مدة انتظار المُرسل عند امتلاء الطابور
+            max_retries: عدد محاولات إعادة كتابة دفعة فاشلة
+        """
+        self.flush = flush
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.max_depth = 0
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+        self.rejected = 0
+        self.flush_seconds = 0.0
+
+    def start(self):
+        """تشغيل خيط الكتابة وتسجيل تفريغ الطابور عند الخروج"""
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def submit(self, record):
+        """
+        إضافة سجل إلى الطابور
+
+        Raises:
+            queue.Full: إذا بقي الطابور ممتلئاً طوال put_timeout أو كان متوقفاً
+        """
+        if self._closed:
+            raise queue.Full('write-behind queue is stopped')
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            started = time.perf_counter()
+            try:
+                self._queue.put(record, timeout=self.put_timeout)
+            except queue.Full:
+                with self._lock:
+                    self.blocked_puts += 1
+                    self.blocked_seconds += time.perf_counter() - started
+                    self.rejected += 1
+                raise
+            with self._lock:
+                self.blocked_puts += 1
+                self.blocked_seconds += time.perf_counter() - started
+
+        with self._lock:
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def _write(self, batch):
+        """
+        كتابة دفعة مع إعادة المحاولة عند الفشل (مثلاً قفل قاعدة البيانات)
+
+        إذا فشلت الدفعة في كل المحاولات تُكتب سجلاتها واحداً واحداً حتى لا يُفقد
+        إلا السجل المعيب نفسه.
+        """
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.flush(batch)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    log_event(logger, logging.ERROR, 'write_behind_flush_failed', records=len(batch), error=str(e))
+                    self._write_each(batch)
+                    return
+                time.sleep(0.1 * 2 ** attempt)
+
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.max_batch = max(self.max_batch, len(batch))
+            self.flush_seconds += time.perf_counter() - started
+
+    def _write_each(self, batch):
+        written = 0
+        for record in batch:
+            try:
+                self.flush([record])
+                written += 1
+            except Exception as e:
+                log_event(logger, logging.ERROR, 'write_behind_record_lost', error=str(e))
+        with self._lock:
+            self.written += written
+            self.failed += len(batch) - written
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            # تجميع الدفعة حتى batch_size أو انتهاء max_latency من أول سجل
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _drain(self):
+        """كتابة ما تبقى في الطابور في الخيط الحالي"""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def stop(self, timeout=30.0):
+        """إيقاف الاستقبال وتفريغ الطابور كاملاً (يُستدعى تلقائياً عند الخروج)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        # سجلات أُضيفت بالتزامن مع الإيقاف
+        self._drain()
+
+    def stats(self):
+        """عدادات الطابور للمشغّلين (العمق، الدفعات، الضغط الخلفي)"""
+        with self._lock:
+            return {
+                'depth': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'max_depth': self.max_depth,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'failed': self.failed,
+                'batches': self.batches,
+                'avg_batch': round(self.written / self.batches, 1) if self.batches else 0.0,
+                'max_batch': self.max_batch,
+                'avg_flush_ms': round(self.flush_seconds / self.batches * 1000, 2) if self.batches else 0.0,
+                'blocked_puts': self.blocked_puts,
+                'blocked_seconds': round(self.blocked_seconds, 3),
+                'rejected': self.rejected,
+                'running': self._thread is not None and self._thread.is_alive(),
+            }
+
+
+def exit_on_sigterm():
+    """
+    تحويل SIGTERM إلى خروج عادي حتى تعمل دوال atexit (تفريغ الطابور)
+
+    لا يغيّر معالجاً مخصصاً موجوداً، ويعمل فقط من الخيط الرئيسي.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))